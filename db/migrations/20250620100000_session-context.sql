@@ -0,0 +1,16 @@
+-- Copyright 2025 Marius Meschter
+-- SPDX-License-Identifier: AGPL-3.0-only
+
+-- migrate:up
+
+-- Switches to tso_api_user and sets the current user for the rest of the transaction in a single call.
+-- Both settings are transaction local, so they are reset on COMMIT/ROLLBACK before the connection goes back to the pool.
+CREATE FUNCTION tso.set_session_context(user_id uuid) RETURNS VOID
+AS $$
+BEGIN
+    PERFORM set_config('role', 'tso_api_user', true);
+    PERFORM tso.set_uid(user_id);
+END;
+$$ LANGUAGE plpgsql;
+
+-- migrate:down
@@ -0,0 +1,9 @@
+-- Copyright 2025 Marius Meschter
+-- SPDX-License-Identifier: AGPL-3.0-only
+
+-- migrate:up
+-- the default privileges only cover SELECT, INSERT and UPDATE, removing lines in update_recipe needs DELETE as well
+GRANT DELETE ON tso.ingredient TO tso_api_user;
+GRANT DELETE ON tso.instruction TO tso_api_user;
+
+-- migrate:down
@@ -0,0 +1,28 @@
+-- Copyright 2025 Marius Meschter
+-- SPDX-License-Identifier: AGPL-3.0-only
+
+-- migrate:up
+
+-- unaccent() is only STABLE because its dictionary could change, generated columns and index expressions
+-- need an IMMUTABLE function. Pinning the dictionary makes that safe.
+CREATE FUNCTION tso.immutable_unaccent(value text) RETURNS text
+AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, value) $$
+LANGUAGE sql
+IMMUTABLE
+STRICT
+PARALLEL SAFE;
+
+-- recipes can be in any language, so the 'simple' configuration is used which doesn't do any stemming
+ALTER TABLE tso.recipe ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple', tso.immutable_unaccent(title)), 'A')
+    || setweight(to_tsvector('simple', tso.immutable_unaccent(note)), 'B')
+) STORED;
+
+ALTER TABLE tso.ingredient ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple', tso.immutable_unaccent(text)), 'C')
+) STORED;
+
+CREATE INDEX ON tso.recipe USING gin (search_vector);
+CREATE INDEX ON tso.ingredient USING gin (search_vector);
+
+-- migrate:down
@@ -0,0 +1,16 @@
+-- Copyright 2025 Marius Meschter
+-- SPDX-License-Identifier: AGPL-3.0-only
+
+-- migrate:up
+
+-- Matches the ORDER BY (sort_field, id) of the recipe list within a collection, so that a page can be read
+-- straight from the index instead of sorting every visible recipe. These replace the single column indexes.
+CREATE INDEX recipe_collection_id_created_at_id_idx ON tso.recipe (collection_id, created_at, id);
+CREATE INDEX recipe_collection_id_updated_at_id_idx ON tso.recipe (collection_id, updated_at, id);
+CREATE INDEX recipe_collection_id_title_id_idx ON tso.recipe (collection_id, title, id);
+
+DROP INDEX tso.recipe_created_at_idx;
+DROP INDEX tso.recipe_updated_at_idx;
+DROP INDEX tso.recipe_title_idx;
+
+-- migrate:down
@@ -0,0 +1,27 @@
+-- Copyright 2025 Marius Meschter
+-- SPDX-License-Identifier: AGPL-3.0-only
+
+-- migrate:up
+
+-- The old policies compared against the id set of every visible recipe/shopping list, so reading the lines of
+-- a single recipe scaled with the size of the collection. Looking up the parent row by primary key applies the
+-- parent's own policy to just that row.
+DROP POLICY allow_for_recipe_access ON tso.instruction;
+CREATE POLICY allow_for_recipe_access ON tso.instruction
+FOR ALL
+USING (EXISTS (SELECT 1 FROM tso.recipe r WHERE r.id = instruction.recipe_id));
+
+DROP POLICY allow_for_recipe_access ON tso.ingredient;
+CREATE POLICY allow_for_recipe_access ON tso.ingredient
+FOR ALL
+USING (EXISTS (SELECT 1 FROM tso.recipe r WHERE r.id = ingredient.recipe_id));
+
+DROP POLICY allow_when_list_visible ON tso.list_entry;
+CREATE POLICY allow_when_list_visible ON tso.list_entry
+FOR ALL
+USING (EXISTS (SELECT 1 FROM tso.shopping_list l WHERE l.id = list_entry.list_id));
+
+DROP FUNCTION tso.get_recipes_for_user();
+DROP FUNCTION tso.get_shopping_lists_for_user();
+
+-- migrate:down
@@ -0,0 +1,70 @@
+-- Copyright 2025 Marius Meschter
+-- SPDX-License-Identifier: AGPL-3.0-only
+
+-- migrate:up
+
+CREATE FUNCTION tso.get_collection_ids_for_user(user_id uuid) RETURNS uuid[]
+AS $$ SELECT coalesce(array_agg(collection_id), '{}') FROM tso.collection_member WHERE account_id = user_id; $$
+LANGUAGE sql
+SECURITY DEFINER
+STABLE
+SET search_path = tso;
+
+-- The collections of the user are resolved once when the user is set and kept in a transaction local setting,
+-- instead of querying collection_member from every policy check.
+CREATE OR REPLACE FUNCTION tso.set_uid(user_id uuid) RETURNS VOID
+AS $$
+BEGIN
+    EXECUTE format('set local tso.user_id to %I', user_id);
+    PERFORM set_config('tso.collection_ids', tso.get_collection_ids_for_user(user_id)::text, true);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION tso.current_collection_ids() RETURNS uuid[]
+AS $$ SELECT coalesce(nullif(current_setting('tso.collection_ids', true), ''), '{}')::uuid[] $$
+LANGUAGE sql
+STABLE
+PARALLEL SAFE;
+
+-- keeps the setting up to date when the memberships change later in the same transaction
+CREATE FUNCTION tso.refresh_collection_ids() RETURNS trigger
+AS $$
+BEGIN
+    IF nullif(current_setting('tso.user_id', true), '') IS NOT NULL THEN
+        PERFORM set_config(
+            'tso.collection_ids', tso.get_collection_ids_for_user(tso.get_current_user_id())::text, true
+        );
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tso_collection_member_refresh_collection_ids AFTER INSERT OR UPDATE OR DELETE
+  ON tso.collection_member
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION tso.refresh_collection_ids();
+
+-- (SELECT ...) turns the lookup into an InitPlan that runs once per statement instead of once per row
+ALTER POLICY allow_read_for_collection_members ON tso.collection
+USING (
+  id = ANY ((SELECT tso.current_collection_ids())::uuid[])
+  OR
+  id NOT IN (SELECT collection_id FROM tso.get_collections_with_no_members())
+);
+
+ALTER POLICY allow_read_for_collection_members ON tso.collection_member
+USING (collection_id = ANY ((SELECT tso.current_collection_ids())::uuid[]));
+
+ALTER POLICY allow_for_collection_member ON tso.asset
+USING (collection_id = ANY ((SELECT tso.current_collection_ids())::uuid[]));
+
+ALTER POLICY allow_for_collection_member ON tso.recipe
+USING (collection_id = ANY ((SELECT tso.current_collection_ids())::uuid[]));
+
+ALTER POLICY allow_for_collection_members ON tso.shopping_list
+USING (collection_id = ANY ((SELECT tso.current_collection_ids())::uuid[]));
+
+DROP FUNCTION tso.get_collections_for_user();
+
+-- migrate:down
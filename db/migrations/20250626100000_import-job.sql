@@ -0,0 +1,36 @@
+-- Copyright 2025 Marius Meschter
+-- SPDX-License-Identifier: AGPL-3.0-only
+
+-- migrate:up
+
+-- Recipe imports are queued here and processed by the import workers of every API process. Workers claim jobs
+-- with FOR UPDATE SKIP LOCKED, a claimed job is leased until run_after and picked up again if its worker dies.
+CREATE TABLE tso.import_job (
+    id uuid PRIMARY KEY,
+    account_id uuid NOT NULL REFERENCES tso.account ON UPDATE RESTRICT ON DELETE CASCADE,
+    collection_id uuid NOT NULL REFERENCES tso.collection ON UPDATE RESTRICT ON DELETE CASCADE,
+    url TEXT NOT NULL CHECK (length(url) > 0 AND length(url) < 2000),
+    status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'succeeded', 'failed')),
+    attempts INT NOT NULL DEFAULT 0,
+    run_after timestamptz NOT NULL DEFAULT now(),
+    recipe_id uuid REFERENCES tso.recipe ON UPDATE RESTRICT ON DELETE SET NULL,
+    error TEXT,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX ON tso.import_job (run_after) WHERE status IN ('queued', 'running');
+CREATE INDEX ON tso.import_job (account_id);
+
+ALTER TABLE tso.import_job ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY allow_for_owner ON tso.import_job
+FOR ALL
+USING (account_id = tso.get_current_user_id());
+
+CREATE TRIGGER tso_import_job_update_updated_at BEFORE UPDATE
+  ON tso.import_job
+  FOR EACH ROW
+  EXECUTE FUNCTION tso.update_updated_at();
+
+-- migrate:down
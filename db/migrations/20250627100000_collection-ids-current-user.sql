@@ -0,0 +1,40 @@
+-- Copyright 2025 Marius Meschter
+-- SPDX-License-Identifier: AGPL-3.0-only
+
+-- migrate:up
+
+-- get_collection_ids_for_user(uuid) runs as its owner and returned the memberships of any account it was asked
+-- about. The replacement only ever looks up the user of the current transaction.
+CREATE FUNCTION tso.get_collection_ids_for_current_user() RETURNS uuid[]
+AS $$
+    SELECT coalesce(array_agg(collection_id), '{}')
+    FROM tso.collection_member
+    WHERE account_id = tso.get_current_user_id();
+$$
+LANGUAGE sql
+SECURITY DEFINER
+STABLE
+SET search_path = tso;
+
+CREATE OR REPLACE FUNCTION tso.set_uid(user_id uuid) RETURNS VOID
+AS $$
+BEGIN
+    EXECUTE format('set local tso.user_id to %I', user_id);
+    PERFORM set_config('tso.collection_ids', tso.get_collection_ids_for_current_user()::text, true);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tso.refresh_collection_ids() RETURNS trigger
+AS $$
+BEGIN
+    IF nullif(current_setting('tso.user_id', true), '') IS NOT NULL THEN
+        PERFORM set_config('tso.collection_ids', tso.get_collection_ids_for_current_user()::text, true);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP FUNCTION tso.get_collection_ids_for_user(uuid);
+
+-- migrate:down
@@ -0,0 +1,25 @@
+-- Copyright 2025 Marius Meschter
+-- SPDX-License-Identifier: AGPL-3.0-only
+
+-- migrate:up
+
+-- Recipe pages fetched by imports and the recipe parsed from them, shared by all workers. Imports of the same
+-- page skip the download and the parse while an entry is fresh and revalidate it with its ETag/Last-Modified
+-- once it is stale. The least recently used entries are evicted once the pages exceed the configured size.
+CREATE TABLE tso.page_cache (
+    url TEXT PRIMARY KEY,
+    html TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    recipe jsonb NOT NULL,
+    size_bytes INT NOT NULL,
+    fetched_at timestamptz NOT NULL DEFAULT now(),
+    accessed_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX ON tso.page_cache (accessed_at);
+
+-- the cache holds public web pages and isn't tied to a user, it is only used by the import service
+REVOKE ALL ON tso.page_cache FROM tso_api_user;
+
+-- migrate:down
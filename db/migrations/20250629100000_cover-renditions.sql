@@ -0,0 +1,26 @@
+-- Copyright 2025 Marius Meschter
+-- SPDX-License-Identifier: AGPL-3.0-only
+
+-- migrate:up
+
+-- A cover image is stored in several widths and formats, every rendition is an asset of the recipe. The recipe's
+-- cover_image and cover_thumbnail still point to the 800px and 400px WebP renditions.
+ALTER TABLE tso.asset
+    ADD COLUMN recipe_id uuid REFERENCES tso.recipe (id) ON DELETE RESTRICT ON UPDATE RESTRICT,
+    ADD COLUMN mime_type text,
+    ADD COLUMN width int;
+
+CREATE INDEX ON tso.asset (recipe_id);
+
+-- covers saved before renditions existed are the only renditions of their recipe
+UPDATE tso.asset
+SET recipe_id = recipe.id, mime_type = 'image/webp', width = 800
+FROM tso.recipe
+WHERE recipe.cover_image = asset.id;
+
+UPDATE tso.asset
+SET recipe_id = recipe.id, mime_type = 'image/webp', width = 400
+FROM tso.recipe
+WHERE recipe.cover_thumbnail = asset.id;
+
+-- migrate:down
@@ -0,0 +1,70 @@
+-- Copyright 2025 Marius Meschter
+-- SPDX-License-Identifier: AGPL-3.0-only
+
+-- migrate:up
+
+-- Asset files are stored once per content, named by their SHA-256 hash, and shared by every asset with the same
+-- bytes, across collections. ref_count is kept up to date by the triggers on tso.asset, blobs nobody refers to
+-- any more are removed together with their file by the garbage collection of the API processes after a grace
+-- period. The garbage collection locks the blobs it removes with FOR UPDATE SKIP LOCKED, an upload that refers
+-- to a blob again holds the row lock until it committed, so a blob is never removed while it is being reused.
+CREATE TABLE tso.blob (
+    hash TEXT PRIMARY KEY CHECK (hash ~ '^[0-9a-f]{64}$'),
+    path TEXT NOT NULL CHECK (length(path) <= 4096),
+    size INT NOT NULL,
+    ref_count INT NOT NULL DEFAULT 0 CHECK (ref_count >= 0),
+    created_at timestamptz NOT NULL DEFAULT now(),
+    unreferenced_since timestamptz
+);
+
+CREATE INDEX ON tso.blob (unreferenced_since) WHERE ref_count = 0;
+
+-- blobs are shared by all collections, the API only reaches them through the assets
+REVOKE ALL ON tso.blob FROM tso_api_user;
+
+-- assets saved before the blob store existed have no blob, their files are deleted with them
+ALTER TABLE tso.asset ADD COLUMN blob_hash TEXT REFERENCES tso.blob (hash) ON DELETE RESTRICT ON UPDATE RESTRICT;
+
+CREATE INDEX ON tso.asset (blob_hash);
+
+CREATE FUNCTION tso.reference_blob() RETURNS trigger
+AS $$
+BEGIN
+    INSERT INTO tso.blob (hash, path, size, ref_count)
+    VALUES (NEW.blob_hash, NEW.path, NEW.size, 1)
+    ON CONFLICT (hash) DO UPDATE SET ref_count = blob.ref_count + 1, unreferenced_since = NULL;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = tso;
+
+CREATE TRIGGER tso_asset_reference_blob BEFORE INSERT
+  ON tso.asset
+  FOR EACH ROW
+  WHEN (NEW.blob_hash IS NOT NULL)
+  EXECUTE FUNCTION tso.reference_blob();
+
+CREATE FUNCTION tso.release_blob() RETURNS trigger
+AS $$
+BEGIN
+    UPDATE tso.blob
+    SET
+        ref_count = ref_count - 1,
+        unreferenced_since = CASE WHEN ref_count = 1 THEN now() END
+    WHERE hash = OLD.blob_hash;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = tso;
+
+CREATE TRIGGER tso_asset_release_blob AFTER DELETE
+  ON tso.asset
+  FOR EACH ROW
+  WHEN (OLD.blob_hash IS NOT NULL)
+  EXECUTE FUNCTION tso.release_blob();
+
+-- migrate:down
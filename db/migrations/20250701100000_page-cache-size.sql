@@ -0,0 +1,40 @@
+-- Copyright 2025 Marius Meschter
+-- SPDX-License-Identifier: AGPL-3.0-only
+
+-- migrate:up
+
+-- The HTML of cached pages was never read back, only its size counted. It is dropped, an entry takes up as much
+-- as its parsed recipe.
+ALTER TABLE tso.page_cache DROP COLUMN html;
+
+UPDATE tso.page_cache SET size_bytes = octet_length(recipe::text);
+
+-- The total size of the cached pages, kept up to date by the trigger below. The import workers read it after
+-- storing a page and only evict pages once it exceeds the configured size, instead of summing up the whole cache
+-- on every store.
+CREATE TABLE tso.page_cache_size (
+    id BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+    total_bytes BIGINT NOT NULL
+);
+
+INSERT INTO tso.page_cache_size (total_bytes) SELECT coalesce(sum(size_bytes), 0) FROM tso.page_cache;
+
+REVOKE ALL ON tso.page_cache_size FROM tso_api_user;
+
+CREATE FUNCTION tso.count_page_cache_size() RETURNS trigger
+AS $$
+BEGIN
+    UPDATE tso.page_cache_size
+    SET total_bytes = total_bytes + coalesce(NEW.size_bytes, 0) - coalesce(OLD.size_bytes, 0);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- reads only touch accessed_at and don't fire it
+CREATE TRIGGER tso_page_cache_count_size AFTER INSERT OR DELETE OR UPDATE OF size_bytes
+  ON tso.page_cache
+  FOR EACH ROW
+  EXECUTE FUNCTION tso.count_page_cache_size();
+
+-- migrate:down
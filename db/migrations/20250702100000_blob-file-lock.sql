@@ -0,0 +1,26 @@
+-- Copyright 2025 Marius Meschter
+-- SPDX-License-Identifier: AGPL-3.0-only
+
+-- migrate:up
+
+-- The garbage collection deletes and commits the rows of unreferenced blobs before it deletes their files, so a
+-- failed transaction never leaves a blob without its file. An upload of the same content may create the blob
+-- again in between and find the file still there. Uploads hold a shared advisory lock on the hash until they
+-- commit (class 1651273570, 'blob'), the garbage collection only deletes the files whose lock it gets exclusively
+-- and that have no row again.
+CREATE OR REPLACE FUNCTION tso.reference_blob() RETURNS trigger
+AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock_shared(1651273570, hashtext(NEW.blob_hash));
+
+    INSERT INTO tso.blob (hash, path, size, ref_count)
+    VALUES (NEW.blob_hash, NEW.path, NEW.size, 1)
+    ON CONFLICT (hash) DO UPDATE SET ref_count = blob.ref_count + 1, unreferenced_since = NULL;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = tso;
+
+-- migrate:down
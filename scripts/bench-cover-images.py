@@ -0,0 +1,110 @@
+# ruff: noqa: T201, INP001
+
+# Compares processing concurrent cover uploads in the default thread pool of the event loop against the image
+# worker processes. Reports the throughput and how long the event loop was blocked at most (a ticker that should
+# run every 10ms), which is what other requests of the same worker feel.
+#
+# Runs from the project environment:
+# DATABASE_URL=... OIDC_WELL_KNOWN=... DATA_DIR=... SECRET_KEY=... uv run python scripts/bench-cover-images.py
+
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image
+
+from tso_api.process_pool import BoundedProcessPool
+from tso_api.service.image_processing import (
+    DEFAULT_COVER_RENDITIONS,
+    RECIPE_COVER,
+    RECIPE_COVER_THUMBNAIL,
+    RenderedImage,
+    can_encode,
+    render_recipe_cover,
+)
+
+UPLOADS = int(os.environ.get('BENCH_UPLOADS', '50'))
+WORKERS = int(os.environ.get('BENCH_WORKERS', str(os.cpu_count() or 2)))
+# a 12 megapixel phone photo
+PHOTO_SIZE = (4032, 3024)
+TICK = 0.01
+RENDITIONS = [
+    rendition
+    for rendition in (RECIPE_COVER, RECIPE_COVER_THUMBNAIL, *DEFAULT_COVER_RENDITIONS)
+    if can_encode(rendition.format)
+]
+
+
+def photo() -> bytes:
+    noise = Image.effect_noise(PHOTO_SIZE, 40)
+    gradient = Image.linear_gradient('L').resize(PHOTO_SIZE)
+    buffer = BytesIO()
+    Image.merge('RGB', (noise, gradient, gradient.transpose(Image.Transpose.ROTATE_90).resize(PHOTO_SIZE))).save(
+        buffer, 'jpeg', quality=90
+    )
+    return buffer.getvalue()
+
+
+async def save(rendered: list[RenderedImage], directory: Path) -> None:
+    loop = asyncio.get_running_loop()
+    for image in rendered:
+        path = directory / f'{uuid.uuid4()}.{image.rendition.extension}'
+        await loop.run_in_executor(None, path.write_bytes, image.data)
+
+
+async def threads(image: bytes, directory: Path) -> None:
+    # the previous path: Pillow in the threads of the API process
+    rendered = await asyncio.get_running_loop().run_in_executor(None, render_recipe_cover, image, RENDITIONS)
+    await save(rendered, directory)
+
+
+def process_pool_upload(pool: BoundedProcessPool) -> Callable[[bytes, Path], Awaitable[None]]:
+    async def upload(image: bytes, directory: Path) -> None:
+        await save(await pool.run(render_recipe_cover, image, RENDITIONS), directory)
+
+    return upload
+
+
+async def ticker(lags: list[float]) -> None:
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def run(name: str, upload: Callable[[bytes, Path], Awaitable[None]], image: bytes) -> None:
+    lags: list[float] = []
+    with tempfile.TemporaryDirectory() as directory:
+        tick = asyncio.create_task(ticker(lags))
+        start = time.perf_counter()
+        await asyncio.gather(*(upload(image, Path(directory)) for _ in range(UPLOADS)))
+        elapsed = time.perf_counter() - start
+        tick.cancel()
+
+    print(
+        f'{name:>14}: {UPLOADS} uploads in {elapsed:.2f}s  {UPLOADS / elapsed:.1f} images/s  '
+        f'max event loop lag {max(lags) * 1000:.0f}ms'
+    )
+
+
+async def main() -> None:
+    image = photo()
+    print(f'{UPLOADS} concurrent uploads of a {PHOTO_SIZE[0]}x{PHOTO_SIZE[1]} JPEG ({len(image) // 1024} KiB)')
+    print(f'{len(RENDITIONS)} renditions each')
+    pool = BoundedProcessPool(WORKERS, timeout=60, max_queued=UPLOADS)
+    # spawn the workers before measuring
+    await asyncio.gather(*(pool.run(time.sleep, 0) for _ in range(WORKERS)))
+    try:
+        await run('thread pool', threads, image)
+        await run(f'{WORKERS} processes', process_pool_upload(pool), image)
+    finally:
+        pool.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+# ruff: noqa: T201, INP001
+
+# Compares the size and encode/decode time of the signed binary pagination cursor
+# against the previous base64 encoded pydantic JSON cursor.
+#
+# uv run python scripts/bench-cursor.py
+
+import base64
+import datetime
+import timeit
+import uuid
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from tso_api.cursor import CursorCodec, PageCursor
+from tso_api.models.query_params import SortOrder
+
+ITERATIONS = 100_000
+
+
+class CursorStructure(BaseModel):
+    model_config = ConfigDict(validate_by_alias=True, validate_by_name=True)
+    last_value: str | datetime.datetime | int | float = Field(alias='l')
+    sort_order: SortOrder = Field(alias='o')
+    sort_field: str = Field(alias='f')
+    last_id: uuid.UUID = Field(alias='i')
+
+
+def pydantic_encode(cursor: PageCursor) -> str:
+    struct = CursorStructure.model_validate(
+        {
+            'last_value': cursor.last_value,
+            'sort_order': cursor.sort_order,
+            'sort_field': cursor.sort_field,
+            'last_id': cursor.last_id,
+        }
+    )
+    return base64.urlsafe_b64encode(struct.model_dump_json(by_alias=True).encode('utf-8')).decode('utf-8')
+
+
+def pydantic_decode(token: str) -> CursorStructure:
+    return CursorStructure.model_validate_json(base64.urlsafe_b64decode(token).decode('utf-8'))
+
+
+def main() -> None:
+    codec = CursorCodec(b'bench-secret-key')
+    cursors = {
+        'created_at': PageCursor(datetime.datetime.now(datetime.UTC), SortOrder.DESC, 'created_at', uuid.uuid4()),
+        'title': PageCursor('Spaghetti aglio e olio', SortOrder.ASC, 'title', uuid.uuid4()),
+    }
+
+    for name, cursor in cursors.items():
+        pydantic_token = pydantic_encode(cursor)
+        binary_token = codec.encode(cursor)
+        print(f'{name}: {len(pydantic_token)} bytes (pydantic json) vs {len(binary_token)} bytes (binary)')
+
+        for label, encode, decode, token in (
+            ('pydantic json', pydantic_encode, pydantic_decode, pydantic_token),
+            ('binary', codec.encode, codec.decode, binary_token),
+        ):
+            encode_us = timeit.timeit(lambda: encode(cursor), number=ITERATIONS) / ITERATIONS * 1e6  # noqa: B023
+            decode_us = timeit.timeit(lambda: decode(token), number=ITERATIONS) / ITERATIONS * 1e6  # noqa: B023
+            print(f'  {label:>14}: encode {encode_us:.2f}us  decode {decode_us:.2f}us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+# ruff: noqa: T201, INP001
+
+# Compares the latency of the five hottest queries with prepared statements disabled against
+# preparing them on their first execution, which saves Postgres parsing and planning them on every request.
+#
+# Runs against a migrated database from the project environment:
+# DATABASE_URL=postgresql://... uv run python scripts/bench-prepared-statements.py
+
+import asyncio
+import os
+import statistics
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+
+from psycopg import AsyncConnection, AsyncCursor
+from psycopg.rows import DictRow, dict_row
+
+from tso_api.models.query_params import RecipeSortField, SortOrder
+from tso_api.models.recipe import RecipeCreate
+from tso_api.repository import (
+    collection_repository,
+    ingredient_repository,
+    instruction_repository,
+    recipe_repository,
+    shopping_list_repository,
+    user_repository,
+)
+
+ITERATIONS = int(os.environ.get('BENCH_ITERATIONS', '1000'))
+
+
+class Fixture:
+    user_id: uuid.UUID
+    subject: str
+    recipe_id: uuid.UUID
+    list_id: uuid.UUID
+
+
+async def setup(conn: AsyncConnection[DictRow]) -> Fixture:
+    fixture = Fixture()
+    fixture.subject = str(uuid.uuid4())
+    async with conn.transaction(), conn.cursor() as cur:
+        user = await user_repository.create_user(fixture.subject, 'bench', None, cur)
+        fixture.user_id = user['id']
+        collection = await collection_repository.new_collection('bench', cur)
+        await collection_repository.add_collection_owner(collection['id'], fixture.user_id, cur)
+
+    async with conn.transaction(), conn.cursor() as cur:
+        await cur.execute('SELECT tso.set_session_context(%s)', (fixture.user_id,))
+        for i in range(100):
+            recipe = await recipe_repository.create_recipe(
+                RecipeCreate(title=f'recipe {i}'), collection['id'], fixture.user_id, cur
+            )
+            await ingredient_repository.insert_ingredients([(f'{j} g flour', j) for j in range(10)], recipe['id'], cur)
+            await instruction_repository.insert_instructions([(f'step {j}', j) for j in range(10)], recipe['id'], cur)
+        fixture.recipe_id = recipe['id']
+        shopping_list = await shopping_list_repository.create_list('bench', collection['id'], cur)
+        fixture.list_id = shopping_list['id']
+        for i in range(20):
+            await shopping_list_repository.add_entry_to_list(f'entry {i}', fixture.list_id, cur)
+
+    return fixture
+
+
+def queries(fixture: Fixture) -> dict[str, Callable[[AsyncCursor[DictRow]], Awaitable[object]]]:
+    return {
+        'set_session_context': lambda cur: cur.execute(
+            'SELECT tso.set_session_context(%s)', (fixture.user_id,), prepare=True
+        ),
+        'get_user': lambda cur: user_repository.get_user(fixture.subject, 'bench', cur),
+        'get_recipe_by_id': lambda cur: recipe_repository.get_recipe_by_id(fixture.recipe_id, cur),
+        'get_recipes_light_by_owner': lambda cur: recipe_repository.get_recipes_light_by_owner(
+            cur, 50, RecipeSortField.CREATED_AT, SortOrder.DESC
+        ),
+        'get_list': lambda cur: shopping_list_repository.get_list(fixture.list_id, cur),
+    }
+
+
+async def run(
+    conn: AsyncConnection[DictRow], fixture: Fixture, query: Callable[[AsyncCursor[DictRow]], Awaitable[object]]
+):
+    timings: list[float] = []
+    async with conn.transaction(), conn.cursor() as cur:
+        await cur.execute('SELECT tso.set_session_context(%s)', (fixture.user_id,))
+        for _ in range(ITERATIONS):
+            start = time.perf_counter()
+            await query(cur)
+            timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+async def main() -> None:
+    unprepared = await AsyncConnection.connect(os.environ['DATABASE_URL'], row_factory=dict_row, prepare_threshold=None)
+    prepared = await AsyncConnection.connect(os.environ['DATABASE_URL'], row_factory=dict_row)
+    fixture = await setup(prepared)
+
+    print(f'{ITERATIONS} executions per query')
+    for name, query in queries(fixture).items():
+        unprepared_ms = statistics.mean(await run(unprepared, fixture, query)) * 1000
+        prepared_ms = statistics.mean(await run(prepared, fixture, query)) * 1000
+        print(
+            f'{name:>28}: unprepared {unprepared_ms:.3f}ms  prepared {prepared_ms:.3f}ms  '
+            f'({(1 - prepared_ms / unprepared_ms) * 100:.0f}% faster)'
+        )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+# ruff: noqa: T201, INP001
+
+# Measures get_recipe_by_id latency while a collection grows, with the EXISTS based ingredient/instruction
+# policies and with the previous policies that compared against the ids of every visible recipe.
+#
+# Runs against a migrated database from the project environment:
+# DATABASE_URL=postgresql://... uv run python scripts/bench-recipe-by-id.py
+
+import asyncio
+import os
+import random
+import statistics
+import time
+import uuid
+
+from psycopg import AsyncConnection
+from psycopg.rows import DictRow, dict_row
+
+from tso_api.repository import collection_repository, recipe_repository
+
+SIZES = [100, 1_000, 10_000, 50_000]
+LINES_PER_RECIPE = 8
+ITERATIONS = int(os.environ.get('BENCH_ITERATIONS', '200'))
+
+POPULATE = """
+WITH new_recipes AS (
+    INSERT INTO tso.recipe (id, collection_id, created_by, title, note)
+    SELECT gen_random_uuid(), %(collection_id)s, %(user_id)s, 'recipe ' || g, ''
+    FROM generate_series(1, %(n)s) g
+    RETURNING id
+),
+new_ingredients AS (
+    INSERT INTO tso.ingredient (id, recipe_id, text, position)
+    SELECT gen_random_uuid(), r.id, 'ingredient ' || p, p FROM new_recipes r, generate_series(0, %(lines)s - 1) p
+)
+INSERT INTO tso.instruction (id, recipe_id, text, position)
+SELECT gen_random_uuid(), r.id, 'instruction ' || p, p FROM new_recipes r, generate_series(0, %(lines)s - 1) p
+"""
+
+LEGACY_POLICIES = """
+CREATE FUNCTION tso.get_recipes_for_user() RETURNS TABLE(recipe_id UUID)
+AS $$ SELECT DISTINCT id FROM tso.recipe $$
+LANGUAGE sql
+SECURITY INVOKER
+STABLE
+SET search_path = tso;
+
+DROP POLICY allow_for_recipe_access ON tso.instruction;
+CREATE POLICY allow_for_recipe_access ON tso.instruction
+FOR ALL
+USING(recipe_id IN (SELECT recipe_id FROM tso.get_recipes_for_user()));
+
+DROP POLICY allow_for_recipe_access ON tso.ingredient;
+CREATE POLICY allow_for_recipe_access ON tso.ingredient
+FOR ALL
+USING(recipe_id IN (SELECT recipe_id FROM tso.get_recipes_for_user()));
+"""
+
+
+async def measure(conn: AsyncConnection[DictRow], user_id: uuid.UUID, recipe_ids: list[uuid.UUID]) -> list[float]:
+    timings: list[float] = []
+    for _ in range(ITERATIONS):
+        recipe_id = random.choice(recipe_ids)  # noqa: S311
+        start = time.perf_counter()
+        async with conn.transaction(), conn.cursor() as cur:
+            await cur.execute('SELECT tso.set_session_context(%s)', (user_id,))
+            recipe = await recipe_repository.get_recipe_by_id(recipe_id, cur)
+        timings.append(time.perf_counter() - start)
+        if recipe is None or len(recipe['ingredients']) != LINES_PER_RECIPE:
+            msg = f'recipe {recipe_id} was not returned with all of its ingredients'
+            raise RuntimeError(msg)
+
+    return timings
+
+
+def report(name: str, timings: list[float]) -> None:
+    timings_ms = sorted(t * 1000 for t in timings)
+    print(f'{name:>18}: mean {statistics.mean(timings_ms):8.2f}ms  p50 {statistics.median(timings_ms):8.2f}ms')
+
+
+async def main() -> None:
+    conn = await AsyncConnection.connect(os.environ['DATABASE_URL'], row_factory=dict_row, autocommit=True)
+
+    user_id = uuid.uuid4()
+    async with conn.transaction(), conn.cursor() as cur:
+        await cur.execute(
+            'INSERT INTO tso.account (id, subject, issuer) VALUES (%s, %s, %s)', (user_id, str(user_id), 'bench')
+        )
+        collection = await collection_repository.new_collection('bench', cur)
+        await collection_repository.add_collection_owner(collection['id'], user_id, cur)
+
+    size = 0
+    for target_size in SIZES:
+        await conn.execute(
+            POPULATE,
+            {'collection_id': collection['id'], 'user_id': user_id, 'n': target_size - size, 'lines': LINES_PER_RECIPE},
+        )
+        size = target_size
+        await conn.execute('ANALYZE tso.recipe, tso.ingredient, tso.instruction')
+        res = await conn.execute('SELECT id FROM tso.recipe WHERE collection_id = %s', (collection['id'],))
+        recipe_ids = [row['id'] for row in await res.fetchall()]
+
+        print(f'{size} recipes')
+        report('exists policy', await measure(conn, user_id, recipe_ids))
+        async with conn.transaction(force_rollback=True):
+            await conn.execute(LEGACY_POLICIES)
+            report('legacy policy', await measure(conn, user_id, recipe_ids))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
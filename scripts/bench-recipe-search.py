@@ -0,0 +1,105 @@
+# ruff: noqa: T201, INP001
+
+# Measures recipe search latency over a collection of synthetic recipes, once with the GIN indexes
+# on tso.recipe.search_vector / tso.ingredient.search_vector and once with index scans disabled.
+#
+# Runs against a migrated database from the project environment:
+# DATABASE_URL=postgresql://... uv run python scripts/bench-recipe-search.py
+
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+from psycopg import AsyncConnection
+from psycopg.rows import DictRow, dict_row
+
+from tso_api.repository import collection_repository, recipe_repository
+
+RECIPES = int(os.environ.get('BENCH_RECIPES', '100000'))
+INGREDIENTS_PER_RECIPE = int(os.environ.get('BENCH_INGREDIENTS', '8'))
+ITERATIONS = int(os.environ.get('BENCH_ITERATIONS', '50'))
+SEARCHES = ['lasagne', 'crème fraîche', 'chicken rice', 'zucchini', 'not-a-word-in-any-recipe']
+
+# builds titles, notes and ingredients from a small vocabulary so that searches hit a realistic share of rows
+POPULATE = """
+WITH words AS (
+    SELECT ARRAY['lasagne', 'soup', 'salad', 'chicken', 'rice', 'crème', 'fraîche', 'zucchini', 'curry', 'bread',
+                 'tomato', 'garlic', 'onion', 'pasta', 'beans', 'lentil', 'potato', 'cake', 'apple', 'cheese'] AS w
+)
+INSERT INTO tso.recipe (id, collection_id, created_by, title, note)
+SELECT
+    gen_random_uuid(),
+    %(collection_id)s,
+    %(user_id)s,
+    w[1 + (random() * 19)::int] || ' ' || w[1 + (random() * 19)::int] || ' ' || g,
+    w[1 + (random() * 19)::int] || ' with ' || w[1 + (random() * 19)::int]
+FROM generate_series(1, %(recipes)s) g, words
+"""
+
+POPULATE_INGREDIENTS = """
+WITH words AS (
+    SELECT ARRAY['flour', 'sugar', 'butter', 'milk', 'egg', 'salt', 'pepper', 'oil', 'crème fraîche', 'rice',
+                 'chicken', 'zucchini', 'garlic', 'onion', 'tomato', 'basil', 'parsley', 'lemon', 'water', 'yeast'] AS w
+)
+INSERT INTO tso.ingredient (id, recipe_id, text, position)
+SELECT gen_random_uuid(), r.id, (1 + (random() * 500)::int) || 'g ' || w[1 + (random() * 19)::int], p
+FROM tso.recipe r, generate_series(0, %(ingredients)s - 1) p, words
+WHERE r.collection_id = %(collection_id)s
+"""
+
+
+async def run(conn: AsyncConnection[DictRow], user_id: uuid.UUID, search: str, *, use_index: bool) -> list[float]:
+    timings: list[float] = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        async with conn.transaction(), conn.cursor() as cur:
+            await cur.execute('SELECT tso.set_session_context(%s)', (user_id,))
+            if not use_index:
+                await cur.execute('SET LOCAL enable_bitmapscan = off')
+                await cur.execute('SET LOCAL enable_indexscan = off')
+            await recipe_repository.get_recipes_light_by_owner(cur, 50, search=search)
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def report(name: str, timings: list[float]) -> None:
+    timings_ms = sorted(t * 1000 for t in timings)
+    print(
+        f'{name:>40}: mean {statistics.mean(timings_ms):8.2f}ms  p50 {statistics.median(timings_ms):8.2f}ms  '
+        f'p95 {timings_ms[int(len(timings_ms) * 0.95)]:8.2f}ms'
+    )
+
+
+async def main() -> None:
+    conn = await AsyncConnection.connect(os.environ['DATABASE_URL'], row_factory=dict_row)
+
+    user_id = uuid.uuid4()
+    async with conn.transaction(), conn.cursor() as cur:
+        await cur.execute(
+            'INSERT INTO tso.account (id, subject, issuer) VALUES (%s, %s, %s)', (user_id, str(user_id), 'bench')
+        )
+        collection = await collection_repository.new_collection('bench', cur)
+        await collection_repository.add_collection_owner(collection['id'], user_id, cur)
+        params = {
+            'collection_id': collection['id'],
+            'user_id': user_id,
+            'recipes': RECIPES,
+            'ingredients': INGREDIENTS_PER_RECIPE,
+        }
+        await cur.execute(POPULATE, params)
+        await cur.execute(POPULATE_INGREDIENTS, params)
+
+    await conn.execute('ANALYZE tso.recipe')
+    await conn.execute('ANALYZE tso.ingredient')
+
+    print(f'{RECIPES} recipes, {INGREDIENTS_PER_RECIPE} ingredients each, {ITERATIONS} searches per term')
+    for search in SEARCHES:
+        report(f'{search!r} (index)', await run(conn, user_id, search, use_index=True))
+        report(f'{search!r} (no index)', await run(conn, user_id, search, use_index=False))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
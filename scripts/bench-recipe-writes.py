@@ -0,0 +1,97 @@
+# ruff: noqa: T201, INP001
+
+# Compares writing the ingredients and instructions of a recipe one statement per line
+# against the set-based repository functions.
+#
+# Runs against a migrated database from the project environment:
+# DATABASE_URL=postgresql://... uv run python scripts/bench-recipe-writes.py
+
+import asyncio
+import os
+import statistics
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from psycopg import AsyncConnection, AsyncCursor
+from psycopg.rows import DictRow, dict_row
+
+from tso_api.models.recipe import RecipeCreate
+from tso_api.repository import collection_repository, ingredient_repository, instruction_repository, recipe_repository
+
+ITERATIONS = int(os.environ.get('BENCH_ITERATIONS', '200'))
+INGREDIENTS = [f'{i} g ingredient number {i}' for i in range(25)]
+INSTRUCTIONS = [f'step {i}: do something with the ingredients for a while' for i in range(15)]
+
+
+class CountingCursor(AsyncCursor[DictRow]):
+    statements = 0
+
+    async def execute(self, *args: Any, **kwargs: Any):  # noqa: ANN401
+        CountingCursor.statements += 1
+        return await super().execute(*args, **kwargs)
+
+
+async def per_line(recipe_id: uuid.UUID, cur: AsyncCursor[DictRow]) -> None:
+    for position, ingredient in enumerate(INGREDIENTS):
+        await ingredient_repository.insert_ingredient(ingredient, position, recipe_id, cur)
+    for position, instruction in enumerate(INSTRUCTIONS):
+        await instruction_repository.insert_instruction(instruction, position, recipe_id, cur)
+
+
+async def set_based(recipe_id: uuid.UUID, cur: AsyncCursor[DictRow]) -> None:
+    await ingredient_repository.insert_ingredients(
+        [(ingredient, position) for position, ingredient in enumerate(INGREDIENTS)], recipe_id, cur
+    )
+    await instruction_repository.insert_instructions(
+        [(instruction, position) for position, instruction in enumerate(INSTRUCTIONS)], recipe_id, cur
+    )
+
+
+async def run(
+    conn: AsyncConnection[DictRow],
+    user_id: uuid.UUID,
+    collection_id: uuid.UUID,
+    write_lines: Callable[[uuid.UUID, AsyncCursor[DictRow]], Awaitable[None]],
+) -> tuple[list[float], float]:
+    timings: list[float] = []
+    CountingCursor.statements = 0
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        async with conn.transaction(), conn.cursor() as cur:
+            await cur.execute('SELECT tso.set_session_context(%s)', (user_id,))
+            recipe = await recipe_repository.create_recipe(RecipeCreate(title='bench'), collection_id, user_id, cur)
+            await write_lines(recipe['id'], cur)
+        timings.append(time.perf_counter() - start)
+
+    return timings, CountingCursor.statements / ITERATIONS
+
+
+def report(name: str, timings: list[float], statements: float) -> None:
+    timings_ms = sorted(t * 1000 for t in timings)
+    print(
+        f'{name:>10}: {statements:.0f} statements/recipe  '
+        f'mean {statistics.mean(timings_ms):.2f}ms  p50 {statistics.median(timings_ms):.2f}ms'
+    )
+
+
+async def main() -> None:
+    conn = await AsyncConnection.connect(os.environ['DATABASE_URL'], row_factory=dict_row)
+    conn.cursor_factory = CountingCursor
+
+    user_id = uuid.uuid4()
+    async with conn.transaction(), conn.cursor() as cur:
+        await cur.execute(
+            'INSERT INTO tso.account (id, subject, issuer) VALUES (%s, %s, %s)', (user_id, str(user_id), 'bench')
+        )
+        collection = await collection_repository.new_collection('bench', cur)
+        await collection_repository.add_collection_owner(collection['id'], user_id, cur)
+
+    print(f'{len(INGREDIENTS)} ingredients, {len(INSTRUCTIONS)} instructions, {ITERATIONS} recipes')
+    report('per line', *await run(conn, user_id, collection['id'], per_line))
+    report('set based', *await run(conn, user_id, collection['id'], set_based))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
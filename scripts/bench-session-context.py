@@ -0,0 +1,96 @@
+# /// script
+# requires-python = ">=3.13"
+# dependencies = [
+#     "psycopg[binary]",
+# ]
+# ///
+
+# ruff: noqa: T201
+
+# Compares the latency of a service call that sets up the RLS context with two statements
+# (SET ROLE + tso.set_uid) against a single tso.set_session_context call.
+#
+# DATABASE_URL=postgresql://... uv run scripts/bench-session-context.py
+
+import asyncio
+import os
+import statistics
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+
+from psycopg import AsyncConnection, AsyncCursor
+
+ITERATIONS = int(os.environ.get('BENCH_ITERATIONS', '2000'))
+
+
+async def setup(conn: AsyncConnection) -> tuple[uuid.UUID, uuid.UUID]:
+    user_id = uuid.uuid4()
+    collection_id = uuid.uuid4()
+    list_id = uuid.uuid4()
+    entry_id = uuid.uuid4()
+    async with conn.transaction():
+        await conn.execute(
+            'INSERT INTO tso.account (id, subject, issuer) VALUES (%s, %s, %s)', (user_id, str(user_id), 'bench')
+        )
+        await conn.execute('INSERT INTO tso.collection (id, name) VALUES (%s, %s)', (collection_id, 'bench'))
+        await conn.execute('INSERT INTO tso.collection_member VALUES (%s, %s, true)', (collection_id, user_id))
+        await conn.execute(
+            'INSERT INTO tso.shopping_list (id, title, collection_id) VALUES (%s, %s, %s)',
+            (list_id, 'bench', collection_id),
+        )
+        await conn.execute(
+            'INSERT INTO tso.list_entry (id, name, list_id) VALUES (%s, %s, %s)', (entry_id, 'bench', list_id)
+        )
+
+    return user_id, entry_id
+
+
+async def two_statements(cur: AsyncCursor, user_id: uuid.UUID) -> None:
+    await cur.execute('SET LOCAL ROLE tso_api_user')
+    await cur.execute('SELECT tso.set_uid(%s)', (user_id,))
+
+
+async def session_context(cur: AsyncCursor, user_id: uuid.UUID) -> None:
+    await cur.execute('SELECT tso.set_session_context(%s)', (user_id,))
+
+
+async def run(
+    conn: AsyncConnection,
+    user_id: uuid.UUID,
+    entry_id: uuid.UUID,
+    set_context: Callable[[AsyncCursor, uuid.UUID], Awaitable[None]],
+) -> list[float]:
+    timings: list[float] = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        async with conn.transaction(), conn.cursor() as cur:
+            await set_context(cur, user_id)
+            await cur.execute('UPDATE tso.list_entry SET completed_at = now() WHERE id = %s', (entry_id,))
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def report(name: str, timings: list[float]) -> None:
+    timings_ms = sorted(t * 1000 for t in timings)
+    p99 = timings_ms[int(len(timings_ms) * 0.99) - 1]
+    print(
+        f'{name:>20}: mean {statistics.mean(timings_ms):.3f}ms  p50 {statistics.median(timings_ms):.3f}ms  p99 {p99:.3f}ms'
+    )
+
+
+async def main() -> None:
+    conn = await AsyncConnection.connect(os.environ['DATABASE_URL'])
+    user_id, entry_id = await setup(conn)
+
+    # warm up both paths before measuring
+    await run(conn, user_id, entry_id, two_statements)
+    await run(conn, user_id, entry_id, session_context)
+
+    report('SET ROLE + set_uid', await run(conn, user_id, entry_id, two_statements))
+    report('set_session_context', await run(conn, user_id, entry_id, session_context))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
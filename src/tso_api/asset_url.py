@@ -0,0 +1,78 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import binascii
+import hashlib
+import hmac
+import math
+import posixpath
+import time
+from collections.abc import Callable
+from pathlib import Path
+from urllib.parse import quote
+
+from tso_api.exceptions import InvalidAssetUrlError
+
+SIGNATURE_SIZE = 16
+SIGNED_ASSET_PREFIX = '/api/asset/signed'
+# base64.urlsafe_b64encode does the same, calling binascii directly avoids its overhead for every recipe of a page
+_URLSAFE_B64_ENCODE = bytes.maketrans(b'+/', b'-_')
+
+
+class AssetUrlSigner:
+    """
+    Creates URLs of asset files that can be fetched without authentication until they expire, and checks them.
+
+    The URL is `/api/asset/signed/<path relative to data_dir>?expires=<unix time>&signature=<signature>`, the
+    signature is a truncated HMAC-SHA256 over the path and the expiry. Checking it needs neither the database nor the
+    file system, so a lean route, or a proxy with the secret, can serve the file.
+    Expiries are rounded up to a multiple of `ttl`, so the URL of an asset only changes every `ttl` seconds and
+    browsers can cache the file under it, each URL stays valid for at least another `ttl` seconds.
+    """
+
+    def __init__(self, secret_key: bytes, data_dir: Path, ttl: int, clock: Callable[[], float] = time.time) -> None:
+        # a key of its own, so signatures of asset URLs and cursors can't be swapped
+        self._mac = hmac.new(hmac.digest(secret_key, b'asset-url', 'sha256'), digestmod=hashlib.sha256)
+        self.data_dir = data_dir
+        self.ttl = ttl
+        self._clock = clock
+
+    def sign(self, path: Path | str) -> str | None:
+        """Return the signed URL of the asset file at `path`, None if it isn't stored in `data_dir`."""
+        path = Path(path)
+        if not path.is_relative_to(self.data_dir):
+            return None
+
+        relative_path = path.relative_to(self.data_dir).as_posix()
+        expires = (math.floor(self._clock() / self.ttl) + 2) * self.ttl
+        signature = self._sign(relative_path, expires)
+        return f'{SIGNED_ASSET_PREFIX}/{quote(relative_path)}?expires={expires}&signature={signature}'
+
+    def verify(self, relative_path: str, expires: int, signature: str) -> Path:
+        """
+        Return the path of the asset file a signed URL refers to.
+
+        Raises:
+            InvalidAssetUrlError: The signature doesn't match or the URL expired.
+
+        """
+        if not hmac.compare_digest(signature, self._sign(relative_path, expires)):
+            msg = 'signature mismatch'
+            raise InvalidAssetUrlError(msg)
+
+        if expires <= self._clock():
+            msg = 'expired'
+            raise InvalidAssetUrlError(msg)
+
+        # only signed paths get here, this guards against paths that were stored outside of data_dir by mistake
+        if posixpath.isabs(relative_path) or posixpath.normpath(relative_path).startswith('..'):
+            msg = 'path outside of the data directory'
+            raise InvalidAssetUrlError(msg)
+
+        return self.data_dir / relative_path
+
+    def _sign(self, relative_path: str, expires: int) -> str:
+        mac = self._mac.copy()
+        mac.update(f'{relative_path}\0{expires}'.encode())
+        signature = binascii.b2a_base64(mac.digest()[:SIGNATURE_SIZE], newline=False)
+        return signature.translate(_URLSAFE_B64_ENCODE).rstrip(b'=').decode('ascii')
@@ -1,19 +1,27 @@
 # Copyright 2025 Marius Meschter
 # SPDX-License-Identifier: AGPL-3.0-only
 
-from functools import cached_property
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import time
 from typing import Annotated
 
 import httpx
 import jwt
 from fastapi import Depends
 from fastapi.security import OpenIdConnect
-from jwt import ExpiredSignatureError, InvalidKeyError, InvalidTokenError, PyJWKClient
-from pydantic import BaseModel, Field, HttpUrl
+from jwt import ExpiredSignatureError, InvalidKeyError, InvalidTokenError, PyJWK, PyJWKSet, PyJWKSetError
+from pydantic import BaseModel, Field, HttpUrl, ValidationError
 
 from tso_api import config
+from tso_api.cache import TTLCache
 from tso_api.exceptions import AuthenticationError
 
+logger = logging.getLogger(__name__)
+
 
 class OIDCWellKnown(BaseModel):
     issuer: str
@@ -31,37 +39,169 @@ class JWT(BaseModel):
 
 
 AUTHORIZATION_HEADER_PARTS = 2
+# upper bound for how long a verified token is cached, tokens are evicted earlier when they expire
+VERIFIED_TOKEN_MAX_TTL = 3600
+# the identity provider is unreachable or answered with something that isn't an OpenID configuration or a JWKS
+IDP_ERRORS = (httpx.HTTPError, PyJWKSetError, ValidationError, json.JSONDecodeError)
 
 
 oidc_scheme = OpenIdConnect(openIdConnectUrl=str(config.get_settings().oidc_well_known))
 
 
+class JWKSKeyStore:
+    """
+    Holds the signing keys of the identity provider.
+
+    The keys are refreshed periodically in a background task. If a token references an unknown `kid`
+    the keys are refetched immediately (at most once every `min_refresh_interval` seconds),
+    concurrent requests for unknown keys share a single fetch.
+    """
+
+    jwks_uri: str
+    http_client: httpx.AsyncClient
+    refresh_interval: float
+    min_refresh_interval: float
+
+    def __init__(
+        self,
+        jwks_uri: str,
+        http_client: httpx.AsyncClient,
+        refresh_interval: float = 3600,
+        min_refresh_interval: float = 30,
+    ) -> None:
+        self.jwks_uri = jwks_uri
+        self.http_client = http_client
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self._keys: dict[str, PyJWK] = {}
+        self._last_refresh: float | None = None
+        self._lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task[None] | None = None
+
+    async def refresh(self) -> None:
+        res = await self.http_client.get(self.jwks_uri)
+        res.raise_for_status()
+
+        jwk_set = PyJWKSet.from_dict(res.json())
+        self._keys = {key.key_id: key for key in jwk_set.keys if key.key_id is not None}
+        self._last_refresh = time.monotonic()
+
+    async def get_signing_key(self, kid: str) -> PyJWK:
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        async with self._lock:
+            key = self._keys.get(kid)
+            if key is None and self._may_refresh():
+                try:
+                    await self.refresh()
+                except IDP_ERRORS as e:
+                    msg = f'failed to refresh JWKS: {e}'
+                    raise InvalidKeyError(msg) from e
+                key = self._keys.get(kid)
+
+        if key is None:
+            msg = f'unknown signing key: {kid}'
+            raise InvalidKeyError(msg)
+
+        return key
+
+    def _may_refresh(self) -> bool:
+        return self._last_refresh is None or time.monotonic() - self._last_refresh >= self.min_refresh_interval
+
+    def start(self) -> None:
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_periodically())
+
+    async def close(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._refresh_task
+            self._refresh_task = None
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                async with self._lock:
+                    await self.refresh()
+            except IDP_ERRORS:
+                logger.exception('failed to refresh JWKS from %s', self.jwks_uri)
+
+
 class OIDCAuth:
     well_known_url: str
-    http_client: httpx.Client
+    http_client: httpx.AsyncClient
     audience: str
-    jwks_client: PyJWKClient
+    jwks_min_refresh_interval: float
+    token_cache: TTLCache[bytes, JWT]
 
-    def __init__(self, well_known_url: str, audience: str = 'tso-api') -> None:
+    def __init__(
+        self,
+        well_known_url: str,
+        http_client: httpx.AsyncClient,
+        audience: str = 'tso-api',
+        token_cache_size: int = 10_000,
+        jwks_min_refresh_interval: float = 30,
+    ) -> None:
         self.well_known_url = well_known_url
-        self.http_client = httpx.Client(headers={'user-agent': 'tso-api / 0.1.0'})
+        self.jwks_min_refresh_interval = jwks_min_refresh_interval
+        self.http_client = http_client
         self.audience = audience
+        # entries expire at the token's `exp`, which is wall clock time
+        self.token_cache = TTLCache(token_cache_size, VERIFIED_TOKEN_MAX_TTL, time.time)
+
+        self._well_known: OIDCWellKnown | None = None
+        self._jwks: JWKSKeyStore | None = None
+        self._load_lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        """Fetch the OpenID configuration and signing keys and start refreshing the keys in the background."""
+        jwks = await self._load()
+        jwks.start()
+
+    async def close(self) -> None:
+        if self._jwks is not None:
+            await self._jwks.close()
+
+    async def _load(self) -> JWKSKeyStore:
+        if self._jwks is not None:
+            return self._jwks
+
+        async with self._load_lock:
+            if self._jwks is None:
+                res = await self.http_client.get(self.well_known_url)
+                res.raise_for_status()
+                well_known = OIDCWellKnown.model_validate(res.json())
+
+                jwks = JWKSKeyStore(
+                    str(well_known.jwks_uri),
+                    self.http_client,
+                    refresh_interval=config.get_settings().jwks_refresh_interval,
+                    min_refresh_interval=self.jwks_min_refresh_interval,
+                )
+                await jwks.refresh()
+
+                self._well_known = well_known
+                self._jwks = jwks
 
-        self.jwks_client = PyJWKClient(str(self.well_known.jwks_uri), headers={'user-agent': 'tso-api / 0.1.0'})
-        self.jwks_client.fetch_data()
+        return self._jwks
 
-    @cached_property
+    @property
     def well_known(self) -> OIDCWellKnown:
-        res = self.http_client.get(self.well_known_url)
-        res.raise_for_status()
+        if self._well_known is None:
+            msg = 'OIDC configuration has not been loaded yet'
+            raise RuntimeError(msg)
 
-        return OIDCWellKnown.model_validate(res.json())
+        return self._well_known
 
     @property
     def issuer(self) -> str:
         return self.well_known.issuer
 
-    def __call__(self, authorization: Annotated[str, Depends(oidc_scheme)]) -> JWT:
+    async def __call__(self, authorization: Annotated[str, Depends(oidc_scheme)]) -> JWT:
         split = authorization.split(' ', 1)
         if len(split) != AUTHORIZATION_HEADER_PARTS:
             msg = 'invalid authorization header'
@@ -72,8 +212,23 @@ class OIDCAuth:
             raise AuthenticationError(msg)
 
         token = split[1]
+        token_hash = hashlib.sha256(token.encode()).digest()
+        cached_jwt = self.token_cache.get(token_hash)
+        if cached_jwt is not None:
+            return cached_jwt
+
         try:
-            signing_key = self.jwks_client.get_signing_key_from_jwt(token)
+            jwks = await self._load()
+        except IDP_ERRORS as e:
+            raise AuthenticationError(str(e), 'invalid_token', 'failed to load signing keys') from None
+
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+            if not isinstance(kid, str):
+                msg = 'token has no kid header'
+                raise InvalidKeyError(msg)  # noqa: TRY301
+
+            signing_key = await jwks.get_signing_key(kid)
             verified_jwt = jwt.decode(
                 token,
                 signing_key,
@@ -95,4 +250,7 @@ class OIDCAuth:
         except InvalidTokenError as e:
             raise AuthenticationError(str(e), 'invalid_token', 'token invalid') from None
 
-        return JWT.model_validate(verified_jwt)
+        verified = JWT.model_validate(verified_jwt)
+        self.token_cache.set(token_hash, verified, expires_at=float(verified_jwt['exp']))
+
+        return verified
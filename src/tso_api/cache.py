@@ -0,0 +1,90 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+
+from tso_api.models.base import TSOBase
+
+
+class CacheStats(TSOBase):
+    size: int
+    max_size: int
+    hits: int
+    misses: int
+    evictions: int
+
+
+class TTLCache[K: Hashable, V]:
+    """
+    A bounded in-process LRU cache whose entries expire after `ttl` seconds.
+
+    Entries can also be given an explicit absolute expiry (in `clock` time) when they are set,
+    which takes precedence over the default `ttl` if it is earlier.
+    The cache is not thread-safe, it is meant to be used from a single event loop.
+    """
+
+    max_size: int
+    ttl: float
+    hits: int
+    misses: int
+    evictions: int
+
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._clock = clock
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: K) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V, expires_at: float | None = None) -> None:
+        if self.max_size <= 0:
+            return
+
+        default_expires_at = self._clock() + self.ttl
+        if expires_at is None or expires_at > default_expires_at:
+            expires_at = default_expires_at
+
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: K) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            size=len(self._entries),
+            max_size=self.max_size,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+        )
@@ -3,17 +3,84 @@
 
 from functools import cache
 
-from pydantic import DirectoryPath, HttpUrl, PostgresDsn
+from pydantic import DirectoryPath, HttpUrl, PostgresDsn, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from tso_api.service.image_processing import DEFAULT_COVER_RENDITIONS, ImageRendition
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file='.env', extra='ignore')
     database_url: PostgresDsn
     oidc_well_known: HttpUrl
     data_dir: DirectoryPath
+    # signs values handed out to clients (pagination cursors), has to be the same for all workers
+    secret_key: SecretStr
     enable_openapi: bool = True
+    enable_internal_endpoints: bool = False
     http_scraper_user_agent: str = 'tso-api / 0.1.0'
+    # all outgoing requests share pooled HTTP/2 clients, http_max_connections_per_host caps the concurrent requests
+    # to one site so imports don't overload it
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30
+    http_max_connections_per_host: int = 4
+    # imported recipe pages are parsed in worker processes, per uvicorn worker
+    recipe_parse_workers: int = 2
+    recipe_parse_timeout: float = 10
+    # cover images are decoded, resized and encoded in image_workers worker processes, per uvicorn worker, at most
+    # image_max_queued images wait for a free worker, further uploads are answered with 503
+    image_workers: int = 2
+    image_timeout: float = 30
+    image_max_queued: int = 50
+    # the widths and formats cover images are stored in besides the 800px cover and 400px thumbnail, as JSON, e.g.
+    # [{"width": 96, "format": "AVIF", "quality": 60}], formats the installed Pillow can't encode are skipped
+    cover_renditions: list[ImageRendition] = list(DEFAULT_COVER_RENDITIONS)
+    # assets a user fetched in the last asset_cache_ttl seconds are revalidated (If-None-Match) without a query
+    asset_cache_size: int = 10_000
+    asset_cache_ttl: float = 300
+    # recipes link their cover images with URLs that work without authentication for asset_url_ttl to
+    # 2 * asset_url_ttl seconds, with asset_accel_redirect set (an internal nginx location serving data_dir) the
+    # files of these URLs are sent by nginx
+    asset_url_ttl: int = 3600
+    asset_accel_redirect: str | None = None
+    # asset files are stored once per content, the files nothing refers to any more for blob_gc_grace seconds are
+    # deleted every blob_gc_interval seconds, the grace should outlast signed asset URLs (2 * asset_url_ttl)
+    blob_gc_interval: float = 3600
+    blob_gc_grace: float = 3 * 3600
+    # asset files are read, written and deleted in a thread pool of this size, separate from the default executor,
+    # data_dir on network storage needs more threads than a local disk
+    storage_io_threads: int = 8
+    # bulk imports fetch this many pages at once, at most http_max_connections_per_host of them from the same site,
+    # and save the recipes in transactions of import_batch_size
+    import_concurrency: int = 10
+    import_batch_size: int = 20
+    # cover images of imported recipes that are larger than this are skipped
+    import_max_image_size: int = 20 * 1024 * 1024
+    # fetched recipe pages and the recipes parsed from them are shared by all imports, a page is used as is for
+    # page_cache_ttl seconds and revalidated with the site after that, the least recently used pages are evicted once
+    # their recipes take up more than page_cache_max_size bytes
+    page_cache_ttl: float = 86400
+    page_cache_max_size: int = 512 * 1024 * 1024
+    # queued imports are processed by import_workers background workers in every uvicorn worker, a job that isn't
+    # finished after import_job_lease seconds (the process died) is picked up again
+    import_workers: int = 2
+    import_poll_interval: float = 1
+    import_max_attempts: int = 3
+    import_job_lease: float = 300
+    identity_cache_size: int = 10_000
+    identity_cache_ttl: float = 300
+    token_cache_size: int = 10_000
+    jwks_refresh_interval: float = 3600
+    # every uvicorn worker has its own pool, workers * db_pool_max_size must stay below postgres' max_connections
+    db_pool_min_size: int = 2
+    db_pool_max_size: int = 10
+    db_pool_max_idle: float = 600
+    db_pool_max_lifetime: float = 3600
+    db_pool_timeout: float = 5
+    # queries are prepared on the server after this many executions on a connection (the hot queries right away),
+    # None disables prepared statements, e.g. behind a transaction pooling pgbouncer
+    db_prepare_threshold: int | None = 5
 
 
 settings = Settings()  # pyright: ignore [reportCallIssue]
@@ -6,17 +6,30 @@ from functools import cache
 from psycopg_pool import AsyncConnectionPool
 
 from tso_api import config
-from tso_api.config import settings
 
-db_pool = AsyncConnectionPool(str(settings.database_url), open=False)
+
+@cache
+def db_pool_fn():
+    """Return the connection pool shared by the whole process."""
+    settings = config.get_settings()
+    return AsyncConnectionPool(
+        str(settings.database_url),
+        min_size=settings.db_pool_min_size,
+        max_size=settings.db_pool_max_size,
+        max_idle=settings.db_pool_max_idle,
+        max_lifetime=settings.db_pool_max_lifetime,
+        timeout=settings.db_pool_timeout,
+        kwargs={'prepare_threshold': settings.db_prepare_threshold},
+        name='tso-api',
+        open=False,
+    )
 
 
 async def get_connection():
-    async with db_pool.connection(5) as conn:
+    async with db_pool_fn().connection() as conn:
         await conn.set_autocommit(True)
-        yield conn
-
-
-@cache
-def db_pool_fn():
-    return AsyncConnectionPool(str(config.get_settings().database_url), open=False)
+        try:
+            yield conn
+        finally:
+            # the pool is shared with the services, they expect connections in transaction mode
+            await conn.set_autocommit(False)
@@ -4,35 +4,77 @@
 
 from functools import cache
 from typing import Annotated, Any
+from uuid import UUID
 
-from fastapi import Depends
-from psycopg import AsyncConnection
+from fastapi import Depends, Header, Query
 from psycopg_pool import AsyncConnectionPool
 
 from tso_api import config
+from tso_api.asset_url import AssetUrlSigner
 from tso_api.auth import JWT, OIDCAuth
 from tso_api.config import get_settings
-from tso_api.db import db_pool_fn, get_connection
-from tso_api.models.query_params import BaseSort, CursorPagination, RecipeQueryParams, RecipeSortField, SortOrder
+from tso_api.cursor import CursorCodec
+from tso_api.db import db_pool_fn
+from tso_api.http_client import HttpClients
+from tso_api.models.query_params import (
+    AssetNegotiation,
+    BaseSort,
+    CursorPagination,
+    RecipeQueryParams,
+    RecipeSortField,
+    SortOrder,
+)
 from tso_api.models.user import User
+from tso_api.process_pool import BoundedProcessPool
+from tso_api.service.blob_store import BlobStore
 from tso_api.service.collection_service import CollectionService
+from tso_api.service.import_job_service import ImportJobService
+from tso_api.service.page_cache import PageCache
 from tso_api.service.recipe_asset import RecipeAssetService
 from tso_api.service.recipe_import_service import RecipeImportService
 from tso_api.service.recipe_service import RecipeService
 from tso_api.service.shopping_list_service import ShoppingListService
 from tso_api.service.user_service import UserService
+from tso_api.storage import FileStorage
 
-DBConn = Annotated[AsyncConnection, Depends(get_connection)]
+
+@cache
+def get_asset_url_signer():
+    settings = config.get_settings()
+    return AssetUrlSigner(settings.secret_key.get_secret_value().encode(), settings.data_dir, settings.asset_url_ttl)
+
+
+AssetUrlSignerDep = Annotated[AssetUrlSigner, Depends(get_asset_url_signer)]
 
 
 @cache
-def get_recipe_service(db_pool_fn: Annotated[AsyncConnectionPool[Any], Depends(db_pool_fn)]):
-    return RecipeService(db_pool_fn)
+def get_recipe_service(
+    db_pool_fn: Annotated[AsyncConnectionPool[Any], Depends(db_pool_fn)], asset_url_signer: AssetUrlSignerDep
+):
+    return RecipeService(
+        db_pool_fn,
+        CursorCodec(config.get_settings().secret_key.get_secret_value().encode()),
+        asset_url_signer=asset_url_signer,
+    )
 
 
 @cache
-def get_recipe_asset_service(db_pool_fn: Annotated[AsyncConnectionPool[Any], Depends(db_pool_fn)]):
-    return RecipeAssetService(db_pool_fn)
+def get_blob_store(db_pool_fn: Annotated[AsyncConnectionPool[Any], Depends(db_pool_fn)]):
+    settings = config.get_settings()
+    return BlobStore(
+        db_pool_fn, storage, settings.data_dir, gc_interval=settings.blob_gc_interval, gc_grace=settings.blob_gc_grace
+    )
+
+
+BlobStoreDep = Annotated[BlobStore, Depends(get_blob_store)]
+
+
+@cache
+def get_recipe_asset_service(
+    db_pool_fn: Annotated[AsyncConnectionPool[Any], Depends(db_pool_fn)], blob_store: BlobStoreDep
+):
+    settings = config.get_settings()
+    return RecipeAssetService(db_pool_fn, image_pool, blob_store, settings.asset_cache_size, settings.asset_cache_ttl)
 
 
 @cache
@@ -42,7 +84,8 @@ def get_collection_service(db_pool_fn: Annotated[AsyncConnectionPool[Any], Depen
 
 @cache
 def get_user_service(db_pool_fn: Annotated[AsyncConnectionPool[Any], Depends(db_pool_fn)]):
-    return UserService(db_pool_fn)
+    settings = config.get_settings()
+    return UserService(db_pool_fn, settings.identity_cache_size, settings.identity_cache_ttl)
 
 
 @cache
@@ -57,21 +100,58 @@ UserServiceDep = Annotated[UserService, Depends(get_user_service)]
 ShoppingListServiceDep = Annotated[ShoppingListService, Depends(get_shopping_list_service)]
 
 
+_settings = get_settings()
+http_clients = HttpClients(
+    _settings.http_scraper_user_agent,
+    max_connections=_settings.http_max_connections,
+    max_keepalive_connections=_settings.http_max_keepalive_connections,
+    keepalive_expiry=_settings.http_keepalive_expiry,
+    max_connections_per_host=_settings.http_max_connections_per_host,
+)
+recipe_parse_pool = BoundedProcessPool(_settings.recipe_parse_workers, _settings.recipe_parse_timeout)
+image_pool = BoundedProcessPool(_settings.image_workers, _settings.image_timeout, _settings.image_max_queued)
+storage = FileStorage(_settings.storage_io_threads)
+
+
 @cache
 def get_recipe_import_service(
     db_pool_fn: Annotated[AsyncConnectionPool[Any], Depends(db_pool_fn)],
     recipe_service: RecipeServiceDep,
     recipe_asset_service: RecipeAssetServiceDep,
 ):
+    settings = config.get_settings()
     return RecipeImportService(
-        db_pool_fn, recipe_service, recipe_asset_service, config.get_settings().http_scraper_user_agent
+        db_pool_fn,
+        recipe_service,
+        recipe_asset_service,
+        http_clients.scraper,
+        recipe_parse_pool,
+        page_cache=PageCache(db_pool_fn, settings.page_cache_ttl, settings.page_cache_max_size),
     )
 
 
 RecipeImportServiceDep = Annotated[RecipeImportService, Depends(get_recipe_import_service)]
 
 
-oidc_auth = OIDCAuth(str(get_settings().oidc_well_known))
+@cache
+def get_import_job_service(
+    db_pool_fn: Annotated[AsyncConnectionPool[Any], Depends(db_pool_fn)], recipe_import_service: RecipeImportServiceDep
+):
+    settings = config.get_settings()
+    return ImportJobService(
+        db_pool_fn,
+        recipe_import_service,
+        workers=settings.import_workers,
+        poll_interval=settings.import_poll_interval,
+        max_attempts=settings.import_max_attempts,
+        lease=settings.import_job_lease,
+    )
+
+
+ImportJobServiceDep = Annotated[ImportJobService, Depends(get_import_job_service)]
+
+
+oidc_auth = OIDCAuth(str(_settings.oidc_well_known), http_clients.idp, token_cache_size=_settings.token_cache_size)
 
 
 async def get_user(jwt: Annotated[JWT, Depends(oidc_auth)], user_service: UserServiceDep) -> User:
@@ -90,7 +170,16 @@ def recipe_list_query_parameters(
     order: SortOrder = SortOrder.DESC,
     field: RecipeSortField = RecipeSortField.CREATED_AT,
     search: str | None = None,
+    collection: UUID | None = None,
 ):
     base_sort = BaseSort(order=order, field=field)
 
-    return RecipeQueryParams(pagination=pagination, sort=base_sort, search=search)
+    return RecipeQueryParams(pagination=pagination, sort=base_sort, search=search, collection=collection)
+
+
+def asset_negotiation(
+    accept: Annotated[str | None, Header()] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+    width: Annotated[int | None, Query(gt=0)] = None,
+):
+    return AssetNegotiation(accept=accept, if_none_match=if_none_match, width=width)
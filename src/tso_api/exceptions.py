@@ -68,6 +68,54 @@ class ScrapeRecipeError(ApiError):
         return {'url': self.recipe_url}
 
 
+class ImageTooLargeError(ApiError):
+    """Indicates that a remote image was not downloaded because it is larger than allowed."""
+
+    msg = 'image is larger than {0} bytes'
+    status = 400
+
+    def __init__(self, image_url: str, max_size: int) -> None:
+        super().__init__(self.msg.format(max_size))
+        self.image_url = image_url
+
+    def detail(self):
+        return {'url': self.image_url}
+
+
+class UnsupportedImageError(ApiError):
+    """Indicates that a remote image was not downloaded because it isn't in a supported image format."""
+
+    msg = 'unsupported image: {0}'
+    status = 400
+
+    def __init__(self, image_url: str, reason: str) -> None:
+        super().__init__(self.msg.format(reason))
+        self.image_url = image_url
+
+    def detail(self):
+        return {'url': self.image_url}
+
+
+class ImageProcessingBusyError(ApiError):
+    """Indicates that an image was not processed because too many images are already waiting for a worker."""
+
+    msg = 'too many images are being processed, try again later'
+    status = 503
+
+    def __init__(self) -> None:
+        super().__init__(self.msg)
+
+
+class InvalidAssetUrlError(ApiError):
+    """Indicates that a signed asset URL was tampered with or expired."""
+
+    msg = 'invalid asset url: {0}'
+    status = 403
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(self.msg.format(reason))
+
+
 class NoneAfterInsertError(ApiError):
     msg = '{} was inserted but returned None'
 
@@ -98,3 +146,16 @@ class CursorPaginationError(ApiError):
 
     def __init__(self, msg: str) -> None:
         super().__init__(self.msg.format(msg))
+
+
+class InvalidLineError(ApiError):
+    msg: str = 'invalid {0} id: {1}'
+    status = 400
+
+    def __init__(self, line_type: str, line_id: UUID, reason: str) -> None:
+        self.line_id = line_id
+        self.reason = reason
+        super().__init__(self.msg.format(line_type, line_id))
+
+    def detail(self):
+        return {'id': str(self.line_id), 'reason': self.reason}
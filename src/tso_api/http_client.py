@@ -0,0 +1,138 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import asyncio
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass
+from typing import cast
+
+import httpx
+
+SCRAPER_HEADERS = {'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'}
+
+
+class HttpClients:
+    """
+    The HTTP clients of the application, created once and closed in the lifespan.
+
+    `scraper` fetches recipe pages and images from arbitrary sites, `idp` talks to the identity provider.
+    Both speak HTTP/2 and keep connections alive, so repeated imports from the same site reuse the TLS connection.
+    """
+
+    def __init__(
+        self,
+        user_agent: str,
+        *,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30,
+        max_connections_per_host: int = 4,
+    ) -> None:
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.scraper = httpx.AsyncClient(
+            headers={'user-agent': user_agent} | SCRAPER_HEADERS,
+            timeout=httpx.Timeout(10, connect=5, read=20),
+            follow_redirects=True,
+            transport=HostLimitedTransport(
+                httpx.AsyncHTTPTransport(http2=True, limits=limits), max_connections_per_host
+            ),
+        )
+        self.idp = httpx.AsyncClient(
+            headers={'user-agent': user_agent}, transport=httpx.AsyncHTTPTransport(http2=True, limits=limits)
+        )
+
+    async def aclose(self) -> None:
+        await self.scraper.aclose()
+        await self.idp.aclose()
+
+
+@dataclass(slots=True)
+class _HostSlots:
+    semaphore: asyncio.Semaphore
+    users: int = 0
+
+
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Limits the number of concurrent requests to the same host.
+
+    httpx only limits the connections of the whole pool, without this a bulk import of one site could open
+    `max_connections` connections to it. A request holds its slot until its response is
+    read to the end, fails or is closed.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_per_host: int) -> None:
+        self._transport = transport
+        self._max_per_host = max_per_host
+        self._hosts: dict[str, _HostSlots] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        slots = self._hosts.get(host)
+        if slots is None:
+            slots = self._hosts[host] = _HostSlots(asyncio.Semaphore(self._max_per_host))
+        # counted before waiting, so hosts with queued requests aren't removed
+        slots.users += 1
+        try:
+            await slots.semaphore.acquire()
+        except BaseException:
+            self._leave(host, slots)
+            raise
+
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self._release(host, slots)
+            raise
+
+        if isinstance(response.stream, httpx.ByteStream):
+            # the body is already in memory (mock transports, cached responses), no connection is held
+            self._release(host, slots)
+            return response
+
+        # async transports always return async streams
+        response.stream = _ReleasingStream(
+            cast('httpx.AsyncByteStream', response.stream), lambda: self._release(host, slots)
+        )
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+    def _release(self, host: str, slots: _HostSlots) -> None:
+        slots.semaphore.release()
+        self._leave(host, slots)
+
+    def _leave(self, host: str, slots: _HostSlots) -> None:
+        slots.users -= 1
+        if slots.users == 0:
+            del self._hosts[host]
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]) -> None:
+        self._stream = stream
+        self._release: Callable[[], None] | None = release
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        finally:
+            # httpx doesn't close every response it has read, the slot is given back as soon as the body is done
+            self._release_once()
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release_once()
+
+    def _release_once(self) -> None:
+        if self._release is not None:
+            self._release()
+            self._release = None
@@ -4,18 +4,29 @@
 import asyncio
 import shutil
 from contextlib import asynccontextmanager
+from typing import Any
 
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from psycopg_pool import AsyncConnectionPool
 
 from tso_api.config import settings
-from tso_api.db import db_pool, db_pool_fn
+from tso_api.cursor import CursorCodec
+from tso_api.db import db_pool_fn
+from tso_api.dependency import http_clients, image_pool, oidc_auth, recipe_parse_pool, storage
 from tso_api.exceptions import ApiError, ApiHttpError, AuthenticationError
 from tso_api.routers.asset import router as asset_router
 from tso_api.routers.collection import router as collection_router
+from tso_api.routers.internal import router as internal_router
 from tso_api.routers.recipe import router as recipe_router
 from tso_api.routers.shopping_list import router as shopping_list_router
 from tso_api.routers.user import router as user_router
+from tso_api.service.blob_store import BlobStore
+from tso_api.service.import_job_service import ImportJobService
+from tso_api.service.page_cache import PageCache
+from tso_api.service.recipe_asset import RecipeAssetService
+from tso_api.service.recipe_import_service import RecipeImportService
+from tso_api.service.recipe_service import RecipeService
 
 
 class DBMigrationError(Exception):
@@ -39,14 +50,46 @@ async def lifespan(_instance: FastAPI):
     code = await proc.wait()
     if code != 0:
         raise DBMigrationError(stderr.decode())
-    await db_pool.open(timeout=5)
-    db_pool_fn_ret = db_pool_fn()
-    await db_pool_fn_ret.open()
+    db_pool = db_pool_fn()
+    await db_pool.open(wait=True, timeout=settings.db_pool_timeout)
+    await oidc_auth.start()
+    blob_store = BlobStore(
+        db_pool, storage, settings.data_dir, gc_interval=settings.blob_gc_interval, gc_grace=settings.blob_gc_grace
+    )
+    blob_store.start()
+    import_jobs = _import_job_workers(db_pool, blob_store)
+    import_jobs.start()
     yield
-    await db_pool_fn_ret.close()
+    await import_jobs.stop()
+    await blob_store.stop()
+    await oidc_auth.close()
+    await http_clients.aclose()
+    recipe_parse_pool.shutdown()
+    image_pool.shutdown()
+    storage.shutdown()
     await db_pool.close(timeout=5)
 
 
+def _import_job_workers(db_pool: AsyncConnectionPool[Any], blob_store: BlobStore) -> ImportJobService:
+    # the workers run outside of requests, their services are built here instead of through the dependencies
+    recipe_import_service = RecipeImportService(
+        db_pool,
+        RecipeService(db_pool, CursorCodec(settings.secret_key.get_secret_value().encode())),
+        RecipeAssetService(db_pool, image_pool, blob_store),
+        http_clients.scraper,
+        recipe_parse_pool,
+        page_cache=PageCache(db_pool, settings.page_cache_ttl, settings.page_cache_max_size),
+    )
+    return ImportJobService(
+        db_pool,
+        recipe_import_service,
+        workers=settings.import_workers,
+        poll_interval=settings.import_poll_interval,
+        max_attempts=settings.import_max_attempts,
+        lease=settings.import_job_lease,
+    )
+
+
 enable_openapi = '/docs/' if settings.enable_openapi else None
 app = FastAPI(lifespan=lifespan, docs_url=enable_openapi, redoc_url=None)
 app.include_router(collection_router)
@@ -54,6 +97,8 @@ app.include_router(recipe_router)
 app.include_router(asset_router)
 app.include_router(user_router)
 app.include_router(shopping_list_router)
+if settings.enable_internal_endpoints:
+    app.include_router(internal_router)
 origins = ['*']
 
 app.add_middleware(
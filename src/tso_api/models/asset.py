@@ -13,6 +13,12 @@ class AssetBase(BaseModel):
     path: Path
     size: int
     original_name: str | None
+    # set for the renditions of recipe cover images
+    recipe_id: UUID | None = None
+    mime_type: str | None = None
+    width: int | None = None
+    # the SHA-256 hash the file is stored under, None for files saved before the blob store
+    blob_hash: str | None = None
 
 
 class Asset(AssetBase):
@@ -0,0 +1,24 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+from enum import StrEnum
+from uuid import UUID
+
+from tso_api.models.base import Timestamps
+
+
+class ImportJobStatus(StrEnum):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+
+class ImportJob(Timestamps):
+    id: UUID
+    url: str
+    collection_id: UUID
+    status: ImportJobStatus
+    attempts: int
+    recipe_id: UUID | None = None
+    error: str | None = None
@@ -1,4 +1,5 @@
 from enum import StrEnum
+from uuid import UUID
 
 from pydantic import BaseModel
 
@@ -28,3 +29,10 @@ class RecipeQueryParams(BaseModel):
     pagination: CursorPagination
     sort: BaseSort[RecipeSortField]
     search: str | None
+    collection: UUID | None
+
+
+class AssetNegotiation(BaseModel):
+    accept: str | None
+    if_none_match: str | None
+    width: int | None
@@ -2,9 +2,10 @@
 # SPDX-License-Identifier: AGPL-3.0-only
 
 from datetime import datetime
+from typing import Annotated
 from uuid import UUID
 
-from pydantic import HttpUrl
+from pydantic import AfterValidator, Field, HttpUrl
 
 from tso_api.models.base import Timestamps, TSOBase
 
@@ -63,6 +64,9 @@ class RecipeFull(Recipe, Timestamps):
     ingredients: list[Ingredient] = []
     cover_image: UUID | None = None
     cover_thumbnail: UUID | None = None
+    # signed URLs of the cover image files that don't need authentication, they expire after a while
+    cover_image_url: str | None = None
+    cover_thumbnail_url: str | None = None
     collection: UUID
     created_by: UUID
 
@@ -74,7 +78,33 @@ class RecipeLight(Timestamps):
     description: str | None
     liked: bool
     cover_thumbnail: UUID | None
+    cover_thumbnail_url: str | None = None
+
+
+# import jobs store the normalized URL, which tso.import_job limits to fewer than 2000 characters
+IMPORT_URL_MAX_LENGTH = 1999
+
+
+def _check_import_url_length(url: HttpUrl) -> HttpUrl:
+    if len(str(url)) > IMPORT_URL_MAX_LENGTH:
+        msg = f'URL should have at most {IMPORT_URL_MAX_LENGTH} characters'
+        raise ValueError(msg)
+    return url
 
 
 class ImportRecipe(TSOBase):
-    url: HttpUrl
+    url: Annotated[HttpUrl, AfterValidator(_check_import_url_length)]
+
+
+class BulkImportRecipes(TSOBase):
+    urls: Annotated[list[HttpUrl], Field(min_length=1, max_length=500)]
+
+
+class BulkImportResult(TSOBase):
+    """One line of the bulk import response, sent as soon as the recipe of `url` was saved or failed to import."""
+
+    url: str
+    recipe_id: UUID | None = None
+    error: str | None = None
+    completed: int
+    total: int
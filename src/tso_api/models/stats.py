@@ -0,0 +1,66 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+from typing import Any
+
+from tso_api.cache import CacheStats
+from tso_api.models.base import TSOBase
+
+
+class PoolStats(TSOBase):
+    min_size: int
+    max_size: int
+    size: int
+    available: int
+    in_use: int
+    requests_waiting: int
+    requests_total: int
+    requests_queued: int
+    requests_errors: int
+    avg_acquire_ms: float
+    connections_opened: int
+    connections_errors: int
+    connections_lost: int
+
+    @classmethod
+    def from_pool_stats(cls, stats: dict[str, Any]) -> 'PoolStats':
+        # psycopg_pool only includes counters which have been incremented at least once
+        requests_total = stats.get('requests_num', 0)
+        requests_wait_ms = stats.get('requests_wait_ms', 0)
+        return cls(
+            min_size=stats['pool_min'],
+            max_size=stats['pool_max'],
+            size=stats['pool_size'],
+            available=stats['pool_available'],
+            in_use=stats['pool_size'] - stats['pool_available'],
+            requests_waiting=stats['requests_waiting'],
+            requests_total=requests_total,
+            requests_queued=stats.get('requests_queued', 0),
+            requests_errors=stats.get('requests_errors', 0),
+            avg_acquire_ms=requests_wait_ms / requests_total if requests_total else 0,
+            connections_opened=stats.get('connections_num', 0),
+            connections_errors=stats.get('connections_errors', 0),
+            connections_lost=stats.get('connections_lost', 0),
+        )
+
+
+class InternalStats(TSOBase):
+    pid: int
+    db_pool: PoolStats
+    # prepared statements are per connection, this is the count of the connection that served the stats request
+    db_prepared_statements: int
+    identity_cache: CacheStats
+
+
+class DiskUsage(TSOBase):
+    blobs: int
+    blob_bytes: int
+    # what the blobs would take up without deduplication
+    reference_count: int
+    referenced_bytes: int
+    # removed by the garbage collection once their grace period is over
+    unreferenced_blobs: int
+    unreferenced_bytes: int
+    # asset files saved before the blob store
+    legacy_assets: int
+    legacy_bytes: int
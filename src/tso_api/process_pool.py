@@ -0,0 +1,93 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import asyncio
+import multiprocessing
+import signal
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from types import FrameType
+
+# how long a job may overrun its timeout before the worker is considered stuck (e.g. in C code that never returns
+# to the interpreter, so the alarm can't interrupt it)
+STUCK_GRACE_PERIOD = 5
+
+
+class PoolFullError(Exception):
+    """Indicates that a job was rejected because `max_queued` jobs are already waiting for a worker."""
+
+
+class BoundedProcessPool:
+    """
+    Runs CPU heavy, synchronous functions in worker processes so they don't block the event loop.
+
+    At most `max_workers` jobs run at the same time, further callers wait for a free worker. If `max_queued` is set
+    and that many callers are already waiting, `run` raises a `PoolFullError` right away instead of queueing the job.
+    Jobs are aborted with a `TimeoutError` after `timeout` seconds. Workers are spawned on first use instead of
+    forked, forking a process with a running event loop, threads and open connections isn't safe.
+    """
+
+    def __init__(self, max_workers: int, timeout: float, max_queued: int | None = None) -> None:
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_queued = max_queued
+        self._slots = asyncio.Semaphore(max_workers)
+        self._queued = 0
+        self._executor: ProcessPoolExecutor | None = None
+
+    async def run[T, *Ts](self, fn: Callable[[*Ts], T], *args: *Ts) -> T:
+        # fn, its arguments and its result have to be picklable
+        if self.max_queued is not None and self._slots.locked() and self._queued >= self.max_queued:
+            raise PoolFullError
+
+        self._queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._queued -= 1
+
+        try:
+            executor = self._get_executor()
+            future = asyncio.get_running_loop().run_in_executor(executor, _run_with_alarm, self.timeout, fn, *args)
+            done, _ = await asyncio.wait({future}, timeout=self.timeout + STUCK_GRACE_PERIOD)
+            if not done:
+                # the stuck worker can't be interrupted, leave it to finish on its own and use fresh workers
+                self._discard_executor(executor)
+                raise TimeoutError
+
+            if isinstance(future.exception(), BrokenProcessPool):
+                # a worker died (OOM killer, crash in a C extension), the executor refuses all further jobs
+                self._discard_executor(executor)
+            return future.result()
+        finally:
+            self._slots.release()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor) -> None:
+        executor.shutdown(wait=False)
+        if self._executor is executor:
+            self._executor = None
+
+
+def _run_with_alarm[T, *Ts](timeout: float, fn: Callable[[*Ts], T], *args: *Ts) -> T:
+    # jobs run in the main thread of the worker, so a signal handler can interrupt them
+    signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return fn(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _raise_timeout(_signum: int, _frame: FrameType | None) -> None:
+    raise TimeoutError
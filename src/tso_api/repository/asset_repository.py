@@ -1,9 +1,11 @@
 # Copyright 2025 Marius Meschter
 # SPDX-License-Identifier: AGPL-3.0-only
 
+from collections.abc import Sequence
+from typing import Any
 from uuid import UUID
 
-from psycopg import AsyncCursor
+from psycopg import AsyncCursor, sql
 from psycopg.rows import DictRow
 
 from tso_api.exceptions import NoneAfterInsertError, NoneAfterUpdateError
@@ -12,19 +14,13 @@ from tso_api.models.asset import AssetBase
 
 async def create_asset(asset: AssetBase, collection_id: UUID, cur: AsyncCursor[DictRow]):
     query = """INSERT INTO
-    tso.asset (id, path, size, original_name, collection_id)
-    VALUES (%(id)s, %(path)s, %(size)s, %(original_name)s, %(collection_id)s)
-    RETURNING *"""
-    res = await cur.execute(
-        query,
-        {
-            'id': asset.id,
-            'path': str(asset.path),
-            'size': asset.size,
-            'original_name': asset.original_name,
-            'collection_id': collection_id,
-        },
+    tso.asset (id, path, size, original_name, collection_id, recipe_id, mime_type, width, blob_hash)
+    VALUES (
+        %(id)s, %(path)s, %(size)s, %(original_name)s, %(collection_id)s, %(recipe_id)s, %(mime_type)s, %(width)s,
+        %(blob_hash)s
     )
+    RETURNING *"""
+    res = await cur.execute(query, _asset_params(asset, collection_id))
     row = await res.fetchone()
     if row is None:
         msg = 'asset'
@@ -33,18 +29,63 @@ async def create_asset(asset: AssetBase, collection_id: UUID, cur: AsyncCursor[D
     return row
 
 
+async def create_assets(assets: Sequence[AssetBase], collection_id: UUID, cur: AsyncCursor[DictRow]) -> None:
+    query = """INSERT INTO
+    tso.asset (id, path, size, original_name, collection_id, recipe_id, mime_type, width, blob_hash)
+    VALUES (
+        %(id)s, %(path)s, %(size)s, %(original_name)s, %(collection_id)s, %(recipe_id)s, %(mime_type)s, %(width)s,
+        %(blob_hash)s
+    )"""
+    # executemany sends all rows in one pipeline instead of a round trip per rendition
+    await cur.executemany(query, [_asset_params(asset, collection_id) for asset in assets])
+
+
+def _asset_params(asset: AssetBase, collection_id: UUID) -> dict[str, Any]:
+    return {
+        'id': asset.id,
+        'path': str(asset.path),
+        'size': asset.size,
+        'original_name': asset.original_name,
+        'collection_id': collection_id,
+        'recipe_id': asset.recipe_id,
+        'mime_type': asset.mime_type,
+        'width': asset.width,
+        'blob_hash': asset.blob_hash,
+    }
+
+
+ASSET_COLUMNS = sql.SQL('id, path, size, original_name, created_at, recipe_id, mime_type, width, blob_hash')
+
+
 async def get_asset_by_id(asset_id: UUID, collection_id: UUID, cur: AsyncCursor[DictRow]):
-    query = 'SELECT id, path, size, original_name, created_at FROM tso.asset WHERE id = %s AND collection_id = %s'
+    query = sql.SQL('SELECT {columns} FROM tso.asset WHERE id = %s AND collection_id = %s').format(
+        columns=ASSET_COLUMNS
+    )
     res = await cur.execute(query, (asset_id, collection_id))
 
     return await res.fetchone()
 
 
 async def get_assets_by_recipe(recipe_id: UUID, collection_id: UUID, cur: AsyncCursor[DictRow]):
-    query = 'SELECT cover_image, cover_thumbnail FROM tso.recipe WHERE collection_id = %s and id = %s'
-    res = await cur.execute(query, (collection_id, recipe_id))
+    """Return the renditions of the recipe's cover image."""
+    query = sql.SQL('SELECT {columns} FROM tso.asset WHERE recipe_id = %s AND collection_id = %s').format(
+        columns=ASSET_COLUMNS
+    )
+    res = await cur.execute(query, (recipe_id, collection_id))
 
-    return await res.fetchone()
+    return await res.fetchall()
+
+
+async def delete_assets_by_recipe(recipe_id: UUID, collection_id: UUID, cur: AsyncCursor[DictRow]):
+    """
+    Delete the renditions of the recipe's cover image.
+
+    Their blobs are released, the paths of the files that aren't blobs are returned, they are the caller's to delete.
+    """
+    query = 'DELETE FROM tso.asset WHERE recipe_id = %s AND collection_id = %s RETURNING path, blob_hash'
+    res = await cur.execute(query, (recipe_id, collection_id))
+
+    return [row['path'] for row in await res.fetchall() if row['blob_hash'] is None]
 
 
 async def delete_asset_by_id(asset_id: UUID, collection_id: UUID, cur: AsyncCursor[DictRow]):
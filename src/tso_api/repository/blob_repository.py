@@ -0,0 +1,78 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import datetime
+from collections.abc import Sequence
+
+from psycopg import AsyncCursor
+from psycopg.rows import DictRow
+
+# tso.blob is maintained by the triggers on tso.asset, these queries are only used by the garbage collection and
+# the disk usage report, outside of RLS
+
+# advisory lock class of the blob files, tso.reference_blob takes the lock of a hash shared
+BLOB_LOCK_CLASS = 1651273570
+
+
+async def delete_unreferenced_blobs(grace: datetime.timedelta, limit: int, cur: AsyncCursor[DictRow]):
+    """Delete and return blobs that have not been referenced for `grace`, skipping blobs another transaction holds."""
+    query = """DELETE FROM tso.blob
+    WHERE hash IN (
+        SELECT hash
+        FROM tso.blob
+        WHERE ref_count = 0 AND unreferenced_since < now() - %s
+        ORDER BY unreferenced_since
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING hash, path"""
+    res = await cur.execute(query, (grace, limit))
+
+    return await res.fetchall()
+
+
+async def lock_deleted_blob_files(hashes: Sequence[str], cur: AsyncCursor[DictRow]) -> list[str]:
+    """
+    Lock the files of deleted blobs until the transaction ends, return the hashes whose files can be deleted.
+
+    Blobs an upload is referencing again (it holds the lock shared, see the blob-file-lock migration) and blobs that
+    were created again since they were deleted are left out. Uploads of the same content wait for the lock.
+    """
+    query = """SELECT hash
+    FROM unnest(%s::text[]) AS deleted (hash)
+    WHERE pg_try_advisory_xact_lock(%s::int, hashtext(hash))"""
+    res = await cur.execute(query, (list(hashes), BLOB_LOCK_CLASS))
+    locked = [row['hash'] for row in await res.fetchall()]
+
+    # a statement of its own, it has to see the blobs that uploads committed before the locks were taken
+    query = """SELECT hash
+    FROM unnest(%s::text[]) AS locked (hash)
+    WHERE NOT EXISTS (SELECT FROM tso.blob WHERE blob.hash = locked.hash)"""
+    res = await cur.execute(query, (locked,))
+
+    return [row['hash'] for row in await res.fetchall()]
+
+
+async def get_disk_usage(cur: AsyncCursor[DictRow]):
+    query = """SELECT
+        blobs.*,
+        legacy.*
+    FROM (
+        SELECT
+            count(*) AS blobs,
+            coalesce(sum(size), 0) AS blob_bytes,
+            coalesce(sum(ref_count), 0) AS reference_count,
+            coalesce(sum(size::bigint * ref_count), 0) AS referenced_bytes,
+            count(*) FILTER (WHERE ref_count = 0) AS unreferenced_blobs,
+            coalesce(sum(size) FILTER (WHERE ref_count = 0), 0) AS unreferenced_bytes
+        FROM tso.blob
+    ) AS blobs, (
+        SELECT
+            count(*) AS legacy_assets,
+            coalesce(sum(size), 0) AS legacy_bytes
+        FROM tso.asset
+        WHERE blob_hash IS NULL
+    ) AS legacy"""
+    res = await cur.execute(query)
+
+    return await res.fetchone()
@@ -0,0 +1,113 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import datetime
+from uuid import UUID
+
+from psycopg import AsyncCursor
+from psycopg.rows import DictRow
+from uuid6 import uuid7
+
+from tso_api.exceptions import NoneAfterInsertError
+
+
+async def create_job(url: str, account_id: UUID, collection_id: UUID, cur: AsyncCursor[DictRow]):
+    query = """INSERT INTO
+    tso.import_job (id, account_id, collection_id, url)
+    VALUES (%s, %s, %s, %s) RETURNING *"""
+
+    res = await (await cur.execute(query, (uuid7(), account_id, collection_id, url))).fetchone()
+    if res is None:
+        msg = 'import_job'
+        raise NoneAfterInsertError(msg)
+
+    return res
+
+
+async def get_job(job_id: UUID, cur: AsyncCursor[DictRow]):
+    query = 'SELECT * FROM tso.import_job WHERE id = %s'
+
+    return await (await cur.execute(query, (job_id,), prepare=True)).fetchone()
+
+
+async def claim_job(lease: datetime.timedelta, max_attempts: int, cur: AsyncCursor[DictRow]):
+    """
+    Mark the next due job as running and lease it to the caller until `now() + lease`.
+
+    Jobs whose lease ran out without being finished (the worker crashed or was stopped) are due again, unless they
+    were claimed `max_attempts` times already (see `fail_exhausted_jobs`).
+    SKIP LOCKED lets the workers of all processes claim jobs concurrently without waiting on each other.
+    """
+    query = """UPDATE tso.import_job
+    SET status = 'running', attempts = attempts + 1, run_after = now() + %(lease)s
+    WHERE id = (
+        SELECT id FROM tso.import_job
+        WHERE status IN ('queued', 'running') AND run_after <= now() AND attempts < %(max_attempts)s
+        ORDER BY run_after
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING *"""
+
+    return await (await cur.execute(query, {'lease': lease, 'max_attempts': max_attempts}, prepare=True)).fetchone()
+
+
+async def fail_exhausted_jobs(max_attempts: int, error: str, cur: AsyncCursor[DictRow]) -> int:
+    """
+    Fail the jobs whose last allowed attempt ran out of its lease, return how many.
+
+    A job that crashes or hangs its worker every time would otherwise stay running forever without being claimed.
+    """
+    query = """UPDATE tso.import_job
+    SET status = 'failed', error = %(error)s
+    WHERE id IN (
+        SELECT id FROM tso.import_job
+        WHERE status = 'running' AND run_after <= now() AND attempts >= %(max_attempts)s
+        FOR UPDATE SKIP LOCKED
+    )"""
+
+    res = await cur.execute(query, {'max_attempts': max_attempts, 'error': error}, prepare=True)
+    return res.rowcount
+
+
+# The following updates only apply while the caller still holds its claim on the job, identified by the attempt
+# number it claimed. Once the lease ran out and another worker claimed the job again they do nothing.
+
+
+async def extend_lease(job_id: UUID, attempts: int, lease: datetime.timedelta, cur: AsyncCursor[DictRow]) -> bool:
+    """Lease the job for another `lease` from now on, return whether the caller still held the claim."""
+    query = """UPDATE tso.import_job
+    SET run_after = now() + %(lease)s
+    WHERE id = %(id)s AND status = 'running' AND attempts = %(attempts)s"""
+
+    res = await cur.execute(query, {'lease': lease, 'id': job_id, 'attempts': attempts}, prepare=True)
+    return res.rowcount == 1
+
+
+async def complete_job(job_id: UUID, attempts: int, recipe_id: UUID, cur: AsyncCursor[DictRow]) -> bool:
+    query = """UPDATE tso.import_job
+    SET status = 'succeeded', recipe_id = %(recipe_id)s, error = NULL
+    WHERE id = %(id)s AND status = 'running' AND attempts = %(attempts)s"""
+
+    res = await cur.execute(query, {'recipe_id': recipe_id, 'id': job_id, 'attempts': attempts})
+    return res.rowcount == 1
+
+
+async def fail_job(job_id: UUID, attempts: int, error: str, cur: AsyncCursor[DictRow]) -> bool:
+    query = """UPDATE tso.import_job
+    SET status = 'failed', error = %(error)s
+    WHERE id = %(id)s AND status = 'running' AND attempts = %(attempts)s"""
+
+    res = await cur.execute(query, {'error': error, 'id': job_id, 'attempts': attempts})
+    return res.rowcount == 1
+
+
+async def retry_job(
+    job_id: UUID, attempts: int, error: str, delay: datetime.timedelta, cur: AsyncCursor[DictRow]
+) -> bool:
+    query = """UPDATE tso.import_job
+    SET status = 'queued', error = %(error)s, run_after = now() + %(delay)s
+    WHERE id = %(id)s AND status = 'running' AND attempts = %(attempts)s"""
+
+    res = await cur.execute(query, {'error': error, 'delay': delay, 'id': job_id, 'attempts': attempts})
+    return res.rowcount == 1
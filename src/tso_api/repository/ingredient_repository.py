@@ -1,6 +1,7 @@
 # Copyright 2025 Marius Meschter
 # SPDX-License-Identifier: AGPL-3.0-only
 
+from collections.abc import Sequence
 from uuid import UUID
 
 import uuid6
@@ -31,3 +32,71 @@ async def update_ingredient(text: str, position: int, ingredient_id: UUID, cur:
 async def delete_ingredient(ingredient_id: UUID, cur: AsyncCursor[DictRow]):
     query = 'DELETE FROM tso.ingredient WHERE id = %(id)s'
     await cur.execute(query, {'id': ingredient_id})
+
+
+async def insert_ingredients(
+    ingredients: Sequence[tuple[str, int]], recipe_id: UUID, cur: AsyncCursor[DictRow]
+) -> list[UUID]:
+    """Insert `(text, position)` ingredients of a recipe with a single statement and return their new ids."""
+    if len(ingredients) == 0:
+        return []
+
+    query = """INSERT INTO tso.ingredient (id, text, recipe_id, position)
+    SELECT new.id, new.text, %(recipe)s, new.position
+    FROM unnest(%(ids)s::uuid[], %(texts)s::text[], %(positions)s::int[]) AS new(id, text, position)"""
+
+    ingredient_ids = [uuid6.uuid7() for _ in ingredients]
+    await cur.execute(
+        query,
+        {
+            'ids': ingredient_ids,
+            'texts': [text for text, _ in ingredients],
+            'positions': [position for _, position in ingredients],
+            'recipe': recipe_id,
+        },
+    )
+
+    return ingredient_ids
+
+
+async def update_ingredients(
+    ingredients: Sequence[tuple[UUID, str, int]], recipe_id: UUID, cur: AsyncCursor[DictRow]
+) -> list[UUID]:
+    """Update `(id, text, position)` ingredients of a recipe with a single statement and return the updated ids."""
+    if len(ingredients) == 0:
+        return []
+
+    query = """UPDATE tso.ingredient AS ing
+    SET
+        text = changed.text,
+        position = changed.position
+    FROM unnest(%(ids)s::uuid[], %(texts)s::text[], %(positions)s::int[]) AS changed(id, text, position)
+    WHERE
+        ing.id = changed.id
+        AND ing.recipe_id = %(recipe)s
+    RETURNING ing.id"""
+
+    res = await cur.execute(
+        query,
+        {
+            'ids': [ingredient_id for ingredient_id, _, _ in ingredients],
+            'texts': [text for _, text, _ in ingredients],
+            'positions': [position for _, _, position in ingredients],
+            'recipe': recipe_id,
+        },
+    )
+
+    return [row['id'] for row in await res.fetchall()]
+
+
+async def delete_ingredients(ingredient_ids: Sequence[UUID], recipe_id: UUID, cur: AsyncCursor[DictRow]) -> None:
+    if len(ingredient_ids) == 0:
+        return
+
+    query = 'DELETE FROM tso.ingredient WHERE recipe_id = %(recipe)s AND id = ANY(%(ids)s)'
+    await cur.execute(query, {'recipe': recipe_id, 'ids': list(ingredient_ids)})
+
+
+async def get_ingredients(recipe_id: UUID, cur: AsyncCursor[DictRow]) -> list[DictRow]:
+    query = 'SELECT id, text, position FROM tso.ingredient WHERE recipe_id = %s ORDER BY position'
+    return await (await cur.execute(query, (recipe_id,))).fetchall()
@@ -1,6 +1,7 @@
 # Copyright 2025 Marius Meschter
 # SPDX-License-Identifier: AGPL-3.0-only
 
+from collections.abc import Sequence
 from uuid import UUID
 
 import uuid6
@@ -31,3 +32,71 @@ async def update_instruction(text: str, position: int, ingredient_id: UUID, cur:
 async def delete_instruction(ingredient_id: UUID, cur: AsyncCursor[DictRow]):
     query = 'DELETE FROM tso.instruction WHERE id = %(id)s'
     await cur.execute(query, {'id': ingredient_id})
+
+
+async def insert_instructions(
+    instructions: Sequence[tuple[str, int]], recipe_id: UUID, cur: AsyncCursor[DictRow]
+) -> list[UUID]:
+    """Insert `(text, position)` instructions of a recipe with a single statement and return their new ids."""
+    if len(instructions) == 0:
+        return []
+
+    query = """INSERT INTO tso.instruction (id, text, recipe_id, position)
+    SELECT new.id, new.text, %(recipe)s, new.position
+    FROM unnest(%(ids)s::uuid[], %(texts)s::text[], %(positions)s::int[]) AS new(id, text, position)"""
+
+    instruction_ids = [uuid6.uuid7() for _ in instructions]
+    await cur.execute(
+        query,
+        {
+            'ids': instruction_ids,
+            'texts': [text for text, _ in instructions],
+            'positions': [position for _, position in instructions],
+            'recipe': recipe_id,
+        },
+    )
+
+    return instruction_ids
+
+
+async def update_instructions(
+    instructions: Sequence[tuple[UUID, str, int]], recipe_id: UUID, cur: AsyncCursor[DictRow]
+) -> list[UUID]:
+    """Update `(id, text, position)` instructions of a recipe with a single statement and return the updated ids."""
+    if len(instructions) == 0:
+        return []
+
+    query = """UPDATE tso.instruction AS ins
+    SET
+        text = changed.text,
+        position = changed.position
+    FROM unnest(%(ids)s::uuid[], %(texts)s::text[], %(positions)s::int[]) AS changed(id, text, position)
+    WHERE
+        ins.id = changed.id
+        AND ins.recipe_id = %(recipe)s
+    RETURNING ins.id"""
+
+    res = await cur.execute(
+        query,
+        {
+            'ids': [instruction_id for instruction_id, _, _ in instructions],
+            'texts': [text for _, text, _ in instructions],
+            'positions': [position for _, _, position in instructions],
+            'recipe': recipe_id,
+        },
+    )
+
+    return [row['id'] for row in await res.fetchall()]
+
+
+async def delete_instructions(instruction_ids: Sequence[UUID], recipe_id: UUID, cur: AsyncCursor[DictRow]) -> None:
+    if len(instruction_ids) == 0:
+        return
+
+    query = 'DELETE FROM tso.instruction WHERE recipe_id = %(recipe)s AND id = ANY(%(ids)s)'
+    await cur.execute(query, {'recipe': recipe_id, 'ids': list(instruction_ids)})
+
+
+async def get_instructions(recipe_id: UUID, cur: AsyncCursor[DictRow]) -> list[DictRow]:
+    query = 'SELECT id, text, position FROM tso.instruction WHERE recipe_id = %s ORDER BY position'
+    return await (await cur.execute(query, (recipe_id,))).fetchall()
@@ -0,0 +1,63 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+from typing import Any
+
+from psycopg import AsyncCursor
+from psycopg.rows import DictRow
+from psycopg.types.json import Jsonb
+
+
+async def get_page(url: str, cur: AsyncCursor[DictRow]):
+    """Return the cached page of `url` and mark it as recently used."""
+    query = """UPDATE tso.page_cache
+    SET accessed_at = now()
+    WHERE url = %s
+    RETURNING url, etag, last_modified, recipe, fetched_at"""
+
+    return await (await cur.execute(query, (url,), prepare=True)).fetchone()
+
+
+async def store_page(
+    url: str, recipe: dict[str, Any], cur: AsyncCursor[DictRow], *, etag: str | None, last_modified: str | None
+) -> None:
+    query = """INSERT INTO tso.page_cache (url, etag, last_modified, recipe, size_bytes)
+    VALUES (%(url)s, %(etag)s, %(last_modified)s, %(recipe)s, octet_length(%(recipe)s::text))
+    ON CONFLICT (url) DO UPDATE SET
+        etag = excluded.etag,
+        last_modified = excluded.last_modified,
+        recipe = excluded.recipe,
+        size_bytes = excluded.size_bytes,
+        fetched_at = now(),
+        accessed_at = now()"""
+
+    await cur.execute(query, {'url': url, 'etag': etag, 'last_modified': last_modified, 'recipe': Jsonb(recipe)})
+
+
+async def mark_page_fresh(url: str, cur: AsyncCursor[DictRow]) -> None:
+    """Restart the TTL of a page the site confirmed to be unchanged."""
+    query = 'UPDATE tso.page_cache SET fetched_at = now(), accessed_at = now() WHERE url = %s'
+
+    await cur.execute(query, (url,))
+
+
+async def get_cache_size(cur: AsyncCursor[DictRow]) -> int:
+    """Return the total size of the cached pages in bytes."""
+    query = 'SELECT total_bytes FROM tso.page_cache_size'
+
+    res = await (await cur.execute(query, prepare=True)).fetchone()
+    return res['total_bytes'] if res else 0
+
+
+async def evict_pages(limit: int, cur: AsyncCursor[DictRow]) -> int:
+    """Delete the `limit` least recently used pages, return how many were deleted."""
+    query = """DELETE FROM tso.page_cache
+    WHERE url IN (
+        SELECT url FROM tso.page_cache
+        ORDER BY accessed_at
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )"""
+
+    res = await cur.execute(query, (limit,))
+    return res.rowcount
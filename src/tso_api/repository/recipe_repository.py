@@ -1,104 +1,204 @@
 # Copyright 2025 Marius Meschter
 # SPDX-License-Identifier: AGPL-3.0-only
 
-import base64
-import datetime
+from functools import cache
 from typing import Any
 from uuid import UUID
 
 import uuid6
 from psycopg import AsyncCursor, sql
 from psycopg.rows import DictRow
-from pydantic import BaseModel, ConfigDict, Field
 
+from tso_api.cursor import PageCursor
 from tso_api.exceptions import CursorPaginationError, NoneAfterInsertError, NoneAfterUpdateError
 from tso_api.models.query_params import RecipeSortField, SortOrder
 from tso_api.models.recipe import RecipeCreate, RecipeUpdate
 
+# search results are always ordered by relevance, the rank is stored in the cursor under this sort field
+SEARCH_RANK_FIELD = 'rank'
 
-class CursorStructure(BaseModel):
-    model_config = ConfigDict(validate_by_alias=True, validate_by_name=True)
-    last_value: str | datetime.datetime | int = Field(alias='l')
-    sort_order: SortOrder = Field(alias='o')
-    sort_field: str = Field(alias='f')
-    last_id: UUID = Field(alias='i')
+RECIPE_LIGHT_COLUMNS = sql.SQL("""r.id,
+    r.collection_id,
+    r.title,
+    r.created_at,
+    r.updated_at,
+    r.liked,
+    r.cover_thumbnail,
+    ( SELECT asset.path FROM tso.asset WHERE asset.id = r.cover_thumbnail ) AS cover_thumbnail_path""")
+
+# every column of tso.recipe except search_vector, which is only used inside the database, and the paths of the
+# cover image files
+RECIPE_COLUMNS = sql.SQL("""id,
+    collection_id,
+    title,
+    note,
+    created_at,
+    updated_at,
+    created_by,
+    cook_time,
+    prep_time,
+    total_time,
+    yield,
+    last_made,
+    liked,
+    cover_image,
+    cover_thumbnail,
+    original_url,
+    ( SELECT asset.path FROM tso.asset WHERE asset.id = recipe.cover_image ) AS cover_image_path,
+    ( SELECT asset.path FROM tso.asset WHERE asset.id = recipe.cover_thumbnail ) AS cover_thumbnail_path""")
+
+# A single collection can be paged through with an index scan on (collection_id, sort_field, id).
+RECIPES_IN_COLLECTION_QUERY = sql.SQL("""SELECT
+    {columns}
+FROM tso.recipe r
+{where_clause}
+{order_by}""")
+
+# Without a collection filter every collection of the user is scanned along its (collection_id, sort_field, id)
+# index and only the first `limit` rows of each are merged, instead of sorting all visible recipes.
+RECIPES_PER_COLLECTION_QUERY = sql.SQL("""SELECT r.*
+FROM unnest(tso.current_collection_ids()) AS c(collection_id)
+CROSS JOIN LATERAL (
+    SELECT
+        {columns}
+    FROM tso.recipe r
+    {where_clause}
+    {order_by}
+) r
+{order_by}""")
+
+# Recipes matching the search either by title/note or by any of their ingredients.
+# Ingredient vectors have a lower weight, so a recipe matching in its title ranks higher.
+RECIPES_SEARCH_QUERY = sql.SQL("""WITH search_query AS (
+    SELECT websearch_to_tsquery('simple', tso.immutable_unaccent(%(search)s)) AS query
+),
+search_matches AS (
+    SELECT r.id, ts_rank(r.search_vector, q.query) AS rank
+    FROM tso.recipe r, search_query q
+    WHERE r.search_vector @@ q.query
+    UNION ALL
+    SELECT i.recipe_id, ts_rank(i.search_vector, q.query) AS rank
+    FROM tso.ingredient i, search_query q
+    WHERE i.search_vector @@ q.query
+),
+m AS (
+    SELECT id, max(rank)::float8 AS rank FROM search_matches GROUP BY id
+)
+SELECT
+    {columns},
+    m.rank
+FROM tso.recipe r
+JOIN m ON m.id = r.id
+{where_clause}
+{order_by}""")
 
 
-async def get_recipes_light_by_owner(
+async def get_recipes_light_by_owner(  # noqa: PLR0913
     cur: AsyncCursor[DictRow],
     limit: int,
     sort_field: RecipeSortField = RecipeSortField.CREATED_AT,
     sort_order: SortOrder = SortOrder.DESC,
-    cursor: str | None = None,
-) -> tuple[list[DictRow], str | None]:
-    where_clause: list[sql.Composable] = []
-    where_clause_params: dict[str, Any] = {}
+    cursor: PageCursor | None = None,
+    *,
+    collection_id: UUID | None = None,
+    search: str | None = None,
+) -> tuple[list[DictRow], PageCursor | None]:
+    search = (search or '').strip() or None
+    cursor_field: str = sort_field
+    params: dict[str, Any] = {'limit': limit + 1}
+    if search:
+        cursor_field = SEARCH_RANK_FIELD
+        sort_order = SortOrder.DESC
+        params |= {'search': search}
+
+    if collection_id is not None:
+        params |= {'collection_id': collection_id}
+
     if cursor:
-        decoded_cursor = base64.urlsafe_b64decode(cursor).decode('utf-8')
-        cursor_struct = CursorStructure.model_validate_json(decoded_cursor)
+        _check_cursor(cursor, cursor_field, sort_order)
+        params |= {'cursor_sort_value': cursor.last_value, 'cursor_sort_id': cursor.last_id}
+
+    query = _recipes_light_query(
+        cursor_field,
+        sort_order,
+        search=search is not None,
+        in_collection=collection_id is not None,
+        after_cursor=cursor is not None,
+    )
+    res = await (await cur.execute(query, params, prepare=True)).fetchall()
+
+    if len(res) != limit + 1:
+        return (res, None)
 
-        if cursor_struct.sort_order != sort_order:
-            msg = "sort_order doesn't match"
-            raise CursorPaginationError(msg)
-        sort_order_symbol = sql.SQL('<') if cursor_struct.sort_order == SortOrder.DESC else sql.SQL('>')
+    return res[:-1], _page_cursor(res[limit - 1], cursor_field, sort_order)
 
-        if cursor_struct.sort_field != sort_field:
-            msg = "sort_field doesn't match"
-            raise CursorPaginationError(msg)
 
-        cursor_where_clause = sql.SQL(
-            '(r.{sort_field}, r.id) {sort_order_symbol} (%(cursor_sort_value)s, %(cursor_sort_id)s)'
-        ).format(sort_field=sql.Identifier(cursor_struct.sort_field), sort_order_symbol=sort_order_symbol)
-        where_clause.append(cursor_where_clause)
-        where_clause_params |= {'cursor_sort_value': cursor_struct.last_value, 'cursor_sort_id': cursor_struct.last_id}
+@cache
+def _recipes_light_query(
+    cursor_field: str, sort_order: SortOrder, *, search: bool, in_collection: bool, after_cursor: bool
+) -> str:
+    """
+    Compose the text of one variant of the recipe list query.
 
-    if len(where_clause) != 0:
-        where_clause.insert(0, sql.SQL('WHERE '))
+    Each variant is only composed once and always results in the same text, so the server can reuse its
+    prepared statement across requests.
+    """
+    sort_column = sql.Identifier('m' if search else 'r', cursor_field)
+    query = RECIPES_IN_COLLECTION_QUERY
+    conditions: list[sql.Composable] = []
+
+    if search:
+        query = RECIPES_SEARCH_QUERY
+    elif not in_collection:
+        query = RECIPES_PER_COLLECTION_QUERY
+        conditions.append(sql.SQL('r.collection_id = c.collection_id'))
+
+    if in_collection:
+        conditions.append(sql.SQL('r.collection_id = %(collection_id)s'))
+
+    if after_cursor:
+        conditions.append(
+            sql.SQL('({sort_column}, r.id) {sort_order_symbol} (%(cursor_sort_value)s, %(cursor_sort_id)s)').format(
+                sort_column=sort_column,
+                sort_order_symbol=sql.SQL('<') if sort_order == SortOrder.DESC else sql.SQL('>'),
+            )
+        )
 
+    where_clause = sql.SQL('WHERE {}').format(sql.SQL(' AND ').join(conditions)) if conditions else sql.SQL('')
     sort_order_sql = sql.SQL('DESC') if sort_order == SortOrder.DESC else sql.SQL('ASC')
-    query = sql.SQL("""SELECT
-    r.id,
-    r.collection_id,
-    r.title,
-    r.created_at,
-    r.updated_at,
-    r.liked,
-    r.cover_thumbnail
-FROM tso.recipe r
-{where_clause}
-ORDER BY r.{sort_field} {sort_order}, r.id {sort_order}
-LIMIT %(limit)s""").format(
-        sort_field=sql.Identifier(sort_field), sort_order=sort_order_sql, where_clause=sql.Composed(where_clause)
+    order_by = sql.SQL('ORDER BY {sort_column} {sort_order}, r.id {sort_order}\nLIMIT %(limit)s').format(
+        sort_column=sort_column, sort_order=sort_order_sql
     )
-    params = {'limit': limit + 1} | where_clause_params
-    res = await (await cur.execute(query, params)).fetchall()
 
-    if len(res) != limit + 1:
-        return (res, None)
+    return query.format(columns=RECIPE_LIGHT_COLUMNS, where_clause=where_clause, order_by=order_by).as_string()
+
+
+def _check_cursor(cursor: PageCursor, cursor_field: str, sort_order: SortOrder) -> None:
+    if cursor.sort_order != sort_order:
+        msg = "sort_order doesn't match"
+        raise CursorPaginationError(msg)
+
+    if cursor.sort_field != cursor_field:
+        msg = "sort_field doesn't match"
+        raise CursorPaginationError(msg)
 
-    cursor_value = res[limit - 1]
 
-    new_cursor_value = cursor_value.get(sort_field)
+def _page_cursor(last_row: DictRow, cursor_field: str, sort_order: SortOrder) -> PageCursor:
+    new_cursor_value = last_row.get(cursor_field)
     if new_cursor_value is None:
         msg = 'new_cursor_value is none'
         raise CursorPaginationError(msg)
 
-    new_cursor_id = cursor_value.get('id')
+    new_cursor_id = last_row.get('id')
 
     if new_cursor_id is None:
         msg = 'new_cursor_id is None'
         raise CursorPaginationError(msg)
 
-    new_cursor_struct = CursorStructure.model_validate(
-        {'last_value': new_cursor_value, 'sort_order': sort_order, 'sort_field': sort_field, 'last_id': new_cursor_id}
-    )
-
-    new_cursor = base64.urlsafe_b64encode(new_cursor_struct.model_dump_json(by_alias=True).encode('utf-8')).decode(
-        'utf-8'
+    return PageCursor(
+        last_value=new_cursor_value, sort_order=sort_order, sort_field=cursor_field, last_id=new_cursor_id
     )
 
-    return res[:-1], new_cursor
-
 
 async def update_cover_image(
     recipe_id: UUID, asset_cover_id: UUID, asset_thumbnail_id: UUID, cur: AsyncCursor[DictRow]
@@ -125,7 +225,7 @@ async def update_liked(liked: bool, recipe_id: UUID, cur: AsyncCursor[DictRow]):
 
 
 async def update_recipe(recipe: RecipeUpdate, recipe_id: UUID, cur: AsyncCursor[DictRow]):
-    query = """UPDATE tso.recipe
+    query = sql.SQL("""UPDATE tso.recipe
     SET
         title = %(title)s,
         note = %(note)s,
@@ -136,7 +236,7 @@ async def update_recipe(recipe: RecipeUpdate, recipe_id: UUID, cur: AsyncCursor[
         original_url = %(original_url)s
     WHERE
         id = %(id)s
-    RETURNING *"""
+    RETURNING {columns}""").format(columns=RECIPE_COLUMNS)
     res = await (
         await cur.execute(
             query,
@@ -160,11 +260,31 @@ async def update_recipe(recipe: RecipeUpdate, recipe_id: UUID, cur: AsyncCursor[
     return res
 
 
+async def touch_recipe(recipe_id: UUID, cur: AsyncCursor[DictRow]):
+    # only the ingredients or instructions changed, the recipe still counts as updated
+    query = sql.SQL('UPDATE tso.recipe SET updated_at = now() WHERE id = %s RETURNING {columns}').format(
+        columns=RECIPE_COLUMNS
+    )
+    res = await (await cur.execute(query, (recipe_id,))).fetchone()
+
+    if res is None:
+        msg = 'recipe'
+        raise NoneAfterUpdateError(msg, recipe_id)
+
+    return res
+
+
+async def get_recipe_for_update(recipe_id: UUID, cur: AsyncCursor[DictRow]):
+    """Return the plain `tso.recipe` row and lock it until the end of the transaction."""
+    query = sql.SQL('SELECT {columns} FROM tso.recipe WHERE id = %s FOR UPDATE').format(columns=RECIPE_COLUMNS)
+    return await (await cur.execute(query, (recipe_id,))).fetchone()
+
+
 async def create_recipe(recipe: RecipeCreate, collection_id: UUID, created_by: UUID, cur: AsyncCursor[DictRow]):
-    query = """INSERT INTO tso.recipe
+    query = sql.SQL("""INSERT INTO tso.recipe
     (id, collection_id, created_by, title, cook_time, prep_time, yield, liked, note, original_url)
     VALUES (%(id)s, %(collection)s, %(created_by)s, %(title)s, %(cook_time)s, %(prep_time)s, %(yield)s, %(liked)s, %(note)s, %(original_url)s)
-    RETURNING *"""
+    RETURNING {columns}""").format(columns=RECIPE_COLUMNS)
 
     recipe_id = uuid6.uuid7()
     res = await (
@@ -227,7 +347,9 @@ async def get_recipe_by_id(recipe_id: UUID, cur: AsyncCursor[DictRow]):
             WHERE ing.recipe_id = r.id
         ) AS ingredients,
         ( SELECT asset.id FROM tso.asset WHERE asset.id = r.cover_image ) AS cover_image,
-        ( SELECT asset.id FROM tso.asset WHERE asset.id = r.cover_thumbnail ) AS cover_thumbnail
+        ( SELECT asset.id FROM tso.asset WHERE asset.id = r.cover_thumbnail ) AS cover_thumbnail,
+        ( SELECT asset.path FROM tso.asset WHERE asset.id = r.cover_image ) AS cover_image_path,
+        ( SELECT asset.path FROM tso.asset WHERE asset.id = r.cover_thumbnail ) AS cover_thumbnail_path
     FROM tso.recipe AS r
     WHERE r.id = %s"""
-    return await (await cur.execute(query, (recipe_id,))).fetchone()
+    return await (await cur.execute(query, (recipe_id,), prepare=True)).fetchone()
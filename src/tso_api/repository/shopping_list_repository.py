@@ -147,7 +147,7 @@ LEFT JOIN list_entries_data led ON l.id = led.list_id
 WHERE l.id = %(list_id)s;
 """
 
-    res = await cur.execute(query, {'list_id': list_id})
+    res = await cur.execute(query, {'list_id': list_id}, prepare=True)
 
     row = await res.fetchone()
 
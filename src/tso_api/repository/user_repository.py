@@ -44,7 +44,17 @@ FROM
     tso.account
 WHERE
     issuer = %s and subject = %s"""
-    return await (await cur.execute(query, (issuer, subject))).fetchone()
+    return await (await cur.execute(query, (issuer, subject), prepare=True)).fetchone()
+
+
+async def get_user_by_id(account_id: UUID, cur: AsyncCursor[DictRow]):
+    query = """SELECT
+    id, subject, issuer, created_at, COALESCE(display_name, subject) AS display_name
+FROM
+    tso.account
+WHERE
+    id = %s"""
+    return await (await cur.execute(query, (account_id,))).fetchone()
 
 
 async def get_users(cur: AsyncCursor[DictRow], user_id: UUID | None, search: str | None, limit: int) -> list[DictRow]:
@@ -1,16 +1,67 @@
+import datetime
+import time
+from email.utils import format_datetime
+from typing import Annotated
+from urllib.parse import quote
 from uuid import UUID
 
-from fastapi import APIRouter, Response
+from fastapi import APIRouter, Depends, Response, status
 from fastapi.responses import FileResponse
 
-from tso_api.dependency import GetUser, RecipeAssetServiceDep
+from tso_api.config import settings
+from tso_api.dependency import AssetUrlSignerDep, GetUser, RecipeAssetServiceDep, asset_negotiation
+from tso_api.models.asset import Asset
+from tso_api.models.query_params import AssetNegotiation
+from tso_api.service.recipe_asset import asset_etag, etag_matches
 
 router = APIRouter(prefix='/api/asset')
 
 
+@router.get('/signed/{path:path}')
+async def get_signed_asset(path: str, expires: int, signature: str, asset_url_signer: AssetUrlSignerDep) -> Response:
+    # no user and no database, the signature is the permission
+    asset_path = asset_url_signer.verify(path, expires, signature)
+    headers = {'cache-control': f'public, max-age={max(expires - int(time.time()), 0)}, immutable'}
+    if settings.asset_accel_redirect is not None:
+        # nginx sends the file from its internal location for data_dir
+        headers['x-accel-redirect'] = f'{settings.asset_accel_redirect.rstrip("/")}/{quote(path)}'
+        return Response(headers=headers)
+
+    return FileResponse(asset_path, headers=headers)
+
+
 @router.get('/{collection_id}/{asset_id}')
 async def get_asset(
-    user: GetUser, collection_id: UUID, asset_id: UUID, recipe_asset_service: RecipeAssetServiceDep, response: Response
-) -> FileResponse:
-    asset = await recipe_asset_service.get_asset(collection_id, asset_id, user)
-    return FileResponse(asset.path, headers={'cache-control': 'private, max-age=31536000'})
\ No newline at end of file
+    user: GetUser,
+    collection_id: UUID,
+    asset_id: UUID,
+    recipe_asset_service: RecipeAssetServiceDep,
+    negotiation: Annotated[AssetNegotiation, Depends(asset_negotiation)],
+) -> Response:
+    # revalidations of recently fetched assets are answered without a query or touching the file
+    asset = recipe_asset_service.get_unmodified_asset(
+        collection_id,
+        asset_id,
+        user,
+        if_none_match=negotiation.if_none_match,
+        accept=negotiation.accept,
+        width=negotiation.width,
+    )
+    if asset is not None:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_asset_headers(asset))
+
+    asset = await recipe_asset_service.get_asset(collection_id, asset_id, user, negotiation.accept, negotiation.width)
+    if negotiation.if_none_match and etag_matches(negotiation.if_none_match, asset_etag(asset)):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_asset_headers(asset))
+
+    # FileResponse answers Range requests, If-Range is compared with the ETag and Last-Modified set here
+    return FileResponse(asset.path, media_type=asset.mime_type, headers=_asset_headers(asset))
+
+
+def _asset_headers(asset: Asset) -> dict[str, str]:
+    return {
+        'cache-control': 'private, max-age=31536000',
+        'vary': 'accept',
+        'etag': asset_etag(asset),
+        'last-modified': format_datetime(asset.created_at.astimezone(datetime.UTC), usegmt=True),
+    }
@@ -0,0 +1,34 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import os
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends
+from psycopg_pool import AsyncConnectionPool
+
+from tso_api.db import db_pool_fn
+from tso_api.dependency import BlobStoreDep, UserServiceDep
+from tso_api.models.stats import DiskUsage, InternalStats, PoolStats
+
+router = APIRouter(prefix='/internal', tags=['Internal'], include_in_schema=False)
+
+
+@router.get('/stats', summary='Statistics of the worker process that handled the request')
+async def get_stats(
+    pool: Annotated[AsyncConnectionPool[Any], Depends(db_pool_fn)], user_service: UserServiceDep
+) -> InternalStats:
+    async with pool.connection() as conn:
+        res = await (await conn.execute('SELECT count(*) FROM pg_prepared_statements')).fetchone()
+
+    return InternalStats(
+        pid=os.getpid(),
+        db_pool=PoolStats.from_pool_stats(pool.get_stats()),
+        db_prepared_statements=res[0] if res else 0,
+        identity_cache=user_service.identity_cache.stats(),
+    )
+
+
+@router.get('/disk-usage', summary='Space taken up by the asset files, shared by all worker processes')
+async def get_disk_usage(blob_store: BlobStoreDep) -> DiskUsage:
+    return await blob_store.disk_usage()
@@ -2,17 +2,28 @@ from typing import Annotated
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, UploadFile
+from fastapi.responses import StreamingResponse
 
 from tso_api.dependency import (
     GetUser,
+    ImportJobServiceDep,
     RecipeAssetServiceDep,
     RecipeImportServiceDep,
     RecipeServiceDep,
     recipe_list_query_parameters,
 )
 from tso_api.models.base import ListResponse
+from tso_api.models.import_job import ImportJob
 from tso_api.models.query_params import RecipeQueryParams
-from tso_api.models.recipe import ImportRecipe, RecipeCreate, RecipeFull, RecipeLight, RecipeUpdate
+from tso_api.models.recipe import (
+    BulkImportRecipes,
+    BulkImportResult,
+    ImportRecipe,
+    RecipeCreate,
+    RecipeFull,
+    RecipeLight,
+    RecipeUpdate,
+)
 
 router = APIRouter(prefix='/api/recipe', tags=['Recipe'])
 
@@ -26,6 +37,11 @@ async def get_all_recipes_for_user(
     return await recipe_service.get_recipes_by_user(user, query_params)
 
 
+@router.get('/import/{job_id}')
+async def get_import_job(user: GetUser, job_id: UUID, import_job_service: ImportJobServiceDep) -> ImportJob:
+    return await import_job_service.get_job(job_id, user)
+
+
 @router.get('/{collection_id}/{recipe_id}')
 async def get_recipe_by_id(
     user: GetUser, recipe_id: UUID, collection_id: UUID, recipe_service: RecipeServiceDep
@@ -40,11 +56,28 @@ async def create_recipe_in_collection(
     return await recipe_service.create(recipe_create, user, collection_id)
 
 
-@router.post('/{collection_id}/import')
+@router.post('/{collection_id}/import', status_code=202)
 async def import_recipe_from_url(
-    recipe_import: ImportRecipe, user: GetUser, collection_id: UUID, recipe_import_service: RecipeImportServiceDep
-) -> RecipeFull:
-    return await recipe_import_service.scrape_and_save_recipe(str(recipe_import.url), user, collection_id)
+    recipe_import: ImportRecipe, user: GetUser, collection_id: UUID, import_job_service: ImportJobServiceDep
+) -> ImportJob:
+    # the import runs in the background, its progress is available from GET /api/recipe/import/{job_id}
+    return await import_job_service.enqueue(str(recipe_import.url), user, collection_id)
+
+
+@router.post(
+    '/{collection_id}/import/bulk',
+    response_class=StreamingResponse,
+    responses={200: {'content': {'application/x-ndjson': {'schema': BulkImportResult.model_json_schema()}}}},
+)
+async def bulk_import_recipes_from_urls(
+    bulk_import: BulkImportRecipes, user: GetUser, collection_id: UUID, recipe_import_service: RecipeImportServiceDep
+) -> StreamingResponse:
+    # responds with one JSON line per URL as soon as its recipe is imported or failed
+    results = await recipe_import_service.bulk_import([str(url) for url in bulk_import.urls], user, collection_id)
+
+    return StreamingResponse(
+        (result.model_dump_json(by_alias=True) + '\n' async for result in results), media_type='application/x-ndjson'
+    )
 
 
 @router.put('/{collection_id}/{recipe_id}')
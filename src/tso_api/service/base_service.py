@@ -15,9 +15,9 @@ class BaseService:
 
     @asynccontextmanager
     async def _begin(self, user_id: UUID):
+        # switches to tso_api_user and sets the user for RLS in one round trip, both only last for the transaction
         async with self.pool.connection() as conn, conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
-            await cur.execute('SET ROLE tso_api_user')
-            await cur.execute('SELECT tso.set_uid(%s)', (user_id,))
+            await cur.execute('SELECT tso.set_session_context(%s)', (user_id,), prepare=True)
             yield cur
 
     @asynccontextmanager
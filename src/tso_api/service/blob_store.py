@@ -0,0 +1,117 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import asyncio
+import datetime
+import logging
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import psycopg
+from psycopg_pool import AsyncConnectionPool
+
+from tso_api.models.stats import DiskUsage
+from tso_api.repository import blob_repository
+from tso_api.service.base_service import BaseService
+from tso_api.storage import FileStorage
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = 'blobs'
+GC_BATCH_SIZE = 500
+
+
+class BlobStore(BaseService):
+    """
+    Stores asset files by the SHA-256 hash of their content under `data_dir/blobs`.
+
+    Assets refer to a blob with their blob_hash, the database counts the references (see the blob-store migration).
+    Writing a blob that exists is a no-op and deleting an asset only releases its blob, the files of blobs without
+    references are removed by `collect_garbage`, which every API process runs every `gc_interval` seconds. Files
+    that an upload of the same content got to use again are kept, so are those of a batch the collection failed
+    on after deleting its rows, a file without a row is only wasted space.
+    """
+
+    def __init__(
+        self,
+        pool: AsyncConnectionPool[Any],
+        storage: FileStorage,
+        data_dir: Path,
+        *,
+        gc_interval: float,
+        gc_grace: float,
+    ) -> None:
+        super().__init__(pool)
+        self.storage = storage
+        self.root = data_dir / BLOB_DIR
+        self.gc_interval = gc_interval
+        # unreferenced blobs are kept this long, signed URLs and cached responses may still point to them
+        self.gc_grace = datetime.timedelta(seconds=gc_grace)
+        self._task: asyncio.Task[None] | None = None
+
+    def blob_path(self, digest: str, extension: str) -> Path:
+        # a level of directories by the first byte keeps the directories small
+        return self.root / digest[:2] / f'{digest}.{extension}'
+
+    async def write_blob(self, path: Path, data: bytes) -> None:
+        """Write the blob file at `path` (from `blob_path`) unless it exists."""
+        await self.storage.write(path, data, overwrite=False)
+
+    async def collect_garbage(self) -> int:
+        """Delete the blobs that have not been referenced for the grace period and their files, return how many."""
+        collected = 0
+        while True:
+            # the rows go first, a failure leaves files without a row behind but never a blob without its file
+            async with self._begin_unsafe() as cur:
+                blobs = await blob_repository.delete_unreferenced_blobs(self.gc_grace, GC_BATCH_SIZE, cur)
+            if not blobs:
+                return collected
+
+            async with self._begin_unsafe() as cur:
+                deletable = set(await blob_repository.lock_deleted_blob_files([blob['hash'] for blob in blobs], cur))
+                # the locks are held until the files are gone, an upload of the same content waits for that
+                await self.storage.delete_many(self._blob_files([blob for blob in blobs if blob['hash'] in deletable]))
+
+            collected += len(blobs)
+
+    async def disk_usage(self) -> DiskUsage:
+        async with self._begin_unsafe() as cur:
+            usage = await blob_repository.get_disk_usage(cur)
+
+        return DiskUsage.model_validate(usage)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._collect_periodically())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _collect_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.gc_interval)
+            try:
+                collected = await self.collect_garbage()
+            except (psycopg.Error, OSError):
+                logger.exception('blob garbage collection failed')
+            else:
+                if collected:
+                    logger.info('garbage collection deleted %d blobs', collected)
+
+    def _blob_files(self, blobs: Sequence[dict[str, Any]]) -> list[Path]:
+        paths: list[Path] = []
+        for blob in blobs:
+            path = Path(blob['path'])
+            # the path is stored by the API, it is checked anyway before a file is deleted on its behalf
+            if path != self.blob_path(blob['hash'], path.suffix.removeprefix('.')):
+                logger.warning('blob %s has the unexpected path %s, its file is kept', blob['hash'], path)
+                continue
+
+            paths.append(path)
+
+        return paths
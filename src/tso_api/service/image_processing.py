@@ -0,0 +1,134 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+# Runs in the image worker processes, keep the imports free of settings, database and web framework modules.
+
+import hashlib
+from collections.abc import Sequence
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Literal
+
+from PIL import Image
+from PIL.Image import Resampling
+
+# the first bytes of the image formats accepted for cover images, by Pillow format name
+IMAGE_SIGNATURES = {'JPEG': (b'\xff\xd8\xff',), 'PNG': (b'\x89PNG\r\n\x1a\n',), 'GIF': (b'GIF87a', b'GIF89a')}
+IMAGE_SNIFF_SIZE = 12
+# the formats renditions are encoded in, by Pillow format name
+MIME_TYPES = {'AVIF': 'image/avif', 'WEBP': 'image/webp', 'JPEG': 'image/jpeg'}
+FILE_EXTENSIONS = {'AVIF': 'avif', 'WEBP': 'webp', 'JPEG': 'jpg'}
+
+
+@dataclass(frozen=True, slots=True)
+class ImageRendition:
+    """A square version of the cover image `width` pixels wide, encoded as `format` (a key of MIME_TYPES)."""
+
+    width: int
+    format: Literal['AVIF', 'WEBP', 'JPEG']
+    quality: int = 80
+
+    @property
+    def mime_type(self) -> str:
+        return MIME_TYPES[self.format]
+
+    @property
+    def extension(self) -> str:
+        return FILE_EXTENSIONS[self.format]
+
+
+# always rendered, the recipe's cover_image and cover_thumbnail refer to them
+RECIPE_COVER = ImageRendition(800, 'WEBP')
+RECIPE_COVER_THUMBNAIL = ImageRendition(400, 'WEBP')
+# small tiles for list views, large ones for high density screens, AVIF with JPEG as the fallback for old clients
+DEFAULT_COVER_RENDITIONS = (
+    *(ImageRendition(width, 'WEBP', 75) for width in (96, 192, 1600)),
+    *(ImageRendition(width, 'AVIF', 60) for width in (96, 192, 400, 800, 1600)),
+    *(ImageRendition(width, 'JPEG', 80) for width in (96, 192, 400, 800, 1600)),
+)
+
+
+@dataclass(frozen=True, slots=True)
+class RenderedImage:
+    rendition: ImageRendition
+    data: bytes
+    # the SHA-256 hash of data in hex, the name of its blob
+    digest: str
+
+
+def can_encode(image_format: str) -> bool:
+    """Whether the installed Pillow can write `image_format`, AVIF needs Pillow 11.3 or a plugin."""
+    Image.init()
+    return image_format in Image.SAVE
+
+
+def sniff_image_format(header: bytes) -> str | None:
+    """Return the format of the image starting with `header` (at least IMAGE_SNIFF_SIZE bytes), None if unsupported."""
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+
+    for image_format, signatures in IMAGE_SIGNATURES.items():
+        if header.startswith(signatures):
+            return image_format
+
+    return None
+
+
+def render_recipe_cover(image: bytes, renditions: Sequence[ImageRendition]) -> list[RenderedImage]:
+    """
+    Decode `image` once and encode every rendition from it.
+
+    Renditions wider than the image are skipped, smaller images are only scaled up to the width of RECIPE_COVER.
+    """
+    # decoding, resizing and encoding all hold the GIL, only the encoded images are sent back to the API process
+    max_width = max(rendition.width for rendition in renditions)
+    img = Image.open(BytesIO(image))
+    # Image.open only reads the header, draft makes the JPEG decoder scale down by up to 8 while decoding, as far as
+    # the largest rendition allows, so a 40 megapixel photo doesn't have to be decoded at full size
+    img.draft(None, (max_width, max_width))
+    if img.mode not in {'RGB', 'RGBA'}:
+        # palette, grayscale and CMYK images, the encoders don't support all of them
+        img = img.convert('RGBA' if img.has_transparency_data else 'RGB')
+    base_width = min(max_width, max(min(img.size), RECIPE_COVER.width))
+    base = _crop_square(img, base_width)
+
+    rendered: list[RenderedImage] = []
+    # each rendition is scaled down from the next larger one, which is faster and looks the same as from the base
+    scaled = base
+    for rendition in sorted(renditions, key=lambda r: r.width, reverse=True):
+        if rendition.width > base_width:
+            continue
+        if scaled.width != rendition.width:
+            scaled = scaled.resize(  # pyright: ignore[reportUnknownMemberType]
+                (rendition.width, rendition.width), Resampling.LANCZOS
+            )
+        data = _encode(scaled, rendition)
+        rendered.append(RenderedImage(rendition, data, hashlib.sha256(data).hexdigest()))
+
+    return rendered
+
+
+def _encode(image: Image.Image, rendition: ImageRendition) -> bytes:
+    if rendition.format == 'JPEG' and image.mode != 'RGB':
+        # JPEG has no alpha channel
+        image = image.convert('RGB')
+
+    buffer = BytesIO()
+    image.save(buffer, rendition.format, quality=rendition.quality)
+    return buffer.getvalue()
+
+
+def _crop_square(image: Image.Image, width: int) -> Image.Image:
+    # scales the image so its shorter side is `width` and cuts a square out of its center
+    (current_width, current_height) = image.size
+    if current_width == current_height == width:
+        return image
+
+    scale = width / min(current_width, current_height)
+    new_width = max(round(current_width * scale), width)
+    new_height = max(round(current_height * scale), width)
+    img = image.resize((new_width, new_height), Resampling.LANCZOS)  # pyright: ignore[reportUnknownMemberType]
+
+    left = (new_width - width) // 2
+    top = (new_height - width) // 2
+    return img.crop((left, top, left + width, top + width))
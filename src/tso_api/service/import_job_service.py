@@ -0,0 +1,210 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import asyncio
+import datetime
+import logging
+import time
+from typing import Any
+from uuid import UUID
+
+import httpx
+import psycopg
+from psycopg.rows import DictRow
+from psycopg_pool import AsyncConnectionPool
+
+from tso_api.exceptions import ApiError, ResourceNotFoundError, ScrapeRecipeError
+from tso_api.models.import_job import ImportJob
+from tso_api.models.recipe import RecipeFull
+from tso_api.models.user import User
+from tso_api.repository import collection_repository, import_job_repository, user_repository
+from tso_api.service.base_service import BaseService
+from tso_api.service.recipe_import_service import RecipeImportService
+
+logger = logging.getLogger(__name__)
+
+# failed attempts are retried after RETRY_DELAY * 2^(attempt - 1)
+RETRY_DELAY = datetime.timedelta(seconds=30)
+# error of jobs whose worker died or hung on every attempt
+LEASE_EXPIRED_ERROR = 'the import did not finish in time'
+
+
+class ImportJobService(BaseService):
+    """
+    Queues recipe imports in Postgres and processes them in background workers.
+
+    Every API process runs `workers` workers, they share the queue through `claim_job`, so an import is picked up
+    by whichever process has a free worker first.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        pool: AsyncConnectionPool[Any],
+        recipe_import_service: RecipeImportService,
+        *,
+        workers: int,
+        poll_interval: float,
+        max_attempts: int,
+        lease: float,
+    ) -> None:
+        super().__init__(pool)
+        self.recipe_import_service = recipe_import_service
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.lease = datetime.timedelta(seconds=lease)
+        self._tasks: list[asyncio.Task[None]] = []
+
+    async def enqueue(self, recipe_url: str, user: User, collection_id: UUID) -> ImportJob:
+        async with self._begin(user.id) as cur:
+            if await collection_repository.get_collection_by_id(collection_id, cur) is None:
+                msg = f'collection with id {collection_id} not found'
+                raise ResourceNotFoundError(msg)
+
+            job = await import_job_repository.create_job(recipe_url, user.id, collection_id, cur)
+
+        return _import_job_from_row(job)
+
+    async def get_job(self, job_id: UUID, user: User) -> ImportJob:
+        async with self._begin(user.id) as cur:
+            job = await import_job_repository.get_job(job_id, cur)
+            if job is None:
+                msg = f'import job with id {job_id} not found'
+                raise ResourceNotFoundError(msg)
+
+        return _import_job_from_row(job)
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        # jobs that are interrupted here stay leased and are picked up again once the lease runs out
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def run_next_job(self) -> bool:
+        """Claim and run the next due job, return whether there was one."""
+        async with self._begin_unsafe() as cur:
+            failed = await import_job_repository.fail_exhausted_jobs(self.max_attempts, LEASE_EXPIRED_ERROR, cur)
+            if failed:
+                logger.warning('failed %d import jobs whose leases ran out on every attempt', failed)
+            job = await import_job_repository.claim_job(self.lease, self.max_attempts, cur)
+        if job is None:
+            return False
+
+        await self._run_job(job)
+        return True
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                found_job = await self.run_next_job()
+            except (psycopg.Error, OSError):
+                # the database is unreachable, the job (if any) stays leased
+                logger.exception('import worker failed to reach the database')
+                found_job = False
+
+            if not found_job:
+                await asyncio.sleep(self.poll_interval)
+
+    async def _run_job(self, job: DictRow) -> None:
+        run = asyncio.create_task(self._import(job))
+        heartbeat = asyncio.create_task(self._keep_lease(job, run))
+        try:
+            await asyncio.wait([run])
+        finally:
+            # also reached when the worker is stopped while the import runs
+            heartbeat.cancel()
+            run.cancel()
+
+        if run.cancelled():
+            logger.warning('import job %s lost its lease, it is left to the worker that claimed it next', job['id'])
+            return
+
+        try:
+            recipe = run.result()
+        except (ScrapeRecipeError, ResourceNotFoundError) as e:
+            # the page doesn't contain a recipe or the collection is gone, trying again won't change that
+            await self._fail(job, str(e))
+        except (ApiError, httpx.HTTPError, psycopg.Error, OSError) as e:
+            await self._retry_or_fail(job, str(e) or e.__class__.__name__)
+        except Exception:  # a broken job must not take the worker down with it
+            logger.exception('import job %s failed', job['id'])
+            await self._fail(job, 'internal error')
+        else:
+            async with self._begin_unsafe() as cur:
+                await import_job_repository.complete_job(job['id'], job['attempts'], recipe.id, cur)
+
+    async def _import(self, job: DictRow) -> RecipeFull:
+        user = await self._get_user(job['account_id'])
+        return await self.recipe_import_service.scrape_and_save_recipe(job['url'], user, job['collection_id'])
+
+    async def _keep_lease(self, job: DictRow, run: asyncio.Task[RecipeFull]) -> None:
+        """
+        Extend the lease of a running job every third of the lease.
+
+        If the lease can't be extended before it runs out another worker may claim the job, the import is
+        cancelled then so the recipe isn't imported twice.
+        """
+        lease = self.lease.total_seconds()
+        expires_at = time.monotonic() + lease
+        while True:
+            await asyncio.sleep(lease / 3)
+            try:
+                async with self._begin_unsafe() as cur:
+                    held = await import_job_repository.extend_lease(job['id'], job['attempts'], self.lease, cur)
+            except (psycopg.Error, OSError):
+                logger.exception('failed to extend the lease of import job %s', job['id'])
+                # the next attempt has to succeed before the current lease runs out
+                held = time.monotonic() + lease / 3 < expires_at
+            else:
+                expires_at = time.monotonic() + lease
+
+            if not held:
+                run.cancel()
+                return
+
+    async def _get_user(self, account_id: UUID) -> User:
+        async with self._begin_unsafe() as cur:
+            account = await user_repository.get_user_by_id(account_id, cur)
+        if account is None:
+            msg = f'account with id {account_id} not found'
+            raise ResourceNotFoundError(msg)
+
+        return User(
+            id=account['id'],
+            subject=account['subject'],
+            issuer=account['issuer'],
+            created_at=account['created_at'],
+            display_name=account['display_name'],
+        )
+
+    async def _retry_or_fail(self, job: DictRow, error: str) -> None:
+        if job['attempts'] >= self.max_attempts:
+            await self._fail(job, error)
+            return
+
+        async with self._begin_unsafe() as cur:
+            await import_job_repository.retry_job(
+                job['id'], job['attempts'], error, RETRY_DELAY * 2 ** (job['attempts'] - 1), cur
+            )
+
+    async def _fail(self, job: DictRow, error: str) -> None:
+        async with self._begin_unsafe() as cur:
+            await import_job_repository.fail_job(job['id'], job['attempts'], error, cur)
+
+
+def _import_job_from_row(row: DictRow) -> ImportJob:
+    return ImportJob(
+        id=row['id'],
+        url=row['url'],
+        collection_id=row['collection_id'],
+        status=row['status'],
+        attempts=row['attempts'],
+        recipe_id=row['recipe_id'],
+        error=row['error'],
+        created_at=row['created_at'],
+        updated_at=row['updated_at'],
+    )
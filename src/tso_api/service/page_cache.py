@@ -0,0 +1,119 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import datetime
+import logging
+from dataclasses import dataclass
+from typing import Any
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import psycopg
+from psycopg_pool import AsyncConnectionPool
+
+from tso_api.models.recipe import RecipeCreate
+from tso_api.repository import page_cache_repository
+from tso_api.service.base_service import BaseService
+from tso_api.service.recipe_parser import ParsedRecipe
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+# tracking parameters that don't change the page, links shared from newsletters and social media are full of them
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid')
+# once the cache is over its size, pages are evicted in batches until it is down to this share of it, so the stores
+# right after don't evict again
+EVICT_TARGET = 0.9
+EVICT_BATCH_SIZE = 100
+
+
+def normalize_url(url: str) -> str:
+    """
+    Return the cache key of `url`, links that lead to the same page get the same key.
+
+    The scheme and host are lowercased, the default port, the fragment and tracking parameters are dropped and the
+    remaining query parameters are sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port is not None and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query), ''))
+
+
+@dataclass(frozen=True, slots=True)
+class CachedPage:
+    recipe: ParsedRecipe
+    etag: str | None
+    last_modified: str | None
+    fresh: bool
+
+
+class PageCache(BaseService):
+    """
+    Keeps fetched recipe pages and the recipes parsed from them in Postgres, shared by all workers and processes.
+
+    The cache only saves work, every database error is logged and treated like a miss so imports keep working
+    without it.
+    """
+
+    def __init__(self, pool: AsyncConnectionPool[Any], ttl: float, max_size: int) -> None:
+        super().__init__(pool)
+        self.ttl = datetime.timedelta(seconds=ttl)
+        self.max_size = max_size
+
+    async def get(self, url: str) -> CachedPage | None:
+        try:
+            async with self._begin_unsafe() as cur:
+                res = await page_cache_repository.get_page(normalize_url(url), cur)
+        except psycopg.Error:
+            logger.exception('failed to read %s from the page cache', url)
+            return None
+
+        if res is None:
+            return None
+
+        recipe = RecipeCreate.model_validate(res['recipe']['recipe'])
+        # links that differ in tracking parameters share the entry, the recipe links to the page it was imported from
+        recipe.original_url = url
+        return CachedPage(
+            recipe=ParsedRecipe(recipe=recipe, image_url=res['recipe']['image_url']),
+            etag=res['etag'],
+            last_modified=res['last_modified'],
+            fresh=res['fetched_at'] + self.ttl > datetime.datetime.now(datetime.UTC),
+        )
+
+    async def store(self, url: str, parsed: ParsedRecipe, etag: str | None, last_modified: str | None):
+        recipe = {'recipe': parsed.recipe.model_dump(mode='json'), 'image_url': parsed.image_url}
+        try:
+            async with self._begin_unsafe() as cur:
+                await page_cache_repository.store_page(
+                    normalize_url(url), recipe, cur, etag=etag, last_modified=last_modified
+                )
+                size = await page_cache_repository.get_cache_size(cur)
+            if size > self.max_size:
+                await self._evict()
+        except psycopg.Error:
+            logger.exception('failed to store %s in the page cache', url)
+
+    async def _evict(self) -> None:
+        # a transaction per batch, the size counter is locked by every eviction and store until it commits
+        target = self.max_size * EVICT_TARGET
+        while True:
+            async with self._begin_unsafe() as cur:
+                if await page_cache_repository.get_cache_size(cur) <= target:
+                    return
+                if not await page_cache_repository.evict_pages(EVICT_BATCH_SIZE, cur):
+                    return
+
+    async def mark_fresh(self, url: str) -> None:
+        try:
+            async with self._begin_unsafe() as cur:
+                await page_cache_repository.mark_page_fresh(normalize_url(url), cur)
+        except psycopg.Error:
+            logger.exception('failed to refresh %s in the page cache', url)
@@ -2,135 +2,223 @@
 # SPDX-License-Identifier: AGPL-3.0-only
 
 import asyncio
+import logging
+from collections.abc import Sequence
 from pathlib import Path
-from typing import BinaryIO
+from typing import Any, BinaryIO, cast
 from uuid import UUID
 
 import uuid6
-from PIL import Image
-from PIL.Image import Resampling
-from PIL.ImageFile import ImageFile
-from psycopg import AsyncCursor
 from psycopg.rows import DictRow
+from psycopg_pool import AsyncConnectionPool
 
+from tso_api.cache import TTLCache
 from tso_api.config import settings
-from tso_api.exceptions import ResourceNotFoundError
+from tso_api.exceptions import ImageProcessingBusyError, ResourceNotFoundError
 from tso_api.models.asset import Asset, AssetBase
 from tso_api.models.user import User
+from tso_api.process_pool import BoundedProcessPool, PoolFullError
 from tso_api.repository import asset_repository, recipe_repository
 from tso_api.service.base_service import BaseService
+from tso_api.service.blob_store import BlobStore
+from tso_api.service.image_processing import (
+    RECIPE_COVER,
+    RECIPE_COVER_THUMBNAIL,
+    ImageRendition,
+    RenderedImage,
+    can_encode,
+    render_recipe_cover,
+)
 
-RECIPE_COVER_IMAGE_RESOLUTION = (800, 800)
-RECIPE_COVER_IMAGE_THUMBNAIL_RESOLUTION = (400, 400)
-RECIPE_COVER_IMAGE_FORMAT = 'webp'
-RECIPE_COVER_IMAGE_MIME_TYPE = 'image/webp'
+logger = logging.getLogger(__name__)
+
+
+# preferred formats of renditions, clients get the first one they name in their Accept header
+FORMAT_PREFERENCE = ('image/avif', 'image/webp', 'image/jpeg')
+
+# (user id, collection id, asset id) -> (asset, renditions of the cover image the asset is part of)
+AssetCache = TTLCache[tuple[UUID, UUID, UUID], tuple[Asset, list[Asset]]]
 
 
 class RecipeAssetService(BaseService):
+    def __init__(
+        self,
+        pool: AsyncConnectionPool[Any],
+        image_pool: BoundedProcessPool,
+        blob_store: BlobStore,
+        asset_cache_size: int = 10_000,
+        asset_cache_ttl: float = 300,
+    ) -> None:
+        super().__init__(pool)
+        # decoding, resizing and encoding hold the GIL for long, they run in their own worker processes
+        self.image_pool = image_pool
+        self.blob_store = blob_store
+        self.renditions = _supported_renditions(settings.cover_renditions)
+        self.asset_cache: AssetCache = TTLCache(asset_cache_size, asset_cache_ttl)
+
     async def add_cover_image_to_recipe(
         self, recipe_id: UUID, collection_id: UUID, user: User, file: BinaryIO, filename: str | None
     ):
         loop = asyncio.get_running_loop()
-        img = Image.open(file)
-        cover_image_id = uuid6.uuid7()
-        cover_image = await loop.run_in_executor(None, _resize_for_recipe_cover, img)
-        cover_image_path = await loop.run_in_executor(
-            None, _save_image, cover_image, user.id, recipe_id, cover_image_id, RECIPE_COVER_IMAGE_FORMAT
-        )
+        # the upload may be spooled to disk, it is read in a thread as well
+        image = await loop.run_in_executor(None, file.read)
+        try:
+            rendered = await self.image_pool.run(render_recipe_cover, image, self.renditions)
+        except PoolFullError as e:
+            raise ImageProcessingBusyError from e
+
+        assets = {
+            rendered_image.rendition: self._rendition_asset(rendered_image, recipe_id, filename)
+            for rendered_image in rendered
+        }
         async with self._begin(user.id) as cur:
-            existing_asset = await asset_repository.get_assets_by_recipe(recipe_id, collection_id, cur)
-            if (
-                existing_asset
-                and existing_asset['cover_image'] is not None
-                and existing_asset['cover_thumbnail'] is not None
-            ):
-                await _delete_existing_asset(existing_asset['cover_image'], collection_id, cur)
-                await _delete_existing_asset(existing_asset['cover_thumbnail'], collection_id, cur)
-            await _create_asset(cover_image_path, filename, cover_image_id, collection_id, cur)
-
-            thumbnail_image_id = uuid6.uuid7()
-            thumbnail_image = await loop.run_in_executor(None, _make_thumbnail, cover_image)
-            thumbnail_image_path = await loop.run_in_executor(
-                None, _save_image, thumbnail_image, user.id, recipe_id, thumbnail_image_id, RECIPE_COVER_IMAGE_FORMAT
+            legacy_paths = await asset_repository.delete_assets_by_recipe(recipe_id, collection_id, cur)
+            await asset_repository.create_assets(list(assets.values()), collection_id, cur)
+            # the files are written while the transaction holds the blob rows, the garbage collection can't remove
+            # a blob that is referenced again in the meantime
+            for rendered_image in rendered:
+                await self.blob_store.write_blob(assets[rendered_image.rendition].path, rendered_image.data)
+            await recipe_repository.update_cover_image(
+                recipe_id, assets[RECIPE_COVER].id, assets[RECIPE_COVER_THUMBNAIL].id, cur
             )
 
-            await _create_asset(thumbnail_image_path, filename, thumbnail_image_id, collection_id, cur)
+        await self._delete_legacy_files(legacy_paths)
+
+    async def get_asset(
+        self, collection_id: UUID, asset_id: UUID, user: User, accept: str | None = None, width: int | None = None
+    ):
+        """
+        Return the asset, for cover images the rendition that fits `width` and `accept` best.
 
-            await recipe_repository.update_cover_image(recipe_id, cover_image_id, thumbnail_image_id, cur)
+        Raises:
+            ResourceNotFoundError: The asset doesn't exist or the user can't access it.
 
-    async def get_asset(self, collection_id: UUID, asset_id: UUID, user: User):
+        """
         async with self._begin(user.id) as cur:
             row = await asset_repository.get_asset_by_id(asset_id, collection_id, cur)
             if row is None:
                 raise ResourceNotFoundError(str(asset_id))
 
-        return _asset_from_row(row)
+            asset = _asset_from_row(row)
+            renditions: list[Asset] = []
+            if asset.recipe_id is not None and asset.width is not None:
+                rows = await asset_repository.get_assets_by_recipe(asset.recipe_id, collection_id, cur)
+                renditions = [_asset_from_row(rendition) for rendition in rows]
+
+        self.asset_cache.set((user.id, collection_id, asset_id), (asset, renditions))
+
+        return select_rendition(renditions, asset, accept, width)
+
+    def get_unmodified_asset(  # noqa: PLR0913
+        self,
+        collection_id: UUID,
+        asset_id: UUID,
+        user: User,
+        *,
+        if_none_match: str | None,
+        accept: str | None = None,
+        width: int | None = None,
+    ) -> Asset | None:
+        """
+        Return the asset get_asset would return if the client's copy (`if_none_match`) is still current, else None.
+
+        Only looks at the assets the user fetched recently. Asset files never change, so a rendition that was replaced
+        since is still the same for the client, only downloads of the file need an up to date row from get_asset.
+        """
+        if not if_none_match:
+            return None
+
+        cached = self.asset_cache.get((user.id, collection_id, asset_id))
+        if cached is None:
+            return None
+
+        asset = select_rendition(cached[1], cached[0], accept, width)
+        return asset if etag_matches(if_none_match, asset_etag(asset)) else None
 
     async def delete_assets_from_recipe(self, collection_id: UUID, recipe_id: UUID, user: User):
         async with self._begin(user.id) as cur:
-            assets = await asset_repository.get_assets_by_recipe(recipe_id, collection_id, cur)
-            if assets and assets['cover_image'] is not None and assets['cover_thumbnail'] is not None:
-                await _delete_existing_asset(assets['cover_image'], collection_id, cur)
-                await _delete_existing_asset(assets['cover_thumbnail'], collection_id, cur)
+            legacy_paths = await asset_repository.delete_assets_by_recipe(recipe_id, collection_id, cur)
+
+        await self._delete_legacy_files(legacy_paths)
+
+    async def _delete_legacy_files(self, paths: Sequence[str]) -> None:
+        # files of assets saved before the blob store, blobs are deleted by the garbage collection
+        await self.blob_store.storage.delete_many(Path(path) for path in paths)
+
+    def _rendition_asset(self, rendered: RenderedImage, recipe_id: UUID, original_name: str | None) -> AssetBase:
+        return AssetBase(
+            id=uuid6.uuid7(),
+            path=self.blob_store.blob_path(rendered.digest, rendered.rendition.extension),
+            size=len(rendered.data),
+            original_name=original_name,
+            recipe_id=recipe_id,
+            mime_type=rendered.rendition.mime_type,
+            width=rendered.rendition.width,
+            blob_hash=rendered.digest,
+        )
 
 
-def _asset_from_row(row: DictRow) -> Asset:
-    return Asset.model_validate(row)
+def select_rendition(renditions: Sequence[Asset], requested: Asset, accept: str | None, width: int | None) -> Asset:
+    """
+    Pick the rendition for a request of `requested`.
 
+    The rendition is the narrowest one at least `width` (the width of `requested` by default) wide, or the widest one,
+    in the first format of FORMAT_PREFERENCE the client names in `accept`. Clients that don't name any of them get
+    the format of `requested` or JPEG.
+    """
+    sized = [rendition for rendition in renditions if rendition.width is not None and rendition.mime_type is not None]
+    target_width = width or requested.width
+    if not sized or target_width is None:
+        return requested
 
-async def _delete_existing_asset(asset_id: UUID, collection_id: UUID, cur: AsyncCursor[DictRow]):
-    asset = await asset_repository.get_asset_by_id(asset_id, collection_id, cur)
-    if not asset:
-        msg = 'asset'
-        raise ResourceNotFoundError(msg)
+    widths = sorted({cast('int', rendition.width) for rendition in sized})
+    chosen_width = next((w for w in widths if w >= target_width), widths[-1])
+    by_type = {rendition.mime_type: rendition for rendition in sized if rendition.width == chosen_width}
 
-    path = Path(asset['path'])
-    path.unlink(missing_ok=True)
-    await asset_repository.delete_asset_by_id(asset_id, collection_id, cur)
+    accepted = _accepted_types(accept)
+    preference = [mime_type for mime_type in FORMAT_PREFERENCE if mime_type in accepted]
+    for mime_type in (*preference, requested.mime_type, 'image/jpeg'):
+        if mime_type in by_type:
+            return by_type[mime_type]
 
+    return next(iter(by_type.values()))
 
-async def _create_asset(
-    image_path: Path, original_filename: str | None, image_id: UUID, collection_id: UUID, cur: AsyncCursor[DictRow]
-):
-    asset = AssetBase(id=image_id, path=image_path, size=image_path.stat().st_size, original_name=original_filename)
-    await asset_repository.create_asset(asset, collection_id, cur)
 
+def asset_etag(asset: Asset) -> str:
+    """Return the strong ETag of the asset, asset ids are never reused for other content."""
+    return f'"{asset.id}"'
 
-def _make_thumbnail(img: ImageFile | Image.Image):
-    img_copy = img.copy()
-    img_copy.thumbnail(RECIPE_COVER_IMAGE_THUMBNAIL_RESOLUTION)
-    return img_copy
 
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header matches `etag`, compared weakly as RFC 9110 asks for."""
+    if if_none_match.strip() == '*':
+        return True
 
-def _save_image(image: Image.Image, user_id: UUID, recipe_id: UUID, image_id: UUID, extension: str) -> Path:
-    image_path = Path(settings.data_dir / str(user_id)) / str(recipe_id) / f'{image_id}.{extension}'
-    image_path.parent.mkdir(parents=True, exist_ok=True)
-    image.save(image_path)
+    return any(tag.strip().removeprefix('W/') == etag.removeprefix('W/') for tag in if_none_match.split(','))
 
-    return image_path
 
+def _accepted_types(accept: str | None) -> set[str]:
+    # the media types the client names explicitly, wildcards say nothing about which formats it can decode
+    accepted: set[str] = set()
+    for media_range in (accept or '').split(','):
+        mime_type, *params = (part.strip().lower() for part in media_range.split(';'))
+        if '*' in mime_type or any(param.replace(' ', '').rstrip('0.') == 'q=' for param in params):
+            # q=0 means the client does not accept the type
+            continue
+        accepted.add(mime_type)
 
-def _resize_for_recipe_cover(image: ImageFile):
-    (width, height) = image.size
-    current_ratio = width / height
-    (target_width, target_height) = RECIPE_COVER_IMAGE_RESOLUTION
-    target_ratio = target_width / target_height
+    return accepted
 
-    if height == target_height and width == target_width:
-        return image
 
-    if current_ratio > target_ratio:
-        new_height = target_height
-        new_width = int(new_height * current_ratio)
-    else:
-        new_width = target_width
-        new_height = int(new_width / current_ratio)
+def _supported_renditions(renditions: Sequence[ImageRendition]) -> tuple[ImageRendition, ...]:
+    # the cover and thumbnail the recipe refers to are always rendered
+    unique = dict.fromkeys((RECIPE_COVER, RECIPE_COVER_THUMBNAIL, *renditions))
+    unsupported = sorted({rendition.format for rendition in unique if not can_encode(rendition.format)})
+    if unsupported:
+        logger.warning('Pillow cannot encode %s, cover renditions in these formats are skipped', ', '.join(unsupported))
 
-    img = image.resize((new_width, new_height), Resampling.LANCZOS)  # pyright: ignore[reportUnknownMemberType]
+    return tuple(rendition for rendition in unique if rendition.format not in unsupported)
 
-    left = (new_width - target_width) // 2
-    top = (new_height - target_height) // 2
-    right = left + target_width
-    bottom = top + target_height
 
-    return img.crop((left, top, right, bottom))
+def _asset_from_row(row: DictRow) -> Asset:
+    return Asset.model_validate(row)
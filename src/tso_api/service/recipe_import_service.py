@@ -1,65 +1,126 @@
+import asyncio
+import logging
+import time
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Sequence
+from dataclasses import dataclass
 from io import BytesIO
-from typing import Any, overload
+from typing import Any, cast
 from uuid import UUID
 
 import httpx
+import psycopg
 from psycopg_pool.pool_async import AsyncConnectionPool
-from recipe_scrapers import (
-    AbstractScraper,
-    NoSchemaFoundInWildMode,
-    RecipeSchemaNotFound,
-    StaticValueException,
-    scrape_html,
-)
 
 from tso_api.config import get_settings
-from tso_api.exceptions import ScrapeRecipeError, ScraperError
+from tso_api.exceptions import (
+    ApiError,
+    ImageTooLargeError,
+    ResourceNotFoundError,
+    ScrapeRecipeError,
+    ScraperError,
+    UnsupportedImageError,
+)
 from tso_api.import_util import load_concrete_classes_from_pkg
-from tso_api.models.recipe import RecipeCreate
+from tso_api.models.recipe import BulkImportResult, RecipeFull
 from tso_api.models.user import User
+from tso_api.process_pool import BoundedProcessPool
+from tso_api.repository import collection_repository
 from tso_api.service.base_service import BaseService
+from tso_api.service.image_processing import IMAGE_SNIFF_SIZE, sniff_image_format
+from tso_api.service.page_cache import PageCache
 from tso_api.service.recipe_asset import RecipeAssetService
+from tso_api.service.recipe_parser import ParsedRecipe, RecipeParseError, parse_recipe
 from tso_api.service.recipe_service import RecipeService
 
+logger = logging.getLogger(__name__)
+
+# saved recipes are reported in batches, a slow page must not hold back the results of the ones before it forever
+BATCH_MAX_WAIT = 2
+
+
+@dataclass(frozen=True, slots=True)
+class ScrapedPage:
+    html: str
+    etag: str | None = None
+    last_modified: str | None = None
+
 
 class HTMLScraper(ABC):
+    def __init__(self, http_client: httpx.AsyncClient) -> None:
+        self.http_client = http_client
+
     @abstractmethod
     async def scrape_html(self, url: str) -> str: ...
 
+    async def scrape_page(
+        self,
+        url: str,
+        etag: str | None = None,  # noqa: ARG002
+        last_modified: str | None = None,  # noqa: ARG002
+    ) -> ScrapedPage | None:
+        """
+        Scrape the page along with its cache validators, None means it didn't change since `etag`/`last_modified`.
+
+        Scrapers that can't make conditional requests always return the page.
+        """
+        return ScrapedPage(await self.scrape_html(url))
+
     @property
     @abstractmethod
     def priority(self) -> int: ...
 
 
+@dataclass(frozen=True, slots=True)
+class FetchedRecipe:
+    """The outcome of fetching one URL of a bulk import, either `recipe` or `error` is set."""
+
+    url: str
+    recipe: ParsedRecipe | None = None
+    error: str | None = None
+
+
+class BulkImportProgress:
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self.completed = 0
+
+    def result(self, url: str, recipe_id: UUID | None = None, error: str | None = None) -> BulkImportResult:
+        self.completed += 1
+        return BulkImportResult(url=url, recipe_id=recipe_id, error=error, completed=self.completed, total=self.total)
+
+
 class RecipeImportService(BaseService):
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         pool: AsyncConnectionPool[Any],
         recipe_service: RecipeService,
         recipe_asset_service: RecipeAssetService,
-        user_agent: str,
+        http_client: httpx.AsyncClient,
+        parse_pool: BoundedProcessPool,
+        *,
+        page_cache: PageCache | None = None,
     ) -> None:
         super().__init__(pool)
+        # shared by the HTML scrapers and the image downloads
+        self.http_client = http_client
         self.recipe_service = recipe_service
         self.recipe_asset_service = recipe_asset_service
+        # recipe_scrapers parses the whole page with BeautifulSoup, which blocks the event loop for long on large pages
+        self.parse_pool = parse_pool
+        # repeat imports of a page reuse the recipe parsed the first time, across users and workers
+        self.page_cache = page_cache
         self.html_scrapers: list[HTMLScraper] = []
         self._load_html_scrapers()
 
-        user_agent = get_settings().http_scraper_user_agent
-        timeout = httpx.Timeout(10, connect=5, read=20)
-        self.http_client = httpx.AsyncClient(
-            headers={
-                'user-agent': user_agent,
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            },
-            timeout=timeout,
-            follow_redirects=True,
-        )
+        settings = get_settings()
+        self.import_concurrency = settings.import_concurrency
+        self.import_batch_size = settings.import_batch_size
+        self.import_max_image_size = settings.import_max_image_size
 
     def _load_html_scrapers(self):
         classes = load_concrete_classes_from_pkg('tso_api.service.scraper.html', HTMLScraper)
-        scrapers: list[HTMLScraper] = [cls() for cls in classes]  # type: ignore load_concrete_classes_from_pkg guarantees that the base class will not be returned
+        scrapers: list[HTMLScraper] = [cls(self.http_client) for cls in classes]  # type: ignore load_concrete_classes_from_pkg guarantees that the base class will not be returned
 
         scrapers.sort(key=lambda a: a.priority, reverse=True)
 
@@ -69,84 +130,241 @@ class RecipeImportService(BaseService):
 
         self.html_scrapers = scrapers
 
-    async def _scrape_html(self, recipe_url: str) -> str | None:
+    async def _scrape_page(
+        self, recipe_url: str, etag: str | None = None, last_modified: str | None = None
+    ) -> ScrapedPage | None:
         for scraper in self.html_scrapers:
             try:
-                return await scraper.scrape_html(recipe_url)
+                return await scraper.scrape_page(recipe_url, etag, last_modified)
             except ScraperError:
                 continue
-        return None
 
-    async def scrape_and_save_recipe(self, recipe_url: str, user: User, collection_id: UUID):
-        html_response = await self._scrape_html(recipe_url)
-        if html_response is None:
-            msg = 'failed to scrape html'
-            raise ScraperError(msg)
+        msg = 'failed to scrape html'
+        raise ScraperError(msg)
+
+    async def fetch_recipe(self, recipe_url: str) -> ParsedRecipe:
+        if self.page_cache is None:
+            page = await self._scrape_page(recipe_url)
+            # without validators the page is always returned
+            return await self._parse_page(cast('ScrapedPage', page).html, recipe_url)
+
+        cached = await self.page_cache.get(recipe_url)
+        if cached is not None and cached.fresh:
+            return cached.recipe
 
+        if cached is None:
+            page = await self._scrape_page(recipe_url)
+        else:
+            page = await self._scrape_page(recipe_url, cached.etag, cached.last_modified)
+            if page is None:
+                await self.page_cache.mark_fresh(recipe_url)
+                return cached.recipe
+
+        page = cast('ScrapedPage', page)
+        parsed = await self._parse_page(page.html, recipe_url)
+        await self.page_cache.store(recipe_url, parsed, page.etag, page.last_modified)
+        return parsed
+
+    async def _parse_page(self, html: str, recipe_url: str) -> ParsedRecipe:
         try:
-            scraper = scrape_html(html_response, recipe_url, supported_only=False)
-        except RecipeSchemaNotFound as e:
-            msg = 'recipe schema not found'
-            raise ScrapeRecipeError(msg, recipe_url) from e
-        except NoSchemaFoundInWildMode as e:
-            msg = 'no schema found on the website'
+            return await self.parse_pool.run(parse_recipe, html, recipe_url)
+        except RecipeParseError as e:
+            raise ScrapeRecipeError(str(e), recipe_url) from e
+        except TimeoutError as e:
+            msg = 'parsing the recipe took too long'
             raise ScrapeRecipeError(msg, recipe_url) from e
 
-        title = _get_str(scraper, 'title')
-        if title is None:
-            msg = 'failed to extract a title from HTML'
-            raise ScrapeRecipeError(msg, recipe_url)
-
-        recipe_create = RecipeCreate(
-            title=title,
-            note=_get_str(scraper, 'description', ''),
-            cook_time=_get_int(scraper, 'cook_time'),
-            prep_time=_get_int(scraper, 'prep_time'),
-            recipe_yield=_get_str(scraper, 'yields'),
-            instructions=_get_field(scraper, 'instructions_list'),
-            ingredients=_get_field(scraper, 'ingredients'),
-            original_url=recipe_url,
-        )
-        new_recipe = await self.recipe_service.create(recipe_create, user, collection_id)
+    async def scrape_and_save_recipe(self, recipe_url: str, user: User, collection_id: UUID):
+        parsed = await self.fetch_recipe(recipe_url)
+        new_recipe = await self.recipe_service.create(parsed.recipe, user, collection_id)
+
+        if parsed.image_url is not None:
+            await self._try_add_cover_image(parsed.image_url, new_recipe, user, recipe_url)
 
-        res_image = _get_field(scraper, 'image')
-        if res_image is not None:
-            res_image = await self.http_client.get(_get_field(scraper, 'image'))
-            bytes_io = BytesIO(res_image.content)
+        return await self.recipe_service.get_by_id(new_recipe.id, user)
+
+    async def fetch_recipes(self, recipe_urls: Sequence[str]) -> AsyncIterator[FetchedRecipe]:
+        # fetches and parses the recipes concurrently and yields them in the order they finish, the http client
+        # limits the requests to each site so a long list of links from the same site doesn't hammer it
+        limiter = asyncio.Semaphore(self.import_concurrency)
+        tasks = [asyncio.create_task(self._fetch_recipe_limited(url, limiter)) for url in recipe_urls]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            # the client went away, stop fetching pages nobody will see
+            for task in tasks:
+                task.cancel()
+
+    async def bulk_import(
+        self, recipe_urls: Sequence[str], user: User, collection_id: UUID
+    ) -> AsyncIterator[BulkImportResult]:
+        # checked up front, once the results are streamed the response status can't change anymore
+        async with self._begin(user.id) as cur:
+            if await collection_repository.get_collection_by_id(collection_id, cur) is None:
+                msg = f'collection with id {collection_id} not found'
+                raise ResourceNotFoundError(msg)
+
+        return self._bulk_import(recipe_urls, user, collection_id)
+
+    async def _bulk_import(
+        self, recipe_urls: Sequence[str], user: User, collection_id: UUID
+    ) -> AsyncIterator[BulkImportResult]:
+        image_limiter = asyncio.Semaphore(self.import_concurrency)
+        progress = BulkImportProgress(len(recipe_urls))
+        fetched_queue: asyncio.Queue[FetchedRecipe | None] = asyncio.Queue()
+        fetcher = asyncio.create_task(self._queue_fetched_recipes(recipe_urls, fetched_queue))
+        batch: list[FetchedRecipe] = []
+        batch_deadline = 0.0
+
+        try:
+            while True:
+                try:
+                    # a started batch is saved after BATCH_MAX_WAIT even if no other page finishes in the meantime
+                    timeout = max(batch_deadline - time.monotonic(), 0) if batch else None
+                    fetched = await asyncio.wait_for(fetched_queue.get(), timeout)
+                except TimeoutError:
+                    for result in await self._save_batch(batch, user, collection_id, progress, image_limiter):
+                        yield result
+                    batch = []
+                    continue
+
+                if fetched is None:
+                    break
+
+                if fetched.error is not None:
+                    yield progress.result(fetched.url, error=fetched.error)
+                    continue
+
+                if not batch:
+                    batch_deadline = time.monotonic() + BATCH_MAX_WAIT
+                batch.append(fetched)
+                if len(batch) >= self.import_batch_size:
+                    for result in await self._save_batch(batch, user, collection_id, progress, image_limiter):
+                        yield result
+                    batch = []
 
-            await self.recipe_asset_service.add_cover_image_to_recipe(
-                new_recipe.id, new_recipe.collection, user, bytes_io, recipe_url
+            # raises if fetching failed unexpectedly
+            await fetcher
+            for result in await self._save_batch(batch, user, collection_id, progress, image_limiter):
+                yield result
+        finally:
+            fetcher.cancel()
+
+    async def _queue_fetched_recipes(
+        self, recipe_urls: Sequence[str], fetched_queue: asyncio.Queue[FetchedRecipe | None]
+    ) -> None:
+        try:
+            async for fetched in self.fetch_recipes(recipe_urls):
+                fetched_queue.put_nowait(fetched)
+        finally:
+            # tells _bulk_import that no more recipes are coming
+            fetched_queue.put_nowait(None)
+
+    async def _save_batch(
+        self,
+        batch: Sequence[FetchedRecipe],
+        user: User,
+        collection_id: UUID,
+        progress: BulkImportProgress,
+        image_limiter: asyncio.Semaphore,
+    ) -> list[BulkImportResult]:
+        parsed_recipes = [fetched.recipe for fetched in batch if fetched.recipe is not None]
+        if not parsed_recipes:
+            return []
+
+        try:
+            created = await self.recipe_service.create_many(
+                [parsed.recipe for parsed in parsed_recipes], user, collection_id
             )
+        except psycopg.Error as e:
+            # the connection failed, none of the recipes were saved
+            return [progress.result(fetched.url, error=str(e)) for fetched in batch]
 
-        return await self.recipe_service.get_by_id(new_recipe.id, user)
+        await asyncio.gather(
+            *(
+                self._add_cover_image_limited(parsed, new_recipe, user, image_limiter)
+                for parsed, new_recipe in zip(parsed_recipes, created, strict=True)
+                if isinstance(new_recipe, RecipeFull)
+            )
+        )
+        return [
+            progress.result(fetched.url, recipe_id=new_recipe.id)
+            if isinstance(new_recipe, RecipeFull)
+            else progress.result(fetched.url, error=str(new_recipe))
+            for fetched, new_recipe in zip(batch, created, strict=True)
+        ]
 
+    async def _fetch_recipe_limited(self, recipe_url: str, limiter: asyncio.Semaphore) -> FetchedRecipe:
+        try:
+            async with limiter:
+                return FetchedRecipe(url=recipe_url, recipe=await self.fetch_recipe(recipe_url))
+        except (ApiError, httpx.HTTPError) as e:
+            return FetchedRecipe(url=recipe_url, error=str(e) or e.__class__.__name__)
+        except Exception as e:
+            # e.g. a broken parse pool, it fails this url instead of ending the import of all others
+            logger.exception('fetching the recipe %s failed', recipe_url)
+            return FetchedRecipe(url=recipe_url, error=str(e) or e.__class__.__name__)
+
+    async def _add_cover_image_limited(
+        self, parsed: ParsedRecipe, new_recipe: RecipeFull, user: User, limiter: asyncio.Semaphore
+    ) -> None:
+        if parsed.image_url is None:
+            return
 
-def _get_field(scraper: AbstractScraper, field: str, default: Any = None):  # noqa: ANN401
-    try:
-        fn = getattr(scraper, field)
-        return fn()
-    except StaticValueException as e:
-        return e.return_value
-    except:  # noqa: E722 Sometimes a SchemaOrgException is thrown which can't even be imported from RecipeScrapers
-        return default
+        async with limiter:
+            await self._try_add_cover_image(parsed.image_url, new_recipe, user, parsed.recipe.original_url)
 
+    async def _try_add_cover_image(
+        self, image_url: str, new_recipe: RecipeFull, user: User, recipe_url: str | None
+    ) -> None:
+        # the recipe is already saved, a missing cover image shouldn't make the import fail (and be retried, which
+        # would save the recipe again)
+        try:
+            await self._add_cover_image(image_url, new_recipe.id, new_recipe.collection, user, recipe_url)
+        except (ApiError, httpx.HTTPError, OSError) as e:
+            logger.info('skipped the cover image %s of %s: %s', image_url, recipe_url, e)
+        except Exception:
+            # e.g. a decompression bomb Pillow refuses to open
+            logger.exception('adding the cover image %s of %s failed', image_url, recipe_url)
 
-@overload
-def _get_str(scraper: AbstractScraper, field: str, default: str) -> str: ...
+    async def _add_cover_image(
+        self, image_url: str, recipe_id: UUID, collection_id: UUID, user: User, recipe_url: str | None
+    ) -> None:
+        image = await self._download_image(image_url)
 
+        await self.recipe_asset_service.add_cover_image_to_recipe(recipe_id, collection_id, user, image, recipe_url)
 
-@overload
-def _get_str(scraper: AbstractScraper, field: str) -> str | None: ...
+    async def _download_image(self, image_url: str) -> BytesIO:
+        # read in chunks and give up once it's too large, a huge or endless response must not fill the memory
+        async with self.http_client.stream('GET', image_url) as res:
+            res.raise_for_status()
+            content_type = res.headers.get('content-type', '').partition(';')[0].strip().lower()
+            if content_type and not content_type.startswith('image/') and content_type != 'application/octet-stream':
+                raise UnsupportedImageError(image_url, content_type)
 
+            content_length = res.headers.get('content-length', '')
+            if content_length.isdigit() and int(content_length) > self.import_max_image_size:
+                raise ImageTooLargeError(image_url, self.import_max_image_size)
 
-def _get_str(scraper: AbstractScraper, field: str, default: str | None = None):
-    value = _get_field(scraper, field, default)
+            image = BytesIO()
+            sniffed = False
+            async for chunk in res.aiter_bytes():
+                if image.tell() + len(chunk) > self.import_max_image_size:
+                    raise ImageTooLargeError(image_url, self.import_max_image_size)
+                image.write(chunk)
+                # checked as soon as the header is in, an HTML error page or a video isn't downloaded to the end
+                if not sniffed and image.tell() >= IMAGE_SNIFF_SIZE:
+                    _check_image_format(image, image_url)
+                    sniffed = True
 
-    return str(value) if value is not None else None  # type: ignore[ereportUnknownArgumentType]
+        if not sniffed:
+            _check_image_format(image, image_url)
+        image.seek(0)
+        return image
 
 
-def _get_int(scraper: AbstractScraper, field: str, default: int | None = None):
-    try:
-        return int(_get_field(scraper, field, default))
-    except (ValueError, TypeError):
-        return None
+def _check_image_format(image: BytesIO, image_url: str) -> None:
+    if sniff_image_format(image.getbuffer()[:IMAGE_SNIFF_SIZE].tobytes()) is None:
+        msg = 'not a JPEG, PNG, GIF or WebP image'
+        raise UnsupportedImageError(image_url, msg)
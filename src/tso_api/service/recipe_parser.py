@@ -0,0 +1,86 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+# Runs in the recipe parse worker processes, keep the imports free of settings, database and web framework modules.
+
+from dataclasses import dataclass
+from typing import Any, overload
+
+from recipe_scrapers import (
+    AbstractScraper,
+    NoSchemaFoundInWildMode,
+    RecipeSchemaNotFound,
+    StaticValueException,
+    scrape_html,
+)
+
+from tso_api.models.recipe import RecipeCreate
+
+
+class RecipeParseError(Exception):
+    """Indicates that no recipe could be extracted from the HTML, only carries a message so it pickles cleanly."""
+
+
+@dataclass(frozen=True, slots=True)
+class ParsedRecipe:
+    recipe: RecipeCreate
+    image_url: str | None
+
+
+def parse_recipe(html: str, recipe_url: str) -> ParsedRecipe:
+    try:
+        scraper = scrape_html(html, recipe_url, supported_only=False)
+    except RecipeSchemaNotFound:
+        msg = 'recipe schema not found'
+        raise RecipeParseError(msg) from None
+    except NoSchemaFoundInWildMode:
+        msg = 'no schema found on the website'
+        raise RecipeParseError(msg) from None
+
+    title = _get_str(scraper, 'title')
+    if title is None:
+        msg = 'failed to extract a title from HTML'
+        raise RecipeParseError(msg)
+
+    recipe = RecipeCreate(
+        title=title,
+        note=_get_str(scraper, 'description', ''),
+        cook_time=_get_int(scraper, 'cook_time'),
+        prep_time=_get_int(scraper, 'prep_time'),
+        recipe_yield=_get_str(scraper, 'yields'),
+        instructions=_get_field(scraper, 'instructions_list'),
+        ingredients=_get_field(scraper, 'ingredients'),
+        original_url=recipe_url,
+    )
+    return ParsedRecipe(recipe=recipe, image_url=_get_str(scraper, 'image'))
+
+
+def _get_field(scraper: AbstractScraper, field: str, default: Any = None):  # noqa: ANN401
+    try:
+        fn = getattr(scraper, field)
+        return fn()
+    except StaticValueException as e:
+        return e.return_value
+    except:  # noqa: E722 Sometimes a SchemaOrgException is thrown which can't even be imported from RecipeScrapers
+        return default
+
+
+@overload
+def _get_str(scraper: AbstractScraper, field: str, default: str) -> str: ...
+
+
+@overload
+def _get_str(scraper: AbstractScraper, field: str) -> str | None: ...
+
+
+def _get_str(scraper: AbstractScraper, field: str, default: str | None = None):
+    value = _get_field(scraper, field, default)
+
+    return str(value) if value is not None else None  # type: ignore[ereportUnknownArgumentType]
+
+
+def _get_int(scraper: AbstractScraper, field: str, default: int | None = None):
+    try:
+        return int(_get_field(scraper, field, default))
+    except (ValueError, TypeError):
+        return None
@@ -1,28 +1,62 @@
 # Copyright 2025 Marius Meschter
 # SPDX-License-Identifier: AGPL-3.0-only
 
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Any
 from uuid import UUID
 
+import psycopg
+from psycopg import AsyncCursor
 from psycopg.rows import DictRow
+from psycopg_pool import AsyncConnectionPool
 
-from tso_api.exceptions import ResourceNotFoundError
+from tso_api.asset_url import AssetUrlSigner
+from tso_api.cursor import CursorCodec
+from tso_api.exceptions import InvalidLineError, ResourceNotFoundError
 from tso_api.models.base import ListResponse
 from tso_api.models.query_params import RecipeQueryParams
-from tso_api.models.recipe import RecipeCreate, RecipeFull, RecipeLight, RecipeUpdate
+from tso_api.models.recipe import (
+    IngredientUpdate,
+    InstructionUpdate,
+    RecipeCreate,
+    RecipeFull,
+    RecipeLight,
+    RecipeUpdate,
+)
 from tso_api.models.user import User
 from tso_api.repository import ingredient_repository, instruction_repository, recipe_repository
 from tso_api.service.base_service import BaseService
 
 
 class RecipeService(BaseService):
+    def __init__(
+        self,
+        pool: AsyncConnectionPool[Any],
+        cursor_codec: CursorCodec,
+        *,
+        asset_url_signer: AssetUrlSigner | None = None,
+    ) -> None:
+        super().__init__(pool)
+        self.cursor_codec = cursor_codec
+        # without a signer the recipes have no cover image URLs, e.g. for the import workers
+        self.asset_url_signer = asset_url_signer
+
     async def get_recipes_by_user(self, user: User, query_params: RecipeQueryParams) -> ListResponse[RecipeLight]:
+        cursor = query_params.pagination.cursor
         async with self._begin(user.id) as cur:
-            recipes, cursor = await recipe_repository.get_recipes_light_by_owner(
-                cur, query_params.pagination.limit, query_params.sort.field, query_params.sort.order, query_params.pagination.cursor
+            recipes, next_cursor = await recipe_repository.get_recipes_light_by_owner(
+                cur,
+                query_params.pagination.limit,
+                query_params.sort.field,
+                query_params.sort.order,
+                self.cursor_codec.decode(cursor) if cursor else None,
+                collection_id=query_params.collection,
+                search=query_params.search,
             )
 
-        recipes = [_recipe_light_from_row(recipe) for recipe in recipes]
-        return ListResponse(cursor=cursor, data=recipes)
+        recipes = [_recipe_light_from_row(recipe, self.asset_url_signer) for recipe in recipes]
+        return ListResponse(cursor=self.cursor_codec.encode(next_cursor) if next_cursor else None, data=recipes)
 
     async def get_by_id(self, recipe_id: UUID, user: User):
         async with self._begin(user.id) as cur:
@@ -31,67 +65,184 @@ class RecipeService(BaseService):
                 msg = f'recipe with id {recipe_id} not found'
                 raise ResourceNotFoundError(msg)
 
-            return _recipe_from_row(recipe)
+            return _recipe_from_row(recipe, self.asset_url_signer)
 
     async def create(self, recipe_create: RecipeCreate, user: User, collection_id: UUID):
         async with self._begin(user.id) as cur:
-            new_recipe = await recipe_repository.create_recipe(recipe_create, collection_id, user.id, cur)
-            recipe_id = new_recipe['id']
-
-            for position, ingredient in enumerate(recipe_create.ingredients):
-                await ingredient_repository.insert_ingredient(ingredient, position, recipe_id, cur)
-
-            for position, instruction in enumerate(recipe_create.instructions):
-                await instruction_repository.insert_instruction(instruction, position, recipe_id, cur)
+            return await _insert_recipe(recipe_create, user, collection_id, cur)
 
-            recipe = await recipe_repository.get_recipe_by_id(recipe_id, cur)
-            if recipe is None:
-                msg = f'recipe with id {recipe_id} not found'
-                raise ResourceNotFoundError(msg)
+    async def create_many(
+        self, recipe_creates: Sequence[RecipeCreate], user: User, collection_id: UUID
+    ) -> list[RecipeFull | psycopg.Error]:
+        """
+        Create the recipes in one transaction, each in its own savepoint.
 
-            return _recipe_from_row(recipe)
+        A recipe that can't be inserted is rolled back on its own and returned as its error, the others are still
+        created.
+        """
+        async with self._begin(user.id) as cur:
+            return [
+                await _insert_recipe_in_savepoint(recipe_create, user, collection_id, cur)
+                for recipe_create in recipe_creates
+            ]
 
     async def update_recipe(self, recipe_id: UUID, recipe_update: RecipeUpdate, user: User):
         async with self._begin(user.id) as cur:
-            current_recipe = await recipe_repository.get_recipe_by_id(recipe_id, cur)
+            current_recipe = await recipe_repository.get_recipe_for_update(recipe_id, cur)
             if current_recipe is None:
                 msg = f'recipe with id {recipe_id} not found'
                 raise ResourceNotFoundError(msg)
-            current_recipe = _recipe_from_row(current_recipe)
-            await recipe_repository.update_recipe(recipe_update, recipe_id, cur)
 
-            current_instructions: set[UUID] = {instruction.id for instruction in current_recipe.instructions}
-            new_instructions = {
-                instruction.id for instruction in recipe_update.instructions if instruction.id is not None
-            }
+            instructions = diff_lines(
+                await instruction_repository.get_instructions(recipe_id, cur), recipe_update.instructions, 'instruction'
+            )
+            await instruction_repository.delete_instructions(instructions.deletes, recipe_id, cur)
+            await instruction_repository.update_instructions(instructions.updates, recipe_id, cur)
+            inserted_instructions = await instruction_repository.insert_instructions(
+                instructions.inserts, recipe_id, cur
+            )
+
+            ingredients = diff_lines(
+                await ingredient_repository.get_ingredients(recipe_id, cur), recipe_update.ingredients, 'ingredient'
+            )
+            await ingredient_repository.delete_ingredients(ingredients.deletes, recipe_id, cur)
+            await ingredient_repository.update_ingredients(ingredients.updates, recipe_id, cur)
+            inserted_ingredients = await ingredient_repository.insert_ingredients(ingredients.inserts, recipe_id, cur)
+
+            updated_recipe = current_recipe
+            if _scalars_changed(current_recipe, recipe_update):
+                updated_recipe = await recipe_repository.update_recipe(recipe_update, recipe_id, cur)
+            elif instructions.changed or ingredients.changed:
+                updated_recipe = await recipe_repository.touch_recipe(recipe_id, cur)
+
+        return _recipe_from_row(
+            updated_recipe
+            | {
+                'instructions': instructions.written_lines(inserted_instructions),
+                'ingredients': ingredients.written_lines(inserted_ingredients),
+            },
+            self.asset_url_signer,
+        )
+
+
+async def _insert_recipe(recipe_create: RecipeCreate, user: User, collection_id: UUID, cur: AsyncCursor[DictRow]):
+    new_recipe = await recipe_repository.create_recipe(recipe_create, collection_id, user.id, cur)
+    recipe_id = new_recipe['id']
+
+    ingredient_ids = await ingredient_repository.insert_ingredients(
+        [(ingredient, position) for position, ingredient in enumerate(recipe_create.ingredients)], recipe_id, cur
+    )
+    instruction_ids = await instruction_repository.insert_instructions(
+        [(instruction, position) for position, instruction in enumerate(recipe_create.instructions)], recipe_id, cur
+    )
+
+    return _recipe_from_row(
+        new_recipe
+        | {
+            'ingredients': [
+                {'id': ingredient_id, 'text': text}
+                for ingredient_id, text in zip(ingredient_ids, recipe_create.ingredients, strict=True)
+            ],
+            'instructions': [
+                {'id': instruction_id, 'text': text}
+                for instruction_id, text in zip(instruction_ids, recipe_create.instructions, strict=True)
+            ],
+        }
+    )
+
+
+async def _insert_recipe_in_savepoint(
+    recipe_create: RecipeCreate, user: User, collection_id: UUID, cur: AsyncCursor[DictRow]
+) -> RecipeFull | psycopg.Error:
+    try:
+        async with cur.connection.transaction():
+            return await _insert_recipe(recipe_create, user, collection_id, cur)
+    except psycopg.Error as e:
+        return e
+
+
+@dataclass
+class LineDiff:
+    """The statements needed to turn the current lines (ingredients/instructions) of a recipe into the updated ones."""
+
+    inserts: list[tuple[str, int]] = field(default_factory=list)
+    updates: list[tuple[UUID, str, int]] = field(default_factory=list)
+    deletes: list[UUID] = field(default_factory=list)
+    # the lines after the update in order, `None` ids are assigned by the inserts
+    lines: list[tuple[UUID | None, str]] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.inserts or self.updates or self.deletes)
+
+    def written_lines(self, inserted_ids: Sequence[UUID]) -> list[dict[str, Any]]:
+        """Return the lines after the update in the same shape as `get_recipe_by_id` returns them."""
+        inserted = iter(inserted_ids)
+        return [
+            {'id': line_id if line_id is not None else next(inserted), 'text': text} for line_id, text in self.lines
+        ]
+
 
-            deleted_instructions = current_instructions - new_instructions
-            for deleted_instruction in deleted_instructions:
-                await instruction_repository.delete_instruction(deleted_instruction, cur)
+def diff_lines(
+    current_lines: Sequence[Mapping[str, Any]],
+    new_lines: Sequence[InstructionUpdate | IngredientUpdate],
+    line_type: str = 'line',
+):
+    """
+    Compute which lines of a recipe have to be inserted, updated or deleted.
 
-            for position, instruction in enumerate(recipe_update.instructions):
-                if instruction.id is None:
-                    await instruction_repository.insert_instruction(instruction.text, position, recipe_id, cur)
-                else:
-                    await instruction_repository.update_instruction(instruction.text, position, instruction.id, cur)
+    Lines only end up in `updates` if their text or position changed.
 
-            current_ingredients: set[UUID] = {ingredient.id for ingredient in current_recipe.ingredients}
-            new_ingredients = {ingredient.id for ingredient in recipe_update.ingredients if ingredient.id is not None}
+    Raises:
+        InvalidLineError: an id doesn't belong to the recipe or is used by more than one line.
 
-            deleted_ingredients = current_ingredients - new_ingredients
-            for deleted_ingredient in deleted_ingredients:
-                await ingredient_repository.delete_ingredient(deleted_ingredient, cur)
+    """
+    current = {line['id']: (line['text'], line['position']) for line in current_lines}
+    diff = LineDiff()
+    kept: set[UUID] = set()
 
-            for position, ingredient in enumerate(recipe_update.ingredients):
-                if ingredient.id is None:
-                    await ingredient_repository.insert_ingredient(ingredient.text, position, recipe_id, cur)
-                else:
-                    await ingredient_repository.update_ingredient(ingredient.text, position, ingredient.id, cur)
+    for position, line in enumerate(new_lines):
+        if line.id is None:
+            diff.inserts.append((line.text, position))
+            diff.lines.append((None, line.text))
+            continue
 
-        return await self.get_by_id(recipe_id, user)
+        if line.id not in current:
+            raise InvalidLineError(line_type, line.id, 'not part of the recipe')
+        if line.id in kept:
+            raise InvalidLineError(line_type, line.id, 'used more than once')
 
+        kept.add(line.id)
+        diff.lines.append((line.id, line.text))
+        if current[line.id] != (line.text, position):
+            diff.updates.append((line.id, line.text, position))
 
-def _recipe_from_row(row: DictRow) -> RecipeFull:
+    diff.deletes = [line_id for line_id in current if line_id not in kept]
+
+    return diff
+
+
+def _scalars_changed(row: DictRow, recipe_update: RecipeUpdate) -> bool:
+    return (
+        row['title'],
+        row['note'],
+        row['cook_time'],
+        row['prep_time'],
+        row['yield'],
+        row['liked'],
+        row['original_url'],
+    ) != (
+        recipe_update.title,
+        recipe_update.note,
+        recipe_update.cook_time,
+        recipe_update.prep_time,
+        recipe_update.recipe_yield,
+        recipe_update.liked,
+        recipe_update.original_url,
+    )
+
+
+def _recipe_from_row(row: DictRow, asset_url_signer: AssetUrlSigner | None = None) -> RecipeFull:
     return RecipeFull(
         id=row['id'],
         collection=row['collection_id'],
@@ -109,12 +260,14 @@ def _recipe_from_row(row: DictRow) -> RecipeFull:
         liked=row['liked'],
         cover_image=row['cover_image'],
         cover_thumbnail=row['cover_thumbnail'],
+        cover_image_url=_asset_url(row['cover_image_path'], asset_url_signer),
+        cover_thumbnail_url=_asset_url(row['cover_thumbnail_path'], asset_url_signer),
         note=row['note'],
         original_url=row['original_url'],
     )
 
 
-def _recipe_light_from_row(row: DictRow) -> RecipeLight:
+def _recipe_light_from_row(row: DictRow, asset_url_signer: AssetUrlSigner | None) -> RecipeLight:
     return RecipeLight(
         id=row['id'],
         collection=row['collection_id'],
@@ -124,4 +277,12 @@ def _recipe_light_from_row(row: DictRow) -> RecipeLight:
         created_at=row['created_at'],
         updated_at=row['updated_at'],
         cover_thumbnail=row['cover_thumbnail'],
+        cover_thumbnail_url=_asset_url(row['cover_thumbnail_path'], asset_url_signer),
     )
+
+
+def _asset_url(path: str | None, asset_url_signer: AssetUrlSigner | None) -> str | None:
+    if path is None or asset_url_signer is None:
+        return None
+
+    return asset_url_signer.sign(path)
@@ -1,26 +1,27 @@
 import httpx
-from tso_api.config import get_settings
-from tso_api.service.recipe_import_service import HTMLScraper
 
+from tso_api.service.recipe_import_service import HTMLScraper, ScrapedPage
 
-class HttpRequestScraper(HTMLScraper):
-    def __init__(self) -> None:
-        user_agent = get_settings().http_scraper_user_agent
-        timeout = httpx.Timeout(10, connect=5, read=20)
-        self.http_client = httpx.AsyncClient(
-            headers={
-                'user-agent': user_agent,
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            },
-            timeout=timeout,
-            follow_redirects=True,
-        )
 
+class HttpRequestScraper(HTMLScraper):
     async def scrape_html(self, url: str) -> str:
         res = await self.http_client.get(url)
 
         return res.text
 
+    async def scrape_page(self, url: str, etag: str | None = None, last_modified: str | None = None):
+        headers: dict[str, str] = {}
+        if etag is not None:
+            headers['if-none-match'] = etag
+        if last_modified is not None:
+            headers['if-modified-since'] = last_modified
+
+        res = await self.http_client.get(url, headers=headers)
+        if res.status_code == httpx.codes.NOT_MODIFIED and headers:
+            return None
+
+        return ScrapedPage(res.text, res.headers.get('etag'), res.headers.get('last-modified'))
+
     @property
     def priority(self):
         return 100
@@ -1,18 +1,37 @@
 # Copyright 2025 Marius Meschter
 # SPDX-License-Identifier: AGPL-3.0-only
 
+from typing import Any
 from uuid import UUID
+
 from psycopg.rows import DictRow
+from psycopg_pool import AsyncConnectionPool
 
 from tso_api.auth import JWT
+from tso_api.cache import TTLCache
 from tso_api.models.user import User
 from tso_api.repository import collection_repository, user_repository
 from tso_api.service.base_service import BaseService
 
+# (issuer, subject) -> (user, display name from the JWT the account was last synced with)
+IdentityCache = TTLCache[tuple[str, str], tuple[User, str | None]]
+
 
 class UserService(BaseService):
+    def __init__(
+        self, pool: AsyncConnectionPool[Any], identity_cache_size: int = 10_000, identity_cache_ttl: float = 300
+    ) -> None:
+        super().__init__(pool)
+        self.identity_cache: IdentityCache = TTLCache(identity_cache_size, identity_cache_ttl)
+
     async def get_or_create_user(self, jwt: JWT):
         display_name = jwt.preferred_username or jwt.email or jwt.name or jwt.given_name
+        cache_key = (jwt.issuer, jwt.subject)
+
+        cached = self.identity_cache.get(cache_key)
+        if cached is not None and cached[1] == display_name:
+            return cached[0]
+
         async with self._begin_unsafe() as cur:
             res = await user_repository.get_user(jwt.subject, jwt.issuer, cur)
             if res is None:
@@ -20,11 +39,14 @@ class UserService(BaseService):
 
                 coll_id = (await collection_repository.new_collection('Default', cur))['id']
                 await collection_repository.add_collection_owner(coll_id, res['id'], cur)
-            elif res['display_name'] != display_name:
+            elif res['display_name'] != (display_name or res['subject']):
                 await user_repository.update_user(res['id'], display_name, cur)
-                res['display_name'] = display_name
+                res['display_name'] = display_name or res['subject']
+
+        user = _user_from_row(res)
+        self.identity_cache.set(cache_key, (user, display_name))
 
-        return _user_from_row(res)
+        return user
 
     async def get_all_users(self, user_id: UUID | None, search: str | None, limit: int):
         """
@@ -1,2 +1,101 @@
 # Copyright 2025 Marius Meschter
 # SPDX-License-Identifier: AGPL-3.0-only
+
+import asyncio
+import os
+import tempfile
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+class FileStorage:
+    """
+    Async file operations on the data directory, run in a thread pool of their own.
+
+    data_dir may be network storage where a single syscall takes tens of milliseconds, the operations neither block
+    the event loop nor occupy the default executor other blocking calls (DNS lookups, reading uploads) wait for.
+    Writes go to a temporary file next to the target that is renamed over it, readers never see a partial file.
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='file-storage')
+        # directories that are known to exist, saves a mkdir round trip per write
+        self._directories: set[Path] = set()
+
+    async def write(self, path: Path, data: bytes, *, overwrite: bool = True) -> bool:
+        """Write `data` to `path` atomically, return False if the file exists and `overwrite` is False."""
+        return await self._run(self._write, path, data, overwrite)
+
+    async def stat(self, path: Path) -> os.stat_result | None:
+        """Return the stat of `path`, None if it doesn't exist."""
+        return await self._run(_stat, path)
+
+    async def exists(self, path: Path) -> bool:
+        return await self._run(_stat, path) is not None
+
+    async def delete(self, path: Path) -> bool:
+        """Delete the file at `path`, return whether it existed."""
+        return await self._run(_delete, path)
+
+    async def delete_many(self, paths: Iterable[Path]) -> int:
+        """Delete the files at `paths` in one go, return how many existed."""
+        return await self._run(_delete_many, list(paths))
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    async def _run[T, *Ts](self, fn: Callable[[*Ts], T], *args: *Ts) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _write(self, path: Path, data: bytes, overwrite: bool) -> bool:
+        if not overwrite and path.exists():
+            return False
+
+        directory = path.parent
+        if directory not in self._directories:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._directories.add(directory)
+
+        try:
+            fd, temp_name = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+        except FileNotFoundError:
+            # the directory was removed since it was created
+            self._directories.discard(directory)
+            directory.mkdir(parents=True, exist_ok=True)
+            fd, temp_name = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+
+        temp_path = Path(temp_name)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+                file.flush()
+                # the data has to be on disk before the rename makes it visible, or a crash can leave an empty file
+                os.fsync(file.fileno())
+            temp_path.replace(path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+        return True
+
+
+def _stat(path: Path) -> os.stat_result | None:
+    try:
+        return path.stat()
+    except FileNotFoundError:
+        return None
+
+
+def _delete(path: Path) -> bool:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        return False
+
+    return True
+
+
+def _delete_many(paths: list[Path]) -> int:
+    return sum(_delete(path) for path in paths)
@@ -0,0 +1,49 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import uuid
+from pathlib import Path
+from uuid import UUID
+
+from psycopg import AsyncConnection
+from psycopg.rows import dict_row
+
+from tso_api.models.asset import AssetBase
+from tso_api.models.recipe import RecipeCreate
+from tso_api.models.user import User
+from tso_api.repository import asset_repository, recipe_repository
+
+
+def rendition(recipe_id: UUID, width: int, mime_type: str) -> AssetBase:
+    asset_id = uuid.uuid4()
+    return AssetBase(
+        id=asset_id,
+        path=Path(f'/data/{asset_id}'),
+        size=width * 10,
+        original_name=None,
+        recipe_id=recipe_id,
+        mime_type=mime_type,
+        width=width,
+    )
+
+
+async def test_cover_renditions_are_replaced_together(user_col: tuple[User, UUID], conn: AsyncConnection):
+    user, coll = user_col
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute('SET LOCAL ROLE tso_api_user')
+        await cur.execute('SELECT tso.set_uid(%s)', (user.id,))
+        recipe = await recipe_repository.create_recipe(RecipeCreate(title='Tomato soup'), coll, user.id, cur)
+        renditions = [
+            rendition(recipe['id'], width, mime_type)
+            for width in (96, 800)
+            for mime_type in ('image/webp', 'image/jpeg')
+        ]
+        await asset_repository.create_assets(renditions, coll, cur)
+        stored = await asset_repository.get_assets_by_recipe(recipe['id'], coll, cur)
+        deleted = await asset_repository.delete_assets_by_recipe(recipe['id'], coll, cur)
+        remaining = await asset_repository.get_assets_by_recipe(recipe['id'], coll, cur)
+
+    assert {(row['width'], row['mime_type']) for row in stored} == {(r.width, r.mime_type) for r in renditions}
+    assert sorted(deleted) == sorted(str(r.path) for r in renditions)
+    assert remaining == []
@@ -0,0 +1,104 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import datetime
+import hashlib
+import uuid
+from pathlib import Path
+from uuid import UUID
+
+import psycopg
+import pytest
+from psycopg import AsyncConnection
+from psycopg.errors import InsufficientPrivilege
+from psycopg.rows import dict_row
+
+from tests.repository.conftest import AsciiLetterString
+from tso_api.models.asset import AssetBase
+from tso_api.models.user import User
+from tso_api.repository import asset_repository, blob_repository
+
+
+async def test_assets_count_the_references_to_their_blob(
+    ascii_letter_string: AsciiLetterString, user_col: tuple[User, UUID], conn: AsyncConnection
+):
+    user, coll = user_col
+    digest = hashlib.sha256(ascii_letter_string(20).encode()).hexdigest()
+    assets = [
+        AssetBase(
+            id=uuid.uuid4(),
+            path=Path(f'/data/blobs/{digest[:2]}/{digest}.webp'),
+            size=100,
+            original_name=None,
+            blob_hash=digest,
+        )
+        for _ in range(2)
+    ]
+
+    async def blob():
+        async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+            res = await cur.execute('SELECT ref_count, unreferenced_since FROM tso.blob WHERE hash = %s', (digest,))
+            return await res.fetchone()
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute('SET LOCAL ROLE tso_api_user')
+        await cur.execute('SELECT tso.set_uid(%s)', (user.id,))
+        await asset_repository.create_assets(assets, coll, cur)
+    referenced = await blob()
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute('SET LOCAL ROLE tso_api_user')
+        await cur.execute('SELECT tso.set_uid(%s)', (user.id,))
+        for asset in assets:
+            await asset_repository.delete_asset_by_id(asset.id, coll, cur)
+    unreferenced = await blob()
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        collected = await blob_repository.delete_unreferenced_blobs(datetime.timedelta(0), 10_000, cur)
+    deleted = await blob()
+
+    assert referenced
+    assert referenced['ref_count'] == 2
+    assert referenced['unreferenced_since'] is None
+    assert unreferenced
+    assert unreferenced['ref_count'] == 0
+    assert unreferenced['unreferenced_since'] is not None
+    assert digest in {blob['hash'] for blob in collected}
+    assert deleted is None
+
+
+async def test_files_of_blobs_referenced_again_are_not_deleted(
+    ascii_letter_string: AsciiLetterString, user_col: tuple[User, UUID], conn: AsyncConnection, setup_db: str
+):
+    user, coll = user_col
+    reused, deleted = (hashlib.sha256(ascii_letter_string(20).encode()).hexdigest() for _ in range(2))
+    upload_conn = await psycopg.AsyncConnection.connect(setup_db)
+    asset = AssetBase(
+        id=uuid.uuid4(),
+        path=Path(f'/data/blobs/{reused[:2]}/{reused}.webp'),
+        size=100,
+        original_name=None,
+        blob_hash=reused,
+    )
+
+    # an upload of the same content is still running, it holds the lock of the hash
+    async with upload_conn.transaction(), upload_conn.cursor(row_factory=dict_row) as upload_cur:
+        await upload_cur.execute('SET LOCAL ROLE tso_api_user')
+        await upload_cur.execute('SELECT tso.set_uid(%s)', (user.id,))
+        await asset_repository.create_assets([asset], coll, upload_cur)
+        async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+            while_uploading = await blob_repository.lock_deleted_blob_files([reused, deleted], cur)
+
+    # the upload committed, its blob exists again
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        after_upload = await blob_repository.lock_deleted_blob_files([reused, deleted], cur)
+
+    assert while_uploading == [deleted]
+    assert after_upload == [deleted]
+
+
+async def test_blobs_are_not_visible_to_the_api_user(conn: AsyncConnection):
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute('SET LOCAL ROLE tso_api_user')
+        with pytest.raises(InsufficientPrivilege):
+            await cur.execute('SELECT * FROM tso.blob')
@@ -0,0 +1,172 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import datetime
+from uuid import UUID
+
+import psycopg
+from psycopg import AsyncConnection, AsyncCursor
+from psycopg.rows import DictRow, dict_row
+
+from tests.repository.conftest import UserFn
+from tso_api.models.user import User
+from tso_api.repository import import_job_repository
+
+LEASE = datetime.timedelta(minutes=5)
+# a lease that ran out long ago, as if the worker died while running the job
+EXPIRED = datetime.timedelta(days=-36500)
+MAX_ATTEMPTS = 3
+
+
+async def create_due_job(user: User, collection_id: UUID, cur: AsyncCursor[DictRow]) -> DictRow:
+    job = await import_job_repository.create_job('https://example.com/recipe', user.id, collection_id, cur)
+    # jobs left over by other tests must not be claimed first
+    await cur.execute("UPDATE tso.import_job SET run_after = '-infinity' WHERE id = %s", (job['id'],))
+    return job
+
+
+async def test_claim_job(user_col: tuple[User, UUID], conn: AsyncConnection):
+    user, coll = user_col
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        job = await create_due_job(user, coll, cur)
+        claimed = await import_job_repository.claim_job(LEASE, MAX_ATTEMPTS, cur)
+
+    assert claimed
+    assert claimed['id'] == job['id']
+    assert claimed['status'] == 'running'
+    assert claimed['attempts'] == 1
+    assert claimed['run_after'] > datetime.datetime.now(datetime.UTC)
+
+
+async def test_claim_job_skips_jobs_claimed_by_other_workers(
+    user_col: tuple[User, UUID], conn: AsyncConnection, setup_db: str
+):
+    user, coll = user_col
+    other_conn = await psycopg.AsyncConnection.connect(setup_db)
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        job = await create_due_job(user, coll, cur)
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        claimed = await import_job_repository.claim_job(LEASE, MAX_ATTEMPTS, cur)
+        # the first claim is still uncommitted, the other worker must skip the row instead of waiting for it
+        async with other_conn.transaction(), other_conn.cursor(row_factory=dict_row) as other_cur:
+            other_claimed = await import_job_repository.claim_job(LEASE, MAX_ATTEMPTS, other_cur)
+
+    assert claimed
+    assert claimed['id'] == job['id']
+    assert other_claimed is None or other_claimed['id'] != job['id']
+
+
+async def test_expired_lease_is_claimed_again(user_col: tuple[User, UUID], conn: AsyncConnection):
+    user, coll = user_col
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        job = await create_due_job(user, coll, cur)
+        await import_job_repository.claim_job(EXPIRED, MAX_ATTEMPTS, cur)
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        claimed = await import_job_repository.claim_job(LEASE, MAX_ATTEMPTS, cur)
+
+    assert claimed
+    assert claimed['id'] == job['id']
+    assert claimed['attempts'] == 2
+
+
+async def test_jobs_whose_leases_ran_out_on_every_attempt_are_failed(
+    user_col: tuple[User, UUID], conn: AsyncConnection
+):
+    user, coll = user_col
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        job = await create_due_job(user, coll, cur)
+        for _ in range(MAX_ATTEMPTS):
+            await import_job_repository.claim_job(EXPIRED, MAX_ATTEMPTS, cur)
+        claimed = await import_job_repository.claim_job(LEASE, MAX_ATTEMPTS, cur)
+        failed = await import_job_repository.fail_exhausted_jobs(MAX_ATTEMPTS, 'the import did not finish', cur)
+        res = await import_job_repository.get_job(job['id'], cur)
+
+    assert claimed is None or claimed['id'] != job['id']
+    assert failed >= 1
+    assert res
+    assert res['status'] == 'failed'
+    assert res['attempts'] == MAX_ATTEMPTS
+    assert res['error'] == 'the import did not finish'
+
+
+async def test_finished_jobs_are_not_claimed(user_col: tuple[User, UUID], conn: AsyncConnection):
+    user, coll = user_col
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        job = await create_due_job(user, coll, cur)
+        first_claim = await import_job_repository.claim_job(LEASE, MAX_ATTEMPTS, cur)
+        assert first_claim
+        await import_job_repository.fail_job(job['id'], first_claim['attempts'], 'no recipe', cur)
+        claimed = await import_job_repository.claim_job(LEASE, MAX_ATTEMPTS, cur)
+        res = await import_job_repository.get_job(job['id'], cur)
+
+    assert claimed is None or claimed['id'] != job['id']
+    assert res
+    assert res['status'] == 'failed'
+    assert res['error'] == 'no recipe'
+
+
+async def test_extend_lease(user_col: tuple[User, UUID], conn: AsyncConnection):
+    user, coll = user_col
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await create_due_job(user, coll, cur)
+        claimed = await import_job_repository.claim_job(datetime.timedelta(seconds=1), MAX_ATTEMPTS, cur)
+
+    assert claimed
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        held = await import_job_repository.extend_lease(claimed['id'], claimed['attempts'], LEASE, cur)
+        res = await import_job_repository.get_job(claimed['id'], cur)
+
+    assert held
+    assert res
+    assert res['run_after'] > claimed['run_after']
+
+
+async def test_previous_claim_cannot_update_the_job(user_col: tuple[User, UUID], conn: AsyncConnection):
+    user, coll = user_col
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        job = await create_due_job(user, coll, cur)
+        # the first worker's lease ran out and the job was claimed again
+        stale = await import_job_repository.claim_job(EXPIRED, MAX_ATTEMPTS, cur)
+        current = await import_job_repository.claim_job(LEASE, MAX_ATTEMPTS, cur)
+
+    assert stale
+    assert current
+    assert current['id'] == job['id']
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        extended = await import_job_repository.extend_lease(job['id'], stale['attempts'], LEASE, cur)
+        failed = await import_job_repository.fail_job(job['id'], stale['attempts'], 'too late', cur)
+        retried = await import_job_repository.retry_job(
+            job['id'], current['attempts'], 'timeout', datetime.timedelta(minutes=1), cur
+        )
+        res = await import_job_repository.get_job(job['id'], cur)
+
+    assert not extended
+    assert not failed
+    assert retried
+    assert res
+    assert res['status'] == 'queued'
+    assert res['error'] == 'timeout'
+
+
+async def test_jobs_are_only_visible_to_their_owner(user_col: tuple[User, UUID], user: UserFn, conn: AsyncConnection):
+    owner, coll = user_col
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        other_user = await user(cur)
+        await cur.execute('SELECT tso.set_session_context(%s)', (owner.id,))
+        job = await import_job_repository.create_job('https://example.com/recipe', owner.id, coll, cur)
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute('SELECT tso.set_session_context(%s)', (other_user.id,))
+        res = await import_job_repository.get_job(job['id'], cur)
+
+    assert res is None
@@ -0,0 +1,129 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+from uuid import UUID
+
+import pytest
+from psycopg import AsyncConnection, AsyncCursor
+from psycopg.errors import InsufficientPrivilege
+from psycopg.rows import DictRow, dict_row
+
+from tests.repository.conftest import UserFn
+from tso_api.models.recipe import RecipeCreate
+from tso_api.models.user import User
+from tso_api.repository import collection_repository, instruction_repository, recipe_repository
+
+
+async def set_perms(user_id: UUID, cur: AsyncCursor[DictRow]):
+    await cur.execute('SELECT tso.set_session_context(%s)', (user_id,))
+
+
+async def create_recipe(user: User, coll: UUID, cur: AsyncCursor[DictRow]) -> UUID:
+    await set_perms(user.id, cur)
+    recipe = await recipe_repository.create_recipe(RecipeCreate(title='instructions'), coll, user.id, cur)
+    return recipe['id']
+
+
+async def test_insert_instructions(user_col: tuple[User, UUID], conn: AsyncConnection):
+    user, coll = user_col
+    texts = [f'instruction {i}' for i in range(25)]
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        recipe_id = await create_recipe(user, coll, cur)
+        ids = await instruction_repository.insert_instructions(
+            [(text, position) for position, text in enumerate(texts)], recipe_id, cur
+        )
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await set_perms(user.id, cur)
+        rows = await instruction_repository.get_instructions(recipe_id, cur)
+
+    assert [row['id'] for row in rows] == ids
+    assert [row['text'] for row in rows] == texts
+
+
+async def test_insert_no_instructions(user_col: tuple[User, UUID], conn: AsyncConnection):
+    user, coll = user_col
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        recipe_id = await create_recipe(user, coll, cur)
+        ids = await instruction_repository.insert_instructions([], recipe_id, cur)
+
+    assert ids == []
+
+
+async def test_update_and_delete_instructions(user_col: tuple[User, UUID], conn: AsyncConnection):
+    user, coll = user_col
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        recipe_id = await create_recipe(user, coll, cur)
+        first, second, third = await instruction_repository.insert_instructions(
+            [('first', 0), ('second', 1), ('third', 2)], recipe_id, cur
+        )
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await set_perms(user.id, cur)
+        await instruction_repository.delete_instructions([second], recipe_id, cur)
+        updated = await instruction_repository.update_instructions(
+            [(third, 'third updated', 0), (first, 'first', 1)], recipe_id, cur
+        )
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await set_perms(user.id, cur)
+        rows = await instruction_repository.get_instructions(recipe_id, cur)
+
+    assert set(updated) == {first, third}
+    assert [(row['id'], row['text']) for row in rows] == [(third, 'third updated'), (first, 'first')]
+
+
+async def test_update_instructions_of_other_recipe(user_col: tuple[User, UUID], conn: AsyncConnection):
+    user, coll = user_col
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        recipe_id = await create_recipe(user, coll, cur)
+        other_recipe_id = await create_recipe(user, coll, cur)
+        (instruction_id,) = await instruction_repository.insert_instructions([('instruction', 0)], recipe_id, cur)
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await set_perms(user.id, cur)
+        updated = await instruction_repository.update_instructions([(instruction_id, 'moved', 0)], other_recipe_id, cur)
+
+    assert updated == []
+
+
+async def test_instructions_of_other_users_recipes_are_hidden(
+    user_col: tuple[User, UUID], user: UserFn, conn: AsyncConnection
+):
+    owner, coll = user_col
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        other_user = await user(cur)
+        recipe_id = await create_recipe(owner, coll, cur)
+        await instruction_repository.insert_instructions([('instruction', 0)], recipe_id, cur)
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await set_perms(other_user.id, cur)
+        rows = await instruction_repository.get_instructions(recipe_id, cur)
+
+    assert rows == []
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await set_perms(other_user.id, cur)
+        with pytest.raises(InsufficientPrivilege):
+            await instruction_repository.insert_instructions([('injected', 1)], recipe_id, cur)
+
+
+async def test_collection_members_see_instructions(user_col: tuple[User, UUID], user: UserFn, conn: AsyncConnection):
+    owner, coll = user_col
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        member = await user(cur)
+        await collection_repository.add_collection_member(coll, member.id, cur)
+        recipe_id = await create_recipe(owner, coll, cur)
+        ids = await instruction_repository.insert_instructions([('instruction', 0)], recipe_id, cur)
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await set_perms(member.id, cur)
+        rows = await instruction_repository.get_instructions(recipe_id, cur)
+
+    assert [row['id'] for row in rows] == ids
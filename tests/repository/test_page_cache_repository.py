@@ -0,0 +1,70 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+from psycopg import AsyncConnection, AsyncCursor
+from psycopg.rows import DictRow, dict_row
+
+from tests.repository.conftest import AsciiLetterString
+from tso_api.repository import page_cache_repository
+
+RECIPE = {'recipe': {'title': 'Tomato soup'}, 'image_url': None}
+
+
+async def test_store_page(ascii_letter_string: AsciiLetterString, conn: AsyncConnection):
+    url = f'https://example.com/{ascii_letter_string(10)}'
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await page_cache_repository.store_page(url, RECIPE, cur, etag='"v1"', last_modified=None)
+        await page_cache_repository.store_page(url, RECIPE, cur, etag='"v2"', last_modified=None)
+        res = await page_cache_repository.get_page(url, cur)
+
+    assert res
+    assert res['etag'] == '"v2"'
+    assert res['recipe'] == RECIPE
+
+
+async def test_cache_size_follows_stores_and_evictions(ascii_letter_string: AsciiLetterString, conn: AsyncConnection):
+    url = f'https://example.com/{ascii_letter_string(10)}'
+    larger = {'recipe': {'title': 'Tomato soup', 'note': 'x' * 100}, 'image_url': None}
+
+    async def total_size(cur: AsyncCursor[DictRow]) -> int:
+        res = await (await cur.execute('SELECT coalesce(sum(size_bytes), 0) AS size FROM tso.page_cache')).fetchone()
+        assert res
+        return res['size']
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await page_cache_repository.store_page(url, RECIPE, cur, etag=None, last_modified=None)
+        stored = await page_cache_repository.get_cache_size(cur)
+        stored_total = await total_size(cur)
+        await page_cache_repository.store_page(url, larger, cur, etag=None, last_modified=None)
+        updated = await page_cache_repository.get_cache_size(cur)
+        updated_total = await total_size(cur)
+        await cur.execute("UPDATE tso.page_cache SET accessed_at = '-infinity' WHERE url = %s", (url,))
+        await page_cache_repository.evict_pages(1, cur)
+        evicted = await page_cache_repository.get_cache_size(cur)
+        evicted_total = await total_size(cur)
+
+    assert stored == stored_total
+    assert updated == updated_total
+    assert updated > stored
+    assert evicted == evicted_total
+
+
+async def test_evict_pages_removes_the_least_recently_used(
+    ascii_letter_string: AsciiLetterString, conn: AsyncConnection
+):
+    urls = [f'https://example.com/{ascii_letter_string(10)}' for _ in range(3)]
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        for url in urls:
+            await page_cache_repository.store_page(url, RECIPE, cur, etag=None, last_modified=None)
+        # other tests may have left pages behind, they are used more recently than the first page
+        await cur.execute('UPDATE tso.page_cache SET accessed_at = now() WHERE url <> ALL(%s)', (urls,))
+        await cur.execute("UPDATE tso.page_cache SET accessed_at = '-infinity' WHERE url = %s", (urls[0],))
+        evicted = await page_cache_repository.evict_pages(1, cur)
+        pages = [await page_cache_repository.get_page(url, cur) for url in urls]
+
+    assert evicted == 1
+    assert pages[0] is None
+    assert pages[1]
+    assert pages[2]
@@ -8,18 +8,20 @@ from typing import Any
 from uuid import UUID
 
 import pytest
-from psycopg import AsyncConnection, AsyncCursor
+from psycopg import AsyncConnection, AsyncCursor, sql
 from psycopg.errors import InsufficientPrivilege, IntegrityError
 from psycopg.rows import DictRow, dict_row
 from pytest_subtests import SubTests
 
-from tests.repository.conftest import AsciiLetterString, UserFn
+from tests.repository.conftest import AsciiLetterString, UserColFn, UserFn
+from tso_api.exceptions import CursorPaginationError
 from tso_api.models.query_params import RecipeSortField, SortOrder
 from tso_api.models.recipe import RecipeCreate, RecipeUpdate
 from tso_api.models.user import User
-from tso_api.repository import collection_repository, recipe_repository
+from tso_api.repository import collection_repository, ingredient_repository, recipe_repository
 
 RecipeCreateFn = Callable[[], RecipeCreate]
+PLAN_TEST_RECIPES = 100_000
 
 
 @pytest.fixture
@@ -197,6 +199,40 @@ async def test_update_recipe(
     compare_recipe_with_recipe_update(updated_recipe, recipe_update)
 
 
+async def test_touch_recipe(recipe_create_fn: RecipeCreateFn, user_col: tuple[User, UUID], conn: AsyncConnection):
+    user, coll = user_col
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await set_perms(user.id, cur)
+        created_recipe, recipe_create = await create_recipe(user, coll, recipe_create_fn, cur)
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await set_perms(user.id, cur)
+        touched_recipe = await recipe_repository.touch_recipe(created_recipe['id'], cur)
+
+    assert touched_recipe['updated_at'] > created_recipe['updated_at']
+    assert touched_recipe['title'] == recipe_create.title
+
+
+async def test_recipe_rows_leave_out_search_vector(
+    recipe_create_fn: RecipeCreateFn, recipe_update: RecipeUpdate, user_col: tuple[User, UUID], conn: AsyncConnection
+):
+    user, coll = user_col
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await set_perms(user.id, cur)
+        created_recipe, _ = await create_recipe(user, coll, recipe_create_fn, cur)
+        rows = [
+            created_recipe,
+            await recipe_repository.get_recipe_for_update(created_recipe['id'], cur),
+            await recipe_repository.update_recipe(recipe_update, created_recipe['id'], cur),
+            await recipe_repository.touch_recipe(created_recipe['id'], cur),
+        ]
+
+    for row in rows:
+        assert row
+        assert 'search_vector' not in row
+        assert row['id'] == created_recipe['id']
+
+
 async def test_collection_member_can_update_recipes_in_collection(
     recipe_create_fn: RecipeCreateFn,
     user_col: tuple[User, UUID],
@@ -244,3 +280,130 @@ async def test_get_recipe_light_by_owner_with_cursor(
             for j, recipe in enumerate(recipes):
                 with subtests.test(msg='recipe title matches', i=j + i * 5):
                     assert int(recipe['title']) == j + i * 5
+
+
+async def test_search_recipes(recipe_create_fn: RecipeCreateFn, user_col: tuple[User, UUID], conn: AsyncConnection):
+    u, coll = user_col
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        by_title, _ = await create_recipe(u, coll, recipe_create_fn, cur, {'title': 'Crème brûlée'})
+        by_ingredient, _ = await create_recipe(u, coll, recipe_create_fn, cur, {'title': 'Dessert'})
+        await ingredient_repository.insert_ingredients([('200ml creme', 0)], by_ingredient['id'], cur)
+        await create_recipe(u, coll, recipe_create_fn, cur, {'title': 'Lasagne'})
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await set_perms(u.id, cur)
+        recipes, cursor = await recipe_repository.get_recipes_light_by_owner(cur, 10, search='creme')
+
+    assert [recipe['id'] for recipe in recipes] == [by_title['id'], by_ingredient['id']]
+    assert cursor is None
+
+
+async def test_search_recipes_with_cursor(
+    recipe_create_fn: RecipeCreateFn, user_col: tuple[User, UUID], conn: AsyncConnection
+):
+    u, coll = user_col
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        for i in range(7):
+            await create_recipe(u, coll, recipe_create_fn, cur, {'title': f'soup {i}'})
+        await create_recipe(u, coll, recipe_create_fn, cur, {'title': 'salad'})
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await set_perms(u.id, cur)
+        first_page, cursor = await recipe_repository.get_recipes_light_by_owner(cur, 5, search='soup')
+        assert cursor is not None
+        second_page, cursor = await recipe_repository.get_recipes_light_by_owner(cur, 5, cursor=cursor, search='soup')
+
+    titles = [recipe['title'] for recipe in first_page + second_page]
+    assert sorted(titles) == [f'soup {i}' for i in range(7)]
+    assert cursor is None
+
+
+async def test_search_cursor_requires_search(
+    recipe_create_fn: RecipeCreateFn, user_col: tuple[User, UUID], conn: AsyncConnection
+):
+    u, coll = user_col
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        for i in range(3):
+            await create_recipe(u, coll, recipe_create_fn, cur, {'title': f'soup {i}'})
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await set_perms(u.id, cur)
+        _, cursor = await recipe_repository.get_recipes_light_by_owner(cur, 1, search='soup')
+        with pytest.raises(CursorPaginationError):
+            await recipe_repository.get_recipes_light_by_owner(cur, 1, cursor=cursor)
+
+
+class RecordingCursor(AsyncCursor[DictRow]):
+    executed: list[tuple[Any, Any]]
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
+        super().__init__(*args, **kwargs)
+        self.executed = []
+
+    async def execute(self, query: Any, params: Any = None, **kwargs: Any):  # noqa: ANN401
+        self.executed.append((query, params))
+        return await super().execute(query, params, **kwargs)
+
+
+def sort_node_inputs(plan: dict[str, Any]) -> list[int]:
+    """Return the number of rows that went into each Sort node of an `EXPLAIN (ANALYZE, FORMAT JSON)` plan."""
+    inputs: list[int] = []
+    if 'Sort' in plan['Node Type']:
+        inputs.extend(child['Actual Rows'] * child['Actual Loops'] for child in plan['Plans'])
+
+    for child in plan.get('Plans', []):
+        inputs.extend(sort_node_inputs(child))
+
+    return inputs
+
+
+async def explain_pages(cur: RecordingCursor, **kwargs: Any) -> list[dict[str, Any]]:  # noqa: ANN401
+    """Fetch the first two pages of every sort variant and return the plans of the executed queries."""
+    plans: list[dict[str, Any]] = []
+    for sort_field in RecipeSortField:
+        for sort_order in SortOrder:
+            cursor = None
+            for _ in range(2):
+                _, cursor = await recipe_repository.get_recipes_light_by_owner(
+                    cur, 50, sort_field, sort_order, cursor, **kwargs
+                )
+                query, params = cur.executed[-1]
+                res = await (await cur.execute(sql.SQL('EXPLAIN (ANALYZE, FORMAT JSON) ') + query, params)).fetchone()
+                assert res
+                plans.append(res['QUERY PLAN'][0]['Plan'])
+
+    return plans
+
+
+async def test_recipe_list_pages_without_sorting(user_col_fn: UserColFn, conn: AsyncConnection):
+    conn.cursor_factory = RecordingCursor
+    async with conn.transaction(force_rollback=True), conn.cursor(row_factory=dict_row) as cur:
+        assert isinstance(cur, RecordingCursor)
+        u, coll = await user_col_fn(cur)
+        second_coll = await collection_repository.new_collection('Second', cur)
+        await collection_repository.add_collection_owner(second_coll['id'], u.id, cur)
+        await cur.execute(
+            """INSERT INTO tso.recipe (id, collection_id, created_by, title, note, created_at, updated_at)
+            SELECT
+                gen_random_uuid(),
+                CASE WHEN g %% 100 = 0 THEN %(second_coll)s ELSE %(coll)s END,
+                %(user_id)s,
+                'recipe ' || g,
+                '',
+                now() - g * interval '1 minute',
+                now() - (g %% 997) * interval '1 minute'
+            FROM generate_series(1, %(n)s) g""",
+            {'coll': coll, 'second_coll': second_coll['id'], 'user_id': u.id, 'n': PLAN_TEST_RECIPES},
+        )
+        await cur.execute('ANALYZE tso.recipe')
+        await set_perms(u.id, cur)
+
+        for plan in await explain_pages(cur, collection_id=coll):
+            assert sort_node_inputs(plan) == []
+
+        # without a collection filter only the first page of each collection may be sorted
+        for plan in await explain_pages(cur):
+            assert all(rows <= 2 * 51 for rows in sort_node_inputs(plan))
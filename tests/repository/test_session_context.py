@@ -0,0 +1,74 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+from uuid import UUID
+
+import pytest
+from psycopg import AsyncConnection
+from psycopg.errors import UndefinedFunction
+from psycopg.rows import dict_row
+
+from tests.repository.conftest import UserColFn
+from tso_api.models.user import User
+from tso_api.repository import collection_repository
+
+
+async def test_set_session_context(user_col: tuple[User, UUID], conn: AsyncConnection):
+    user, _ = user_col
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute('SELECT tso.set_session_context(%s)', (user.id,))
+        res = await (await cur.execute('SELECT current_user AS role, tso.get_current_user_id() AS user_id')).fetchone()
+
+    assert res
+    assert res['role'] == 'tso_api_user'
+    assert res['user_id'] == user.id
+
+
+async def test_session_context_is_transaction_local(user_col: tuple[User, UUID], conn: AsyncConnection):
+    user, _ = user_col
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute('SELECT tso.set_session_context(%s)', (user.id,))
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        res = await (await cur.execute('SELECT current_user AS role, tso.get_current_user_id() AS user_id')).fetchone()
+
+    assert res
+    assert res['role'] != 'tso_api_user'
+    assert res['user_id'] != user.id
+
+
+async def test_session_context_resolves_collections(user_col: tuple[User, UUID], conn: AsyncConnection):
+    user, coll = user_col
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute('SELECT tso.set_session_context(%s)', (user.id,))
+        res = await (await cur.execute('SELECT tso.current_collection_ids() AS collection_ids')).fetchone()
+
+    assert res
+    assert res['collection_ids'] == [coll]
+
+
+async def test_collections_are_refreshed_when_memberships_change(user_col: tuple[User, UUID], conn: AsyncConnection):
+    user, coll = user_col
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute('SELECT tso.set_session_context(%s)', (user.id,))
+        new_coll = await collection_repository.new_collection('Second', cur)
+        await collection_repository.add_collection_owner(new_coll['id'], user.id, cur)
+        res = await (await cur.execute('SELECT tso.current_collection_ids() AS collection_ids')).fetchone()
+
+    assert res
+    assert sorted(res['collection_ids']) == sorted([coll, new_coll['id']])
+
+
+async def test_memberships_of_other_users_cannot_be_looked_up(user_col_fn: UserColFn, conn: AsyncConnection):
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        user, _ = await user_col_fn(cur)
+        other_user, _ = await user_col_fn(cur)
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute('SELECT tso.set_session_context(%s)', (user.id,))
+        with pytest.raises(UndefinedFunction):
+            await cur.execute('SELECT tso.get_collection_ids_for_user(%s)', (other_user.id,))
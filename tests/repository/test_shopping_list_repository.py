@@ -3,11 +3,13 @@ from uuid import UUID, uuid4
 
 import pytest
 from psycopg import AsyncConnection, AsyncCursor
+from psycopg.errors import InsufficientPrivilege
 from psycopg.rows import DictRow, dict_row
 
-from tests.repository.conftest import AsciiLetterString, UserColFn
+from tests.repository.conftest import AsciiLetterString, UserColFn, UserFn
+from tso_api.exceptions import NoneAfterInsertError
 from tso_api.models.user import User
-from tso_api.repository import shopping_list_repository
+from tso_api.repository import collection_repository, shopping_list_repository
 
 UserListFn = Callable[[AsyncCursor[DictRow], AsciiLetterString], Awaitable[tuple[User, UUID, UUID]]]
 
@@ -171,3 +173,48 @@ async def test_get_lists_entries_count(
         assert len(lists) == 1
         assert lists[0]['entries_total'] == 2
         assert lists[0]['entries_not_completed'] == 1
+
+
+async def test_entries_of_other_users_lists_are_hidden(
+    user_list_fn: UserListFn, user: UserFn, ascii_letter_string: AsciiLetterString, conn: AsyncConnection
+):
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        owner, _, s_list = await user_list_fn(cur, ascii_letter_string)
+        other_user = await user(cur)
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await set_perms(owner.id, cur)
+        await shopping_list_repository.add_entry_to_list('entry', s_list, cur)
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await set_perms(other_user.id, cur)
+        entries = await (await cur.execute('SELECT * FROM tso.list_entry WHERE list_id = %s', (s_list,))).fetchall()
+        with pytest.raises(NoneAfterInsertError):
+            await shopping_list_repository.get_list(s_list, cur)
+
+    assert entries == []
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await set_perms(other_user.id, cur)
+        with pytest.raises(InsufficientPrivilege):
+            await shopping_list_repository.add_entry_to_list('injected', s_list, cur)
+
+
+async def test_collection_members_see_list_entries(
+    user_list_fn: UserListFn, user: UserFn, ascii_letter_string: AsciiLetterString, conn: AsyncConnection
+):
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        owner, coll, s_list = await user_list_fn(cur, ascii_letter_string)
+        member = await user(cur)
+        await collection_repository.add_collection_member(coll, member.id, cur)
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await set_perms(owner.id, cur)
+        await shopping_list_repository.add_entry_to_list('entry', s_list, cur)
+
+    async with conn.transaction(), conn.cursor(row_factory=dict_row) as cur:
+        await set_perms(member.id, cur)
+        res = await shopping_list_repository.get_list(s_list, cur)
+
+    assert res
+    assert len(res['entries']) == 1
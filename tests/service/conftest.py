@@ -2,14 +2,23 @@
 # SPDX-License-Identifier: AGPL-3.0-only
 
 
+import json
 import random
 import string
 import uuid
 from collections.abc import Callable
+from typing import Any
 
 import pytest
+from psycopg_pool import AsyncConnectionPool
 
+from tso_api.config import get_settings
 from tso_api.models.recipe import RecipeCreate, RecipeUpdate
+from tso_api.service.blob_store import BlobStore
+from tso_api.storage import FileStorage
+
+# shared by the services of all tests, its threads end with the test process
+file_storage = FileStorage(4)
 
 
 @pytest.fixture
@@ -55,3 +64,33 @@ def recipe_update():
 @pytest.fixture
 def ascii_letter_string() -> Callable[[int], str]:
     return lambda n: ''.join(random.choices(string.ascii_letters, k=n))
+
+
+def recipe_page(
+    ingredients: int = 3,
+    filler_paragraphs: int = 0,
+    *,
+    title: str = 'Tomato soup',
+    image: str | None = 'https://example.com/soup.jpg',
+) -> str:
+    schema = {
+        '@context': 'https://schema.org',
+        '@type': 'Recipe',
+        'name': title,
+        'description': 'A quick soup',
+        'cookTime': 'PT30M',
+        'prepTime': 'PT10M',
+        'recipeYield': '4',
+        'recipeIngredient': [f'{i + 1} tomatoes' for i in range(ingredients)],
+        'recipeInstructions': [{'@type': 'HowToStep', 'text': 'Chop'}, {'@type': 'HowToStep', 'text': 'Simmer'}],
+    }
+    if image is not None:
+        schema['image'] = image
+    body = ''.join(f'<div><p>paragraph {i}</p></div>' for i in range(filler_paragraphs))
+    return (
+        f'<html><head><script type="application/ld+json">{json.dumps(schema)}</script></head><body>{body}</body></html>'
+    )
+
+
+def blob_store(pool: AsyncConnectionPool[Any]) -> BlobStore:
+    return BlobStore(pool, file_storage, get_settings().data_dir, gc_interval=3600, gc_grace=3600)
@@ -0,0 +1,119 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import asyncio
+import contextlib
+import datetime
+import hashlib
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+from psycopg_pool import AsyncConnectionPool
+
+from tso_api.config import get_settings
+from tso_api.repository import blob_repository
+from tso_api.service.blob_store import BlobStore
+from tso_api.storage import FileStorage
+
+
+@pytest.fixture
+def store(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[BlobStore]:
+    # the repository functions are faked, the pool is never opened
+    pool = AsyncConnectionPool(str(get_settings().database_url), open=False)
+    store = BlobStore(pool, FileStorage(2), tmp_path, gc_interval=3600, gc_grace=3600)
+
+    @contextlib.asynccontextmanager
+    async def begin_unsafe():
+        await asyncio.sleep(0)
+        yield None
+
+    monkeypatch.setattr(store, '_begin_unsafe', begin_unsafe)
+    yield store
+    store.storage.shutdown()
+
+
+async def stored_blob(store: BlobStore, data: bytes) -> dict[str, Any]:
+    digest = hashlib.sha256(data).hexdigest()
+    path = store.blob_path(digest, 'webp')
+    await store.write_blob(path, data)
+    return {'hash': digest, 'path': str(path)}
+
+
+def test_blobs_are_named_by_their_hash(store: BlobStore, tmp_path: Path):
+    digest = hashlib.sha256(b'cover').hexdigest()
+
+    assert store.blob_path(digest, 'webp') == tmp_path / 'blobs' / digest[:2] / f'{digest}.webp'
+
+
+async def test_writes_are_idempotent(store: BlobStore):
+    blob = await stored_blob(store, b'cover')
+    path = Path(blob['path'])
+    modified = path.stat().st_mtime_ns
+
+    await store.write_blob(path, b'cover')
+
+    assert path.read_bytes() == b'cover'
+    assert path.stat().st_mtime_ns == modified
+    # no temporary files are left behind
+    assert list(path.parent.iterdir()) == [path]
+
+
+async def test_failed_writes_leave_no_file(store: BlobStore, monkeypatch: pytest.MonkeyPatch):
+    path = store.blob_path(hashlib.sha256(b'cover').hexdigest(), 'webp')
+
+    def replace(_self: Path, _target: Path) -> None:
+        raise OSError
+
+    monkeypatch.setattr(Path, 'replace', replace)
+    with pytest.raises(OSError):  # noqa: PT011
+        await store.write_blob(path, b'cover')
+
+    assert list(path.parent.iterdir()) == []
+
+
+async def test_garbage_collection_deletes_unreferenced_blobs(
+    store: BlobStore, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    unreferenced = [await stored_blob(store, data) for data in (b'old cover', b'old thumbnail')]
+    kept = await stored_blob(store, b'cover')
+    # deleted, but an upload of the same content refers to it again before the file is gone
+    reused = await stored_blob(store, b'reused cover')
+    # stored by hand, not by the API, the garbage collection leaves it alone
+    outside = {'hash': hashlib.sha256(b'other').hexdigest(), 'path': str(tmp_path / 'other.webp')}
+    Path(outside['path']).write_bytes(b'other')
+    batches = [[*unreferenced, reused, outside]]
+    events: list[str] = []
+
+    @contextlib.asynccontextmanager
+    async def begin_unsafe():
+        await asyncio.sleep(0)
+        yield None
+        events.append('commit')
+
+    async def delete_unreferenced_blobs(grace: datetime.timedelta, _limit: int, _cur: object) -> list[dict[str, Any]]:
+        await asyncio.sleep(0)
+        assert grace == datetime.timedelta(hours=1)
+        events.append('delete rows')
+        return batches.pop() if batches else []
+
+    async def lock_deleted_blob_files(hashes: list[str], _cur: object) -> list[str]:
+        await asyncio.sleep(0)
+        # the rows are gone before any file is
+        assert all(Path(blob['path']).exists() for blob in unreferenced)
+        events.append('lock files')
+        return [digest for digest in hashes if digest != reused['hash']]
+
+    monkeypatch.setattr(store, '_begin_unsafe', begin_unsafe)
+    monkeypatch.setattr(blob_repository, 'delete_unreferenced_blobs', delete_unreferenced_blobs)
+    monkeypatch.setattr(blob_repository, 'lock_deleted_blob_files', lock_deleted_blob_files)
+
+    collected = await store.collect_garbage()
+
+    assert collected == 4
+    assert events == ['delete rows', 'commit', 'lock files', 'commit', 'delete rows', 'commit']
+    assert not any(Path(blob['path']).exists() for blob in unreferenced)
+    assert Path(kept['path']).exists()
+    assert Path(reused['path']).exists()
+    assert Path(outside['path']).exists()
@@ -0,0 +1,390 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import asyncio
+import contextlib
+import datetime
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import BinaryIO, cast
+from uuid import UUID
+
+import httpx
+import psycopg
+import pytest
+from PIL import Image
+from psycopg.errors import CheckViolation
+from psycopg_pool import AsyncConnectionPool
+
+from tests.service.conftest import blob_store, recipe_page
+from tso_api.config import get_settings
+from tso_api.cursor import CursorCodec
+from tso_api.dependency import get_recipe_import_service, get_user
+from tso_api.http_client import HttpClients
+from tso_api.main import app
+from tso_api.models.recipe import RecipeCreate, RecipeFull
+from tso_api.models.user import User
+from tso_api.process_pool import BoundedProcessPool
+from tso_api.repository import collection_repository
+from tso_api.service import recipe_import_service
+from tso_api.service.recipe_asset import RecipeAssetService
+from tso_api.service.recipe_import_service import RecipeImportService
+from tso_api.service.recipe_parser import ParsedRecipe
+from tso_api.service.recipe_service import RecipeService
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+class RecipeSite(ThreadingHTTPServer):
+    """Serves a recipe page on every path except /missing and records how many requests were in flight per host."""
+
+    def __init__(self) -> None:
+        super().__init__(('127.0.0.1', 0), RecipeSiteHandler)
+        self.lock = threading.Lock()
+        self.in_flight: Counter[str] = Counter()
+        self.max_in_flight: Counter[str] = Counter()
+        self.max_in_flight_total = 0
+
+
+class RecipeSiteHandler(BaseHTTPRequestHandler):
+    """
+    Serves recipe pages and their cover images.
+
+    `/missing` has no recipe, pages under `/slow` take a few seconds longer, pages under `/broken` have a recipe the
+    fake `RecipeService` refuses to save and `/image/<size>` returns an image of `size` bytes. `?image=<size>` links
+    a page to such an image, `?image=zeros/<size>` and `?image=html/<size>` to a response that isn't an image.
+    """
+
+    server: RecipeSite
+
+    def do_GET(self):  # noqa: N802
+        host = self.headers['host'].split(':')[0]
+        with self.server.lock:
+            self.server.in_flight[host] += 1
+            self.server.max_in_flight[host] = max(self.server.max_in_flight[host], self.server.in_flight[host])
+            self.server.max_in_flight_total = max(self.server.max_in_flight_total, self.server.in_flight.total())
+
+        time.sleep(2.5 if self.path.startswith('/slow') else 0.1)
+        status, content_type, body = self.response()
+        self.send_response(status)
+        self.send_header('content-type', content_type)
+        self.send_header('content-length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        with self.server.lock:
+            self.server.in_flight[host] -= 1
+
+    def response(self) -> tuple[int, str, bytes]:
+        if self.path == '/missing':
+            return 404, 'text/html', b'<html><body>not found</body></html>'
+
+        if self.path.startswith('/image/'):
+            return 200, 'image/png', PNG_SIGNATURE.ljust(int(self.path.removeprefix('/image/')), b'\0')
+        if self.path.startswith('/zeros/'):
+            return 200, 'image/png', b'\0' * int(self.path.removeprefix('/zeros/'))
+        if self.path.startswith('/html/'):
+            return 200, 'text/html', b'<html>' * int(self.path.removeprefix('/html/'))
+
+        title = 'Broken soup' if self.path.startswith('/broken') else 'Tomato soup'
+        image_path = self.path.partition('image=')[2]
+        if image_path.isdigit():
+            image_path = f'image/{image_path}'
+        image = f'http://{self.headers["host"]}/{image_path}' if image_path else None
+        return 200, 'text/html', recipe_page(title=title, image=image).encode()
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+
+@pytest.fixture
+def recipe_site() -> Iterator[RecipeSite]:
+    site = RecipeSite()
+    thread = threading.Thread(target=site.serve_forever, daemon=True)
+    thread.start()
+    yield site
+    site.shutdown()
+    site.server_close()
+
+
+@pytest.fixture
+async def import_service():
+    # fetching and parsing doesn't touch the database, the pool is never opened
+    pool = AsyncConnectionPool(str(get_settings().database_url), open=False)
+    parse_pool = BoundedProcessPool(max_workers=2, timeout=30)
+    recipe_service = RecipeService(pool, CursorCodec(b'secret'))
+    http_clients = HttpClients('tso-api test', max_connections_per_host=2)
+    yield RecipeImportService(
+        pool, recipe_service, RecipeAssetService(pool, parse_pool, blob_store(pool)), http_clients.scraper, parse_pool
+    )
+    parse_pool.shutdown()
+    await http_clients.aclose()
+
+
+async def test_fetch_recipes_limits_requests_per_host(recipe_site: RecipeSite, import_service: RecipeImportService):
+    import_service.import_concurrency = 3
+    port = recipe_site.server_address[1]
+    urls = [f'http://{host}:{port}/recipe/{i}' for host in ('127.0.0.1', 'localhost') for i in range(6)]
+
+    fetched = [recipe async for recipe in import_service.fetch_recipes(urls)]
+
+    assert sorted(recipe.url for recipe in fetched) == sorted(urls)
+    assert all(recipe.error is None and recipe.recipe is not None for recipe in fetched)
+    assert recipe_site.max_in_flight == {'127.0.0.1': 2, 'localhost': 2}
+    assert recipe_site.max_in_flight_total == 3
+
+
+async def test_fetch_recipes_reports_failed_urls(recipe_site: RecipeSite, import_service: RecipeImportService):
+    port = recipe_site.server_address[1]
+    urls = [
+        f'http://127.0.0.1:{port}/recipe/1',
+        f'http://127.0.0.1:{port}/missing',
+        f'http://127.0.0.1:{port}/recipe/2',
+    ]
+
+    fetched = {recipe.url: recipe async for recipe in import_service.fetch_recipes(urls)}
+
+    assert fetched[urls[1]].recipe is None
+    assert fetched[urls[1]].error == 'no schema found on the website'
+    assert fetched[urls[0]].recipe is not None
+    assert fetched[urls[0]].recipe.recipe.title == 'Tomato soup'
+    assert fetched[urls[2]].error is None
+
+
+class FakeRecipeService:
+    """Records the batches `RecipeImportService` saves, recipes titled 'Broken soup' fail like a constraint would."""
+
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    async def create_many(
+        self, recipe_creates: Sequence[RecipeCreate], user: User, collection_id: UUID
+    ) -> list[RecipeFull | psycopg.Error]:
+        await asyncio.sleep(0)
+        self.batches.append([recipe_create.title for recipe_create in recipe_creates])
+        return [
+            CheckViolation('violates check constraint "recipe_title_check"')
+            if recipe_create.title == 'Broken soup'
+            else RecipeFull(
+                **recipe_create.model_dump(exclude={'collection', 'instructions', 'ingredients'}),
+                id=uuid.uuid4(),
+                collection=collection_id,
+                created_by=user.id,
+                created_at=datetime.datetime.now(datetime.UTC),
+                updated_at=datetime.datetime.now(datetime.UTC),
+                last_made=None,
+            )
+            for recipe_create in recipe_creates
+        ]
+
+
+class FakeRecipeAssetService:
+    def __init__(self) -> None:
+        self.cover_images: dict[UUID, int] = {}
+
+    async def add_cover_image_to_recipe(
+        self, recipe_id: UUID, _collection_id: UUID, _user: User, file: BinaryIO, _filename: str | None
+    ) -> None:
+        await asyncio.sleep(0)
+        self.cover_images[recipe_id] = len(file.read())
+
+
+@pytest.fixture
+def user() -> User:
+    return User(
+        id=uuid.uuid4(),
+        subject='subject',
+        issuer='https://idp.example.com',
+        created_at=datetime.datetime.now(datetime.UTC),
+        display_name='user',
+    )
+
+
+@pytest.fixture
+async def bulk_import_service(monkeypatch: pytest.MonkeyPatch):
+    # only saving touches the database, it's replaced by fakes
+    pool = AsyncConnectionPool(str(get_settings().database_url), open=False)
+    parse_pool = BoundedProcessPool(max_workers=2, timeout=30)
+    http_clients = HttpClients('tso-api test', max_connections_per_host=10)
+    service = RecipeImportService(
+        pool,
+        cast('RecipeService', FakeRecipeService()),
+        cast('RecipeAssetService', FakeRecipeAssetService()),
+        http_clients.scraper,
+        parse_pool,
+    )
+
+    @contextlib.asynccontextmanager
+    async def begin(_user_id: UUID):
+        await asyncio.sleep(0)
+        yield None
+
+    async def get_collection_by_id(collection_id: UUID, _cur: object):
+        await asyncio.sleep(0)
+        return {'id': collection_id}
+
+    monkeypatch.setattr(service, '_begin', begin)
+    monkeypatch.setattr(collection_repository, 'get_collection_by_id', get_collection_by_id)
+    yield service
+    parse_pool.shutdown()
+    await http_clients.aclose()
+
+
+async def test_bulk_import_saves_recipes_in_batches(
+    recipe_site: RecipeSite, bulk_import_service: RecipeImportService, user: User
+):
+    bulk_import_service.import_batch_size = 2
+    port = recipe_site.server_address[1]
+    urls = [f'http://127.0.0.1:{port}/recipe/{i}' for i in range(5)]
+
+    results = [result async for result in await bulk_import_service.bulk_import(urls, user, uuid.uuid4())]
+
+    batches = cast('FakeRecipeService', bulk_import_service.recipe_service).batches
+    assert sorted(len(batch) for batch in batches) == [1, 2, 2]
+    assert sorted(result.url for result in results) == sorted(urls)
+    assert all(result.recipe_id is not None and result.error is None for result in results)
+    assert [result.completed for result in results] == [1, 2, 3, 4, 5]
+    assert all(result.total == 5 for result in results)
+
+
+async def test_bulk_import_reports_errors_per_url(
+    recipe_site: RecipeSite, bulk_import_service: RecipeImportService, user: User
+):
+    port = recipe_site.server_address[1]
+    saved = [f'http://127.0.0.1:{port}/recipe/1', f'http://127.0.0.1:{port}/recipe/2']
+    broken = f'http://127.0.0.1:{port}/broken/1'
+    missing = f'http://127.0.0.1:{port}/missing'
+
+    results = {
+        result.url: result
+        async for result in await bulk_import_service.bulk_import([*saved, broken, missing], user, uuid.uuid4())
+    }
+
+    batches = cast('FakeRecipeService', bulk_import_service.recipe_service).batches
+    assert sorted(title for batch in batches for title in batch) == ['Broken soup', 'Tomato soup', 'Tomato soup']
+    assert all(results[url].recipe_id is not None and results[url].error is None for url in saved)
+    assert results[broken].recipe_id is None
+    assert results[broken].error == 'violates check constraint "recipe_title_check"'
+    assert results[missing].recipe_id is None
+    assert results[missing].error == 'no schema found on the website'
+
+
+async def test_bulk_import_saves_a_started_batch_after_max_wait(
+    recipe_site: RecipeSite, bulk_import_service: RecipeImportService, user: User, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(recipe_import_service, 'BATCH_MAX_WAIT', 0.2)
+    port = recipe_site.server_address[1]
+    fast = f'http://127.0.0.1:{port}/recipe/1'
+    slow = f'http://127.0.0.1:{port}/slow/1'
+
+    results = [result async for result in await bulk_import_service.bulk_import([fast, slow], user, uuid.uuid4())]
+
+    # the fast recipe is saved on its own instead of waiting for the slow page to finish
+    assert cast('FakeRecipeService', bulk_import_service.recipe_service).batches == [['Tomato soup'], ['Tomato soup']]
+    assert [result.url for result in results] == [fast, slow]
+
+
+async def test_bulk_import_skips_cover_images_over_the_size_limit(
+    recipe_site: RecipeSite, bulk_import_service: RecipeImportService, user: User
+):
+    bulk_import_service.import_max_image_size = 1000
+    port = recipe_site.server_address[1]
+    small = f'http://127.0.0.1:{port}/recipe/1?image=1000'
+    large = f'http://127.0.0.1:{port}/recipe/2?image=1001'
+
+    results = {
+        result.url: result async for result in await bulk_import_service.bulk_import([small, large], user, uuid.uuid4())
+    }
+
+    cover_images = cast('FakeRecipeAssetService', bulk_import_service.recipe_asset_service).cover_images
+    assert results[small].recipe_id in cover_images
+    assert cover_images[results[small].recipe_id] == 1000
+    # the recipe is still imported, just without a cover image
+    assert results[large].recipe_id is not None
+    assert results[large].recipe_id not in cover_images
+
+
+async def test_bulk_import_skips_cover_images_that_are_no_images(
+    recipe_site: RecipeSite, bulk_import_service: RecipeImportService, user: User
+):
+    port = recipe_site.server_address[1]
+    urls = [f'http://127.0.0.1:{port}/recipe/1?image=zeros/1000', f'http://127.0.0.1:{port}/recipe/2?image=html/1000']
+
+    results = [result async for result in await bulk_import_service.bulk_import(urls, user, uuid.uuid4())]
+
+    assert all(result.recipe_id is not None for result in results)
+    assert cast('FakeRecipeAssetService', bulk_import_service.recipe_asset_service).cover_images == {}
+
+
+async def test_bulk_import_reports_unexpected_fetch_errors_per_url(
+    recipe_site: RecipeSite, bulk_import_service: RecipeImportService, user: User, monkeypatch: pytest.MonkeyPatch
+):
+    port = recipe_site.server_address[1]
+    saved = f'http://127.0.0.1:{port}/recipe/1'
+    failed = f'http://127.0.0.1:{port}/recipe/2'
+    run = bulk_import_service.parse_pool.run
+
+    async def broken_run(fn: Callable[[str, str], ParsedRecipe], html: str, recipe_url: str) -> ParsedRecipe:
+        if recipe_url == failed:
+            msg = 'a worker died'
+            raise BrokenProcessPool(msg)
+        return await run(fn, html, recipe_url)
+
+    monkeypatch.setattr(bulk_import_service.parse_pool, 'run', broken_run)
+
+    results = {
+        result.url: result
+        async for result in await bulk_import_service.bulk_import([saved, failed], user, uuid.uuid4())
+    }
+
+    assert results[saved].recipe_id is not None
+    assert results[failed].recipe_id is None
+    assert results[failed].error == 'a worker died'
+
+
+async def test_bulk_import_keeps_recipes_whose_cover_image_fails(
+    recipe_site: RecipeSite, bulk_import_service: RecipeImportService, user: User, monkeypatch: pytest.MonkeyPatch
+):
+    port = recipe_site.server_address[1]
+    urls = [f'http://127.0.0.1:{port}/recipe/{i}?image=1000' for i in range(3)]
+
+    async def add_cover_image_to_recipe(*_args: object) -> None:
+        await asyncio.sleep(0)
+        msg = 'image size exceeds the limit'
+        raise Image.DecompressionBombError(msg)
+
+    monkeypatch.setattr(
+        bulk_import_service.recipe_asset_service, 'add_cover_image_to_recipe', add_cover_image_to_recipe
+    )
+
+    results = [result async for result in await bulk_import_service.bulk_import(urls, user, uuid.uuid4())]
+
+    assert sorted(result.url for result in results) == sorted(urls)
+    assert all(result.recipe_id is not None and result.error is None for result in results)
+
+
+async def test_bulk_import_endpoint_streams_ndjson(
+    recipe_site: RecipeSite, bulk_import_service: RecipeImportService, user: User
+):
+    port = recipe_site.server_address[1]
+    urls = [f'http://127.0.0.1:{port}/recipe/1', f'http://127.0.0.1:{port}/missing']
+    app.dependency_overrides = {get_user: lambda: user, get_recipe_import_service: lambda: bulk_import_service}
+
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url='http://tso') as client:
+            res = await client.post(f'/api/recipe/{uuid.uuid4()}/import/bulk', json={'urls': urls})
+    finally:
+        app.dependency_overrides = {}
+
+    lines = [json.loads(line) for line in res.text.splitlines()]
+    assert res.status_code == 200
+    assert res.headers['content-type'] == 'application/x-ndjson'
+    assert sorted(line['url'] for line in lines) == sorted(urls)
+    assert [line['completed'] for line in lines] == [1, 2]
+    assert {line['url']: line['error'] for line in lines}[urls[1]] == 'no schema found on the website'
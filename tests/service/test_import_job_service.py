@@ -0,0 +1,159 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import asyncio
+import contextlib
+import datetime
+import uuid
+from typing import TYPE_CHECKING, Any, cast
+from uuid import UUID
+
+import pytest
+from psycopg_pool import AsyncConnectionPool
+from pydantic import HttpUrl, ValidationError
+
+from tso_api.config import get_settings
+from tso_api.models.recipe import ImportRecipe, RecipeFull
+from tso_api.models.user import User
+from tso_api.repository import import_job_repository, user_repository
+from tso_api.service.import_job_service import ImportJobService
+
+if TYPE_CHECKING:
+    from tso_api.service.recipe_import_service import RecipeImportService
+
+LEASE = 0.3
+
+
+class FakeRecipeImportService:
+    def __init__(self, duration: float) -> None:
+        self.duration = duration
+        self.cancelled = False
+
+    async def scrape_and_save_recipe(self, recipe_url: str, user: User, collection_id: UUID) -> RecipeFull:
+        try:
+            await asyncio.sleep(self.duration)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+        now = datetime.datetime.now(datetime.UTC)
+        return RecipeFull(
+            id=uuid.uuid4(),
+            title='Tomato soup',
+            original_url=recipe_url,
+            collection=collection_id,
+            created_by=user.id,
+            created_at=now,
+            updated_at=now,
+            last_made=None,
+        )
+
+
+class FakeJobQueue:
+    """Stands in for import_job_repository, `lease_held` decides whether extending the lease succeeds."""
+
+    def __init__(self) -> None:
+        self.job = {
+            'id': uuid.uuid4(),
+            'account_id': uuid.uuid4(),
+            'collection_id': uuid.uuid4(),
+            'url': 'https://example.com/recipe',
+            'attempts': 1,
+        }
+        self.lease_held = True
+        self.calls: list[str] = []
+
+    def install(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        async def claim_job(_lease: datetime.timedelta, _max_attempts: int, _cur: object) -> dict[str, Any]:
+            await asyncio.sleep(0)
+            self.calls.append('claim_job')
+            return self.job
+
+        async def fail_exhausted_jobs(_max_attempts: int, _error: str, _cur: object) -> int:
+            await asyncio.sleep(0)
+            return 0
+
+        async def extend_lease(_job_id: UUID, attempts: int, _lease: datetime.timedelta, _cur: object) -> bool:
+            await asyncio.sleep(0)
+            self.calls.append(f'extend_lease {attempts}')
+            return self.lease_held
+
+        async def finish(name: str, *args: object) -> bool:
+            await asyncio.sleep(0)
+            self.calls.append(f'{name} {args[1]}')
+            return True
+
+        async def get_user_by_id(account_id: UUID, _cur: object) -> dict[str, Any]:
+            await asyncio.sleep(0)
+            return {
+                'id': account_id,
+                'subject': 'subject',
+                'issuer': 'https://idp.example.com',
+                'created_at': datetime.datetime.now(datetime.UTC),
+                'display_name': 'user',
+            }
+
+        monkeypatch.setattr(import_job_repository, 'claim_job', claim_job)
+        monkeypatch.setattr(import_job_repository, 'fail_exhausted_jobs', fail_exhausted_jobs)
+        monkeypatch.setattr(import_job_repository, 'extend_lease', extend_lease)
+        for name in ('complete_job', 'fail_job', 'retry_job'):
+            monkeypatch.setattr(import_job_repository, name, lambda *args, name=name: finish(name, *args))
+        monkeypatch.setattr(user_repository, 'get_user_by_id', get_user_by_id)
+
+
+@pytest.fixture
+def job_queue(monkeypatch: pytest.MonkeyPatch) -> FakeJobQueue:
+    job_queue = FakeJobQueue()
+    job_queue.install(monkeypatch)
+    return job_queue
+
+
+def job_service(monkeypatch: pytest.MonkeyPatch, import_duration: float) -> ImportJobService:
+    # the repository functions are faked, the pool is never opened
+    pool = AsyncConnectionPool(str(get_settings().database_url), open=False)
+    service = ImportJobService(
+        pool,
+        cast('RecipeImportService', FakeRecipeImportService(import_duration)),
+        workers=1,
+        poll_interval=1,
+        max_attempts=3,
+        lease=LEASE,
+    )
+
+    @contextlib.asynccontextmanager
+    async def begin_unsafe():
+        await asyncio.sleep(0)
+        yield None
+
+    monkeypatch.setattr(service, '_begin_unsafe', begin_unsafe)
+    return service
+
+
+async def test_lease_is_extended_while_the_import_runs(job_queue: FakeJobQueue, monkeypatch: pytest.MonkeyPatch):
+    service = job_service(monkeypatch, import_duration=LEASE * 1.5)
+
+    assert await service.run_next_job()
+
+    assert job_queue.calls[0] == 'claim_job'
+    assert 'extend_lease 1' in job_queue.calls
+    assert job_queue.calls[-1] == 'complete_job 1'
+
+
+async def test_import_is_cancelled_when_the_lease_is_lost(job_queue: FakeJobQueue, monkeypatch: pytest.MonkeyPatch):
+    job_queue.lease_held = False
+    service = job_service(monkeypatch, import_duration=LEASE * 10)
+
+    assert await asyncio.wait_for(service.run_next_job(), LEASE * 5)
+
+    assert cast('FakeRecipeImportService', service.recipe_import_service).cancelled
+    # another worker owns the job now, this one must not report a result for it
+    assert job_queue.calls == ['claim_job', 'extend_lease 1']
+
+
+def test_import_urls_are_limited_to_what_the_job_table_stores():
+    # the space is stored percent-encoded, the normalized URL is what counts
+    too_long = 'https://example.com/' + 'a ' * 600
+
+    ImportRecipe(url=cast('HttpUrl', 'https://example.com/' + 'a' * 1979))
+    with pytest.raises(ValidationError, match='at most 1999 characters'):
+        ImportRecipe(url=cast('HttpUrl', too_long))
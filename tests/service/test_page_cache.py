@@ -0,0 +1,197 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import asyncio
+import contextlib
+import datetime
+from collections.abc import AsyncIterator
+from typing import Any
+
+import httpx
+import pytest
+from psycopg_pool import AsyncConnectionPool
+
+from tests.service.conftest import blob_store, recipe_page
+from tso_api.config import get_settings
+from tso_api.cursor import CursorCodec
+from tso_api.process_pool import BoundedProcessPool
+from tso_api.repository import page_cache_repository
+from tso_api.service.page_cache import EVICT_BATCH_SIZE, EVICT_TARGET, PageCache, normalize_url
+from tso_api.service.recipe_asset import RecipeAssetService
+from tso_api.service.recipe_import_service import RecipeImportService
+from tso_api.service.recipe_service import RecipeService
+
+ETAG = '"v1"'
+MAX_SIZE = 1024 * 1024
+PAGE_SIZE = 1024
+
+
+@pytest.mark.parametrize(
+    ('url', 'normalized'),
+    [
+        ('HTTPS://Example.com:443/soup?b=2&a=1#method', 'https://example.com/soup?a=1&b=2'),
+        ('http://example.com:8080', 'http://example.com:8080/'),
+        ('https://example.com/soup?utm_source=newsletter&fbclid=abc&page=2', 'https://example.com/soup?page=2'),
+        (' https://example.com/Soup ', 'https://example.com/Soup'),
+    ],
+)
+def test_normalize_url(url: str, normalized: str):
+    assert normalize_url(url) == normalized
+
+
+class RecipeSite:
+    def __init__(self) -> None:
+        self.requests: list[httpx.Request] = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.headers.get('if-none-match') == ETAG:
+            return httpx.Response(304, headers={'etag': ETAG})
+
+        return httpx.Response(200, headers={'etag': ETAG}, text=recipe_page())
+
+
+class FakePageTable:
+    """Stands in for page_cache_repository, keeps the pages in a dict."""
+
+    def __init__(self) -> None:
+        self.pages: dict[str, dict[str, Any]] = {}
+        # the size the cache reports, every evicted page takes PAGE_SIZE off it
+        self.size = 0
+        self.evictions = 0
+
+    def install(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        async def get_page(url: str, _cur: object) -> dict[str, Any] | None:
+            await asyncio.sleep(0)
+            return self.pages.get(url)
+
+        async def store_page(
+            url: str, recipe: dict[str, Any], _cur: object, *, etag: str | None, last_modified: str | None
+        ) -> None:
+            await asyncio.sleep(0)
+            self.pages[url] = {
+                'url': url,
+                'etag': etag,
+                'last_modified': last_modified,
+                'recipe': recipe,
+                'fetched_at': datetime.datetime.now(datetime.UTC),
+            }
+
+        async def mark_page_fresh(url: str, _cur: object) -> None:
+            await asyncio.sleep(0)
+            self.pages[url]['fetched_at'] = datetime.datetime.now(datetime.UTC)
+
+        async def get_cache_size(_cur: object) -> int:
+            await asyncio.sleep(0)
+            return self.size
+
+        async def evict_pages(limit: int, _cur: object) -> int:
+            await asyncio.sleep(0)
+            self.evictions += 1
+            self.size = max(self.size - limit * PAGE_SIZE, 0)
+            return limit
+
+        monkeypatch.setattr(page_cache_repository, 'get_page', get_page)
+        monkeypatch.setattr(page_cache_repository, 'store_page', store_page)
+        monkeypatch.setattr(page_cache_repository, 'mark_page_fresh', mark_page_fresh)
+        monkeypatch.setattr(page_cache_repository, 'get_cache_size', get_cache_size)
+        monkeypatch.setattr(page_cache_repository, 'evict_pages', evict_pages)
+
+    def expire(self) -> None:
+        for page in self.pages.values():
+            page['fetched_at'] -= datetime.timedelta(days=7)
+
+
+@pytest.fixture
+def site() -> RecipeSite:
+    return RecipeSite()
+
+
+@pytest.fixture
+def page_table(monkeypatch: pytest.MonkeyPatch) -> FakePageTable:
+    page_table = FakePageTable()
+    page_table.install(monkeypatch)
+    return page_table
+
+
+@pytest.fixture
+async def import_service(site: RecipeSite, monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[RecipeImportService]:
+    # the repository functions are faked, the pool is never opened
+    pool = AsyncConnectionPool(str(get_settings().database_url), open=False)
+    page_cache = PageCache(pool, ttl=3600, max_size=MAX_SIZE)
+
+    @contextlib.asynccontextmanager
+    async def begin_unsafe():
+        await asyncio.sleep(0)
+        yield None
+
+    monkeypatch.setattr(page_cache, '_begin_unsafe', begin_unsafe)
+
+    parse_pool = BoundedProcessPool(max_workers=1, timeout=30)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(site.handle)) as http_client:
+        yield RecipeImportService(
+            pool,
+            RecipeService(pool, CursorCodec(b'secret')),
+            RecipeAssetService(pool, parse_pool, blob_store(pool)),
+            http_client,
+            parse_pool,
+            page_cache=page_cache,
+        )
+    parse_pool.shutdown()
+
+
+@pytest.fixture
+def parses(import_service: RecipeImportService, monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    parses: list[str] = []
+    run = import_service.parse_pool.run
+
+    async def counting_run(fn: Any, *args: Any) -> Any:  # noqa: ANN401
+        parses.append(args[1])
+        return await run(fn, *args)
+
+    monkeypatch.setattr(import_service.parse_pool, 'run', counting_run)
+    return parses
+
+
+@pytest.mark.usefixtures('page_table')
+async def test_repeat_imports_skip_the_download_and_the_parse(
+    site: RecipeSite, import_service: RecipeImportService, parses: list[str]
+):
+    first = await import_service.fetch_recipe('https://example.com/soup?utm_source=newsletter')
+    second = await import_service.fetch_recipe('https://Example.com/soup#ingredients')
+
+    assert len(site.requests) == 1
+    assert len(parses) == 1
+    assert second.recipe.title == first.recipe.title == 'Tomato soup'
+    assert second.recipe.ingredients == first.recipe.ingredients
+    assert second.image_url == first.image_url
+    assert second.recipe.original_url == 'https://Example.com/soup#ingredients'
+
+
+async def test_stale_pages_are_revalidated(
+    site: RecipeSite, page_table: FakePageTable, import_service: RecipeImportService, parses: list[str]
+):
+    await import_service.fetch_recipe('https://example.com/soup')
+    page_table.expire()
+
+    recipe = await import_service.fetch_recipe('https://example.com/soup')
+    # the revalidated page is fresh again
+    await import_service.fetch_recipe('https://example.com/soup')
+
+    assert [request.headers.get('if-none-match') for request in site.requests] == [None, ETAG]
+    assert len(parses) == 1
+    assert recipe.recipe.title == 'Tomato soup'
+
+
+async def test_pages_are_evicted_once_the_cache_is_over_its_size(
+    page_table: FakePageTable, import_service: RecipeImportService
+):
+    await import_service.fetch_recipe('https://example.com/soup')
+    assert page_table.evictions == 0
+
+    page_table.size = 2 * MAX_SIZE
+    await import_service.fetch_recipe('https://example.com/stew')
+
+    # evicted in batches until there is room for a while
+    assert page_table.evictions > 1
+    assert MAX_SIZE * EVICT_TARGET - EVICT_BATCH_SIZE * PAGE_SIZE < page_table.size <= MAX_SIZE * EVICT_TARGET
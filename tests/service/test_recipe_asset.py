@@ -0,0 +1,214 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import asyncio
+import contextlib
+import datetime
+import hashlib
+import uuid
+from collections.abc import Iterator
+from io import BytesIO
+from pathlib import Path
+from typing import Any
+
+import pytest
+from PIL import Image
+from psycopg_pool import AsyncConnectionPool
+
+from tests.service.conftest import blob_store
+from tso_api.config import get_settings
+from tso_api.exceptions import ResourceNotFoundError
+from tso_api.models.asset import Asset, AssetBase
+from tso_api.models.user import User
+from tso_api.process_pool import BoundedProcessPool
+from tso_api.repository import asset_repository, recipe_repository
+from tso_api.service.blob_store import BlobStore
+from tso_api.service.recipe_asset import RecipeAssetService, asset_etag, etag_matches, select_rendition
+
+RECIPE_ID = uuid.uuid4()
+
+
+def rendition(width: int | None, mime_type: str | None) -> Asset:
+    return Asset(
+        id=uuid.uuid4(),
+        path=Path(f'/data/{width}.{mime_type}'),
+        size=1000,
+        original_name=None,
+        created_at=datetime.datetime.now(datetime.UTC),
+        recipe_id=RECIPE_ID,
+        mime_type=mime_type,
+        width=width,
+    )
+
+
+RENDITIONS = {
+    (width, mime_type): rendition(width, mime_type)
+    for width in (96, 400, 800)
+    for mime_type in ('image/avif', 'image/webp', 'image/jpeg')
+} | {(1600, 'image/webp'): rendition(1600, 'image/webp')}
+COVER = RENDITIONS[800, 'image/webp']
+THUMBNAIL = RENDITIONS[400, 'image/webp']
+
+
+@pytest.mark.parametrize(
+    ('requested', 'accept', 'width', 'expected'),
+    [
+        # browsers name the formats they decode
+        (THUMBNAIL, 'image/avif,image/webp,image/apng,*/*;q=0.8', 96, (96, 'image/avif')),
+        (THUMBNAIL, 'image/webp,*/*', None, (400, 'image/webp')),
+        (THUMBNAIL, 'image/avif;q=0,image/webp', 96, (96, 'image/webp')),
+        # the narrowest rendition that is at least as wide as requested, else the widest
+        (THUMBNAIL, 'image/webp', 150, (400, 'image/webp')),
+        (COVER, 'image/avif,image/webp', 3000, (1600, 'image/webp')),
+        # clients that don't name a format get the one they asked for, or JPEG if it's not available in that width
+        (COVER, '*/*', None, (800, 'image/webp')),
+        (COVER, None, 200, (400, 'image/webp')),
+        (RENDITIONS[96, 'image/jpeg'], 'image/*', None, (96, 'image/jpeg')),
+        (rendition(1200, 'image/png'), None, None, (1600, 'image/webp')),
+    ],
+)
+def test_select_rendition(requested: Asset, accept: str | None, width: int | None, expected: tuple[int, str]):
+    assert select_rendition(list(RENDITIONS.values()), requested, accept, width) == RENDITIONS[expected]
+
+
+def test_assets_without_width_are_served_as_is():
+    legacy = rendition(None, None)
+
+    assert select_rendition([legacy], legacy, 'image/avif', 96) is legacy
+
+
+@pytest.mark.parametrize(
+    ('if_none_match', 'matches'),
+    [
+        (f'"{COVER.id}"', True),
+        (f'W/"{COVER.id}"', True),
+        (f'"{THUMBNAIL.id}", "{COVER.id}"', True),
+        ('*', True),
+        (f'"{THUMBNAIL.id}"', False),
+        (str(COVER.id), False),
+    ],
+)
+def test_etag_matches(if_none_match: str, matches: bool):
+    assert etag_matches(if_none_match, asset_etag(COVER)) is matches
+
+
+@pytest.fixture
+def queries(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    # stands in for asset_repository, serves RENDITIONS
+    queries: list[str] = []
+    by_id = {rendition.id: rendition for rendition in RENDITIONS.values()}
+
+    async def get_asset_by_id(asset_id: uuid.UUID, _collection_id: uuid.UUID, _cur: object) -> dict[str, Any] | None:
+        await asyncio.sleep(0)
+        queries.append('get_asset_by_id')
+        asset = by_id.get(asset_id)
+        return asset.model_dump() if asset else None
+
+    async def get_assets_by_recipe(_recipe_id: uuid.UUID, _collection_id: uuid.UUID, _cur: object) -> list[Any]:
+        await asyncio.sleep(0)
+        queries.append('get_assets_by_recipe')
+        return [rendition.model_dump() for rendition in RENDITIONS.values()]
+
+    monkeypatch.setattr(asset_repository, 'get_asset_by_id', get_asset_by_id)
+    monkeypatch.setattr(asset_repository, 'get_assets_by_recipe', get_assets_by_recipe)
+    return queries
+
+
+@pytest.fixture
+def asset_service(monkeypatch: pytest.MonkeyPatch) -> Iterator[RecipeAssetService]:
+    # the repository functions are faked, the pool is never opened
+    pool = AsyncConnectionPool(str(get_settings().database_url), open=False)
+    service = RecipeAssetService(pool, BoundedProcessPool(max_workers=1, timeout=30), blob_store(pool))
+
+    @contextlib.asynccontextmanager
+    async def begin(_user_id: uuid.UUID):
+        await asyncio.sleep(0)
+        yield None
+
+    monkeypatch.setattr(service, '_begin', begin)
+    yield service
+    service.image_pool.shutdown()
+
+
+USER = User(
+    id=uuid.uuid4(),
+    subject='subject',
+    issuer='https://idp.example.com',
+    created_at=datetime.datetime.now(datetime.UTC),
+    display_name='user',
+)
+COLLECTION_ID = uuid.uuid4()
+
+
+async def test_revalidations_of_fetched_assets_skip_the_database(asset_service: RecipeAssetService, queries: list[str]):
+    fetched = await asset_service.get_asset(COLLECTION_ID, THUMBNAIL.id, USER, 'image/webp', 96)
+    queries.clear()
+
+    unmodified = asset_service.get_unmodified_asset(
+        COLLECTION_ID, THUMBNAIL.id, USER, if_none_match=asset_etag(fetched), accept='image/webp', width=96
+    )
+    # a client that now accepts AVIF has a different representation, the same goes for other users
+    other_format = asset_service.get_unmodified_asset(
+        COLLECTION_ID, THUMBNAIL.id, USER, if_none_match=asset_etag(fetched), accept='image/avif', width=96
+    )
+    other_user = asset_service.get_unmodified_asset(
+        COLLECTION_ID,
+        THUMBNAIL.id,
+        USER.model_copy(update={'id': uuid.uuid4()}),
+        if_none_match=asset_etag(fetched),
+        accept='image/webp',
+        width=96,
+    )
+
+    assert fetched == RENDITIONS[96, 'image/webp']
+    assert unmodified == fetched
+    assert other_format is None
+    assert other_user is None
+    assert queries == []
+
+
+async def test_assets_not_fetched_before_are_looked_up(asset_service: RecipeAssetService, queries: list[str]):
+    unmodified = asset_service.get_unmodified_asset(COLLECTION_ID, COVER.id, USER, if_none_match=asset_etag(COVER))
+
+    with pytest.raises(ResourceNotFoundError):
+        await asset_service.get_asset(COLLECTION_ID, uuid.uuid4(), USER)
+
+    assert unmodified is None
+    assert queries == ['get_asset_by_id']
+
+
+async def test_identical_covers_are_stored_once(
+    asset_service: RecipeAssetService, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    created: list[AssetBase] = []
+
+    async def delete_assets_by_recipe(_recipe_id: uuid.UUID, _collection_id: uuid.UUID, _cur: object) -> list[str]:
+        await asyncio.sleep(0)
+        return []
+
+    async def create_assets(assets: list[AssetBase], _collection_id: uuid.UUID, _cur: object) -> None:
+        await asyncio.sleep(0)
+        created.extend(assets)
+
+    async def update_cover_image(*_args: object) -> None:
+        await asyncio.sleep(0)
+
+    monkeypatch.setattr(asset_repository, 'delete_assets_by_recipe', delete_assets_by_recipe)
+    monkeypatch.setattr(asset_repository, 'create_assets', create_assets)
+    monkeypatch.setattr(recipe_repository, 'update_cover_image', update_cover_image)
+    store = BlobStore(asset_service.pool, asset_service.blob_store.storage, tmp_path, gc_interval=1, gc_grace=1)
+    monkeypatch.setattr(asset_service, 'blob_store', store)
+    image = BytesIO()
+    Image.linear_gradient('L').resize((1000, 800)).save(image, 'png')
+
+    # the same image imported into recipes of two users
+    for _ in range(2):
+        image.seek(0)
+        await asset_service.add_cover_image_to_recipe(uuid.uuid4(), COLLECTION_ID, USER, image, 'cover.png')
+
+    files = sorted(path for path in (tmp_path / 'blobs').rglob('*') if path.is_file())
+    assert len(created) == 2 * len(files)
+    assert files == sorted({asset.path for asset in created})
+    for asset in created:
+        assert asset.path.read_bytes()
+        assert asset.blob_hash == hashlib.sha256(asset.path.read_bytes()).hexdigest()
@@ -0,0 +1,81 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import uuid
+
+import pytest
+
+from tso_api.exceptions import InvalidLineError
+from tso_api.models.recipe import IngredientUpdate
+from tso_api.service.recipe_service import diff_lines
+
+
+def test_unchanged_lines_produce_no_statements():
+    ids = [uuid.uuid4(), uuid.uuid4()]
+    current = [{'id': ids[0], 'text': 'a', 'position': 0}, {'id': ids[1], 'text': 'b', 'position': 1}]
+
+    diff = diff_lines(current, [IngredientUpdate(id=ids[0], text='a'), IngredientUpdate(id=ids[1], text='b')])
+
+    assert diff.inserts == []
+    assert diff.updates == []
+    assert diff.deletes == []
+    assert diff.written_lines([]) == [{'id': ids[0], 'text': 'a'}, {'id': ids[1], 'text': 'b'}]
+
+
+def test_only_changed_lines_are_updated():
+    ids = [uuid.uuid4(), uuid.uuid4(), uuid.uuid4()]
+    current = [{'id': line_id, 'text': str(i), 'position': i} for i, line_id in enumerate(ids)]
+
+    diff = diff_lines(
+        current,
+        [
+            IngredientUpdate(id=ids[0], text='0'),
+            IngredientUpdate(id=ids[2], text='2'),
+            IngredientUpdate(id=ids[1], text='changed'),
+        ],
+    )
+
+    assert diff.updates == [(ids[2], '2', 1), (ids[1], 'changed', 2)]
+    assert diff.inserts == []
+    assert diff.deletes == []
+
+
+def test_inserts_and_deletes():
+    ids = [uuid.uuid4(), uuid.uuid4()]
+    new_id = uuid.uuid4()
+    current = [{'id': ids[0], 'text': 'a', 'position': 0}, {'id': ids[1], 'text': 'b', 'position': 1}]
+
+    diff = diff_lines(current, [IngredientUpdate(id=None, text='new'), IngredientUpdate(id=ids[1], text='b')])
+
+    assert diff.inserts == [('new', 0)]
+    assert diff.updates == []
+    assert diff.deletes == [ids[0]]
+    assert diff.written_lines([new_id]) == [{'id': new_id, 'text': 'new'}, {'id': ids[1], 'text': 'b'}]
+
+
+def test_unknown_ids_are_rejected():
+    current = [{'id': uuid.uuid4(), 'text': 'a', 'position': 0}]
+    unknown_id = uuid.uuid4()
+
+    with pytest.raises(InvalidLineError) as exc_info:
+        diff_lines(current, [IngredientUpdate(id=unknown_id, text='unknown')], 'ingredient')
+
+    assert exc_info.value.status == 400
+    assert exc_info.value.detail() == {'id': str(unknown_id), 'reason': 'not part of the recipe'}
+
+
+def test_duplicate_ids_are_rejected():
+    line_id = uuid.uuid4()
+    current = [{'id': line_id, 'text': 'a', 'position': 0}]
+
+    with pytest.raises(InvalidLineError):
+        diff_lines(current, [IngredientUpdate(id=line_id, text='a'), IngredientUpdate(id=line_id, text='duplicate')])
+
+
+def test_changed():
+    line_id = uuid.uuid4()
+    current = [{'id': line_id, 'text': 'a', 'position': 0}]
+
+    assert not diff_lines(current, [IngredientUpdate(id=line_id, text='a')]).changed
+    assert diff_lines(current, [IngredientUpdate(id=line_id, text='b')]).changed
+    assert diff_lines(current, []).changed
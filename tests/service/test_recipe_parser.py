@@ -0,0 +1,59 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import asyncio
+import statistics
+import time
+
+import pytest
+
+from tests.service.conftest import recipe_page
+from tso_api.process_pool import BoundedProcessPool
+from tso_api.service.recipe_parser import RecipeParseError, parse_recipe
+
+RECIPE_URL = 'https://example.com/recipes/soup'
+
+
+def test_parse_recipe():
+    parsed = parse_recipe(recipe_page(), RECIPE_URL)
+
+    assert parsed.image_url == 'https://example.com/soup.jpg'
+    assert parsed.recipe.title == 'Tomato soup'
+    assert parsed.recipe.note == 'A quick soup'
+    assert parsed.recipe.cook_time == 30
+    assert parsed.recipe.prep_time == 10
+    assert parsed.recipe.ingredients == ['1 tomatoes', '2 tomatoes', '3 tomatoes']
+    assert parsed.recipe.instructions == ['Chop', 'Simmer']
+    assert parsed.recipe.original_url == RECIPE_URL
+
+
+def test_parse_page_without_recipe():
+    with pytest.raises(RecipeParseError):
+        parse_recipe('<html><body><p>no recipe here</p></body></html>', RECIPE_URL)
+
+
+async def test_event_loop_stays_responsive_while_parsing():
+    """Large pages take close to a second to parse, requests served in the meantime must not wait for that."""
+    html = recipe_page(ingredients=200, filler_paragraphs=20_000)
+    pool = BoundedProcessPool(max_workers=2, timeout=30)
+    lags: list[float] = []
+
+    async def heartbeat(done: asyncio.Event):
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append(time.perf_counter() - start - 0.005)
+
+    try:
+        await pool.run(parse_recipe, recipe_page(), RECIPE_URL)  # spawn a worker before measuring
+        done = asyncio.Event()
+        measure = asyncio.create_task(heartbeat(done))
+        results = await asyncio.gather(*(pool.run(parse_recipe, html, RECIPE_URL) for _ in range(4)))
+        done.set()
+        await measure
+    finally:
+        pool.shutdown()
+
+    assert all(len(parsed.recipe.ingredients) == 200 for parsed in results)
+    p99 = statistics.quantiles(lags, n=100)[98]
+    assert p99 < 0.1
@@ -0,0 +1,94 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import uuid
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import pytest
+
+from tso_api.asset_url import SIGNED_ASSET_PREFIX, AssetUrlSigner
+from tso_api.exceptions import InvalidAssetUrlError
+
+DATA_DIR = Path('/data')
+TTL = 3600
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_750_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def signer(clock: FakeClock) -> AssetUrlSigner:
+    return AssetUrlSigner(b'secret', DATA_DIR, TTL, clock)
+
+
+def asset_path() -> Path:
+    return DATA_DIR / str(uuid.uuid4()) / str(uuid.uuid4()) / f'{uuid.uuid4()}.webp'
+
+
+def parse(url: str) -> tuple[str, int, str]:
+    # what the router receives
+    parts = urlsplit(url)
+    query = parse_qs(parts.query)
+    return unquote(parts.path.removeprefix(f'{SIGNED_ASSET_PREFIX}/')), int(query['expires'][0]), query['signature'][0]
+
+
+def test_round_trip(signer: AssetUrlSigner):
+    path = asset_path()
+    url = signer.sign(path)
+
+    assert url
+    assert signer.verify(*parse(url)) == path
+
+
+def test_urls_stay_the_same_within_the_ttl(signer: AssetUrlSigner, clock: FakeClock):
+    path = asset_path()
+    clock.now = 1_749_999_600
+    first = signer.sign(path)
+    clock.now += TTL - 1
+    second = signer.sign(path)
+    clock.now += 1
+    third = signer.sign(path)
+
+    assert first == second
+    assert third != second
+
+
+def test_urls_expire(signer: AssetUrlSigner, clock: FakeClock):
+    url = signer.sign(asset_path())
+    assert url
+    clock.now += TTL
+
+    # still valid for at least another ttl after the URL changed
+    signer.verify(*parse(url))
+
+    clock.now += TTL
+    with pytest.raises(InvalidAssetUrlError, match='expired'):
+        signer.verify(*parse(url))
+
+
+def test_tampered_urls_are_rejected(signer: AssetUrlSigner):
+    url = signer.sign(asset_path())
+    assert url
+    path, expires, signature = parse(url)
+
+    with pytest.raises(InvalidAssetUrlError, match='signature'):
+        signer.verify(str(asset_path().relative_to(DATA_DIR)), expires, signature)
+    with pytest.raises(InvalidAssetUrlError, match='signature'):
+        signer.verify(path, expires + TTL, signature)
+    with pytest.raises(InvalidAssetUrlError, match='signature'):
+        AssetUrlSigner(b'other secret', DATA_DIR, TTL).verify(path, expires, signature)
+
+
+def test_paths_outside_of_the_data_dir_are_not_signed(signer: AssetUrlSigner):
+    assert signer.sign(Path('/etc/passwd')) is None
@@ -0,0 +1,162 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import time
+from collections.abc import Callable
+from typing import Any
+
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+from tso_api.auth import OIDCAuth
+from tso_api.exceptions import AuthenticationError
+
+ISSUER = 'https://idp.example.com'
+WELL_KNOWN_URL = f'{ISSUER}/.well-known/openid-configuration'
+JWKS_URL = f'{ISSUER}/jwks'
+
+
+class FakeIDP:
+    def __init__(self) -> None:
+        self.keys: dict[str, rsa.RSAPrivateKey] = {}
+        self.jwks_requests = 0
+        self.broken_well_known: httpx.Response | None = None
+        self.broken_jwks: httpx.Response | None = None
+        self.add_key('key-1')
+
+    def add_key(self, kid: str) -> None:
+        self.keys[kid] = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    def token(self, kid: str = 'key-1', expires_in: int = 300) -> str:
+        claims = {
+            'iss': ISSUER,
+            'sub': 'subject',
+            'aud': 'tso-api',
+            'exp': int(time.time()) + expires_in,
+            'preferred_username': 'user',
+            'email': None,
+            'name': None,
+            'given_name': None,
+        }
+        return jwt.encode(claims, self.keys[kid], algorithm='RS256', headers={'kid': kid})
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if str(request.url) == WELL_KNOWN_URL:
+            if self.broken_well_known is not None:
+                return self.broken_well_known
+            return httpx.Response(
+                200, json={'issuer': ISSUER, 'jwks_uri': JWKS_URL, 'id_token_signing_alg_values_supported': ['RS256']}
+            )
+
+        self.jwks_requests += 1
+        if self.broken_jwks is not None:
+            return self.broken_jwks
+        keys: list[dict[str, Any]] = []
+        for kid, key in self.keys.items():
+            jwk = RSAAlgorithm.to_jwk(key.public_key(), as_dict=True)
+            keys.append(jwk | {'kid': kid, 'use': 'sig', 'alg': 'RS256'})
+        return httpx.Response(200, json={'keys': keys})
+
+
+@pytest.fixture
+def idp():
+    return FakeIDP()
+
+
+@pytest.fixture
+def oidc_auth_fn(idp: FakeIDP):
+    def __create(jwks_min_refresh_interval: float) -> OIDCAuth:
+        return OIDCAuth(
+            WELL_KNOWN_URL,
+            httpx.AsyncClient(transport=httpx.MockTransport(idp.handle)),
+            jwks_min_refresh_interval=jwks_min_refresh_interval,
+        )
+
+    return __create
+
+
+@pytest.fixture
+def oidc_auth(oidc_auth_fn: Callable[[float], OIDCAuth]):
+    return oidc_auth_fn(0)
+
+
+async def test_verifies_token(idp: FakeIDP, oidc_auth: OIDCAuth):
+    verified = await oidc_auth(f'Bearer {idp.token()}')
+
+    assert verified.issuer == ISSUER
+    assert verified.subject == 'subject'
+
+
+async def test_verified_tokens_are_cached(idp: FakeIDP, oidc_auth: OIDCAuth, monkeypatch: pytest.MonkeyPatch):
+    token = idp.token()
+    await oidc_auth(f'Bearer {token}')
+
+    def fail(*_args: object, **_kwargs: object):
+        raise AssertionError('token was verified again')
+
+    monkeypatch.setattr(jwt, 'decode', fail)
+    verified = await oidc_auth(f'Bearer {token}')
+
+    assert verified.subject == 'subject'
+    assert oidc_auth.token_cache.hits == 1
+
+
+async def test_unknown_kid_refreshes_keys(idp: FakeIDP, oidc_auth: OIDCAuth):
+    await oidc_auth(f'Bearer {idp.token()}')
+    assert idp.jwks_requests == 1
+
+    idp.add_key('key-2')
+    verified = await oidc_auth(f'Bearer {idp.token("key-2")}')
+
+    assert verified.subject == 'subject'
+    assert idp.jwks_requests == 2
+
+
+async def test_unknown_kid_refresh_is_rate_limited(idp: FakeIDP, oidc_auth_fn: Callable[[float], OIDCAuth]):
+    oidc_auth = oidc_auth_fn(30)
+    await oidc_auth(f'Bearer {idp.token()}')
+
+    other = FakeIDP()
+    with pytest.raises(AuthenticationError):
+        await oidc_auth(f'Bearer {other.token()}')
+
+    idp.add_key('key-2')
+    with pytest.raises(AuthenticationError):
+        await oidc_auth(f'Bearer {idp.token("key-2")}')
+
+    assert idp.jwks_requests == 1
+
+
+async def test_expired_token_is_rejected(idp: FakeIDP, oidc_auth: OIDCAuth):
+    with pytest.raises(AuthenticationError):
+        await oidc_auth(f'Bearer {idp.token(expires_in=-60)}')
+
+
+async def test_invalid_scheme_is_rejected(idp: FakeIDP, oidc_auth: OIDCAuth):
+    with pytest.raises(AuthenticationError):
+        await oidc_auth(f'Basic {idp.token()}')
+
+
+@pytest.mark.parametrize(
+    'response', [httpx.Response(200, text='<html>maintenance</html>'), httpx.Response(200, json={'issuer': ISSUER})]
+)
+async def test_broken_well_known_is_rejected(idp: FakeIDP, oidc_auth: OIDCAuth, response: httpx.Response):
+    idp.broken_well_known = response
+
+    with pytest.raises(AuthenticationError):
+        await oidc_auth(f'Bearer {idp.token()}')
+
+
+@pytest.mark.parametrize(
+    'response', [httpx.Response(200, text='<html>maintenance</html>'), httpx.Response(200, json={'keys': 'none'})]
+)
+async def test_broken_jwks_refresh_is_rejected(idp: FakeIDP, oidc_auth: OIDCAuth, response: httpx.Response):
+    await oidc_auth(f'Bearer {idp.token()}')
+
+    idp.add_key('key-2')
+    idp.broken_jwks = response
+    with pytest.raises(AuthenticationError):
+        await oidc_auth(f'Bearer {idp.token("key-2")}')
@@ -0,0 +1,70 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+from tso_api.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_get_set():
+    cache: TTLCache[str, int] = TTLCache(10, 60)
+    assert cache.get('a') is None
+
+    cache.set('a', 1)
+
+    assert cache.get('a') == 1
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache: TTLCache[str, int] = TTLCache(10, 60, clock)
+    cache.set('a', 1)
+
+    clock.now = 59
+    assert cache.get('a') == 1
+
+    clock.now = 60
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_explicit_expiry_is_capped_by_ttl():
+    clock = FakeClock()
+    cache: TTLCache[str, int] = TTLCache(10, 60, clock)
+    cache.set('short', 1, expires_at=10)
+    cache.set('long', 2, expires_at=1000)
+
+    clock.now = 10
+    assert cache.get('short') is None
+    assert cache.get('long') == 2
+
+    clock.now = 60
+    assert cache.get('long') is None
+
+
+def test_evicts_least_recently_used():
+    cache: TTLCache[str, int] = TTLCache(2, 60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats().evictions == 1
+
+
+def test_zero_size_disables_cache():
+    cache: TTLCache[str, int] = TTLCache(0, 60)
+    cache.set('a', 1)
+
+    assert cache.get('a') is None
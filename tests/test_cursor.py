@@ -0,0 +1,62 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import base64
+import datetime
+import uuid
+
+import pytest
+
+from tso_api.cursor import CursorCodec, PageCursor
+from tso_api.exceptions import CursorPaginationError
+from tso_api.models.query_params import SortOrder
+
+
+@pytest.fixture
+def codec():
+    return CursorCodec(b'secret')
+
+
+@pytest.mark.parametrize(
+    ('field', 'value'),
+    [
+        ('created_at', datetime.datetime(2025, 6, 1, 12, 30, 15, 123456, tzinfo=datetime.UTC)),
+        ('title', 'Crème brûlée'),
+        ('rank', 0.0607927),
+    ],
+)
+def test_round_trip(codec: CursorCodec, field: str, value: str | datetime.datetime | float):
+    cursor = PageCursor(last_value=value, sort_order=SortOrder.ASC, sort_field=field, last_id=uuid.uuid4())
+
+    assert codec.decode(codec.encode(cursor)) == cursor
+
+
+def test_round_trip_converts_timezones(codec: CursorCodec):
+    value = datetime.datetime(2025, 6, 1, 14, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=2)))
+    cursor = PageCursor(last_value=value, sort_order=SortOrder.DESC, sort_field='updated_at', last_id=uuid.uuid4())
+
+    decoded = codec.decode(codec.encode(cursor))
+
+    assert decoded.last_value == value
+
+
+def test_tampered_cursor_is_rejected(codec: CursorCodec):
+    cursor = PageCursor(last_value=42, sort_order=SortOrder.DESC, sort_field='created_at', last_id=uuid.uuid4())
+    raw = bytearray(base64.urlsafe_b64decode(codec.encode(cursor) + '=='))
+    raw[5] ^= 1
+
+    with pytest.raises(CursorPaginationError):
+        codec.decode(base64.urlsafe_b64encode(raw).decode())
+
+
+def test_cursor_from_other_key_is_rejected(codec: CursorCodec):
+    cursor = PageCursor(last_value='a', sort_order=SortOrder.ASC, sort_field='title', last_id=uuid.uuid4())
+
+    with pytest.raises(CursorPaginationError):
+        codec.decode(CursorCodec(b'other').encode(cursor))
+
+
+@pytest.mark.parametrize('token', ['', 'not base64!', 'YWJj'])
+def test_malformed_cursor_is_rejected(codec: CursorCodec, token: str):
+    with pytest.raises(CursorPaginationError):
+        codec.decode(token)
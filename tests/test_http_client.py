@@ -0,0 +1,100 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import asyncio
+from collections import Counter
+from collections.abc import AsyncIterator
+
+import httpx
+import pytest
+
+from tso_api.http_client import HostLimitedTransport, HttpClients
+
+
+async def streamed_body() -> AsyncIterator[bytes]:
+    await asyncio.sleep(0)
+    yield b'ok'
+
+
+class SlowSite:
+    def __init__(self) -> None:
+        self.in_flight: Counter[str] = Counter()
+        self.max_in_flight: Counter[str] = Counter()
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        self.in_flight[host] += 1
+        self.max_in_flight[host] = max(self.max_in_flight[host], self.in_flight[host])
+        await asyncio.sleep(0.05)
+        self.in_flight[host] -= 1
+        if request.url.path == '/error':
+            raise httpx.ConnectError('connection refused')
+
+        # streamed like a response from a real connection, not loaded into memory up front
+        return httpx.Response(200, content=streamed_body())
+
+
+@pytest.fixture
+def site():
+    return SlowSite()
+
+
+@pytest.fixture
+def transport(site: SlowSite):
+    return HostLimitedTransport(httpx.MockTransport(site.handle), max_per_host=2)
+
+
+async def test_requests_are_limited_per_host(site: SlowSite, transport: HostLimitedTransport):
+    async with httpx.AsyncClient(transport=transport) as client:
+        responses = await asyncio.gather(
+            *(client.get(f'https://{host}/recipe/{i}') for host in ('a.example', 'b.example') for i in range(6))
+        )
+
+    assert all(res.text == 'ok' for res in responses)
+    assert site.max_in_flight == {'a.example': 2, 'b.example': 2}
+
+
+@pytest.mark.usefixtures('site')
+async def test_slot_is_held_until_streamed_response_is_closed(transport: HostLimitedTransport):
+    async with httpx.AsyncClient(transport=transport) as client:
+        first = await client.send(client.build_request('GET', 'https://a.example/1'), stream=True)
+        second = await client.send(client.build_request('GET', 'https://a.example/2'), stream=True)
+
+        third = asyncio.create_task(client.get('https://a.example/3'))
+        await asyncio.sleep(0.2)
+        assert not third.done()
+
+        await first.aclose()
+        assert (await third).text == 'ok'
+        await second.aclose()
+
+
+@pytest.mark.usefixtures('site')
+async def test_failed_requests_release_their_slot(transport: HostLimitedTransport):
+    async with httpx.AsyncClient(transport=transport) as client:
+        for _ in range(3):
+            with pytest.raises(httpx.ConnectError):
+                await client.get('https://a.example/error')
+
+        res = await asyncio.wait_for(client.get('https://a.example/1'), 1)
+
+    assert res.text == 'ok'
+
+
+async def test_http_clients_are_closed():
+    http_clients = HttpClients('tso-api test')
+
+    await http_clients.aclose()
+
+    assert http_clients.scraper.is_closed
+    assert http_clients.idp.is_closed
+
+
+async def test_in_memory_responses_release_their_slot_immediately():
+    transport = HostLimitedTransport(httpx.MockTransport(lambda _: httpx.Response(200, text='ok')), max_per_host=1)
+    async with httpx.AsyncClient(transport=transport) as client:
+        first = await client.send(client.build_request('GET', 'https://a.example/1'), stream=True)
+        second = await asyncio.wait_for(client.get('https://a.example/2'), 1)
+        await first.aclose()
+
+    assert second.text == 'ok'
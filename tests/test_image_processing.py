@@ -0,0 +1,111 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from tso_api.service.image_processing import (
+    RECIPE_COVER,
+    RECIPE_COVER_THUMBNAIL,
+    ImageRendition,
+    render_recipe_cover,
+    sniff_image_format,
+)
+
+# 7744 x 5164, about 40 megapixels like the photos of current phones, 120 MB once decoded to RGB
+PHOTO_SIZE = (7744, 5164)
+MB = 1024 * 1024
+
+
+@pytest.mark.parametrize(
+    ('header', 'image_format'),
+    [
+        (b'\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01', 'JPEG'),
+        (b'\x89PNG\r\n\x1a\n\x00\x00\x00\x0d', 'PNG'),
+        (b'GIF89a\x01\x00\x01\x00\x00\x00', 'GIF'),
+        (b'RIFF\x24\x00\x00\x00WEBP', 'WEBP'),
+        (b'<!DOCTYPE html>', None),
+        (b'\x00\x00\x00\x18ftypmp42', None),
+        (b'', None),
+    ],
+)
+def test_sniff_image_format(header: bytes, image_format: str | None):
+    assert sniff_image_format(header) == image_format
+
+
+@pytest.fixture(scope='module')
+def photo(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    path = tmp_path_factory.mktemp('images') / 'photo.jpg'
+    Image.linear_gradient('L').resize(PHOTO_SIZE).convert('RGB').save(path, quality=85)
+    return path
+
+
+def rendered_images(image: bytes, renditions: tuple[ImageRendition, ...]) -> dict[ImageRendition, Image.Image]:
+    return {
+        rendered.rendition: Image.open(BytesIO(rendered.data)) for rendered in render_recipe_cover(image, renditions)
+    }
+
+
+def test_render_recipe_cover(photo: Path):
+    renditions = (RECIPE_COVER, RECIPE_COVER_THUMBNAIL, ImageRendition(96, 'JPEG'), ImageRendition(1600, 'WEBP'))
+
+    images = rendered_images(photo.read_bytes(), renditions)
+
+    assert {rendition: (image.format, image.size) for rendition, image in images.items()} == {
+        RECIPE_COVER: ('WEBP', (800, 800)),
+        RECIPE_COVER_THUMBNAIL: ('WEBP', (400, 400)),
+        ImageRendition(96, 'JPEG'): ('JPEG', (96, 96)),
+        ImageRendition(1600, 'WEBP'): ('WEBP', (1600, 1600)),
+    }
+
+
+def test_small_images_are_not_scaled_up_beyond_the_cover():
+    buffer = BytesIO()
+    Image.new('RGBA', (500, 300), (200, 0, 0, 128)).save(buffer, 'png')
+    renditions = (RECIPE_COVER, RECIPE_COVER_THUMBNAIL, ImageRendition(96, 'JPEG'), ImageRendition(1600, 'WEBP'))
+
+    images = rendered_images(buffer.getvalue(), renditions)
+
+    assert set(images) == {RECIPE_COVER, RECIPE_COVER_THUMBNAIL, ImageRendition(96, 'JPEG')}
+    assert images[RECIPE_COVER].size == (800, 800)
+    assert images[RECIPE_COVER].mode == 'RGBA'
+    assert images[ImageRendition(96, 'JPEG')].mode == 'RGB'
+
+
+def _peak_rss() -> int:
+    # VmHWM is the peak RSS of the process in kB, unlike ru_maxrss it doesn't carry over the peak of the parent
+    status = Path('/proc/self/status').read_text(encoding='utf-8')
+    return int(status.partition('VmHWM:')[2].split()[0]) * 1024
+
+
+def _peak_rss_growth(path: Path, *, full_decode: bool) -> int:
+    # runs in a fresh process, so nothing but the decode can raise the peak
+    before = _peak_rss()
+    with path.open('rb') as file:
+        if full_decode:
+            Image.open(file).load()
+        else:
+            rendered = render_recipe_cover(file.read(), (RECIPE_COVER, RECIPE_COVER_THUMBNAIL))
+            assert len(rendered) == 2
+
+    return _peak_rss() - before
+
+
+def peak_rss_growth(path: Path, *, full_decode: bool) -> int:
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(_peak_rss_growth, path, full_decode=full_decode).result()
+
+
+@pytest.mark.skipif(not Path('/proc/self/status').exists(), reason='reads the peak RSS from procfs')
+def test_large_photos_are_decoded_at_reduced_scale(photo: Path):
+    full = peak_rss_growth(photo, full_decode=True)
+    cover = peak_rss_growth(photo, full_decode=False)
+
+    assert full > 100 * MB
+    # draft decodes the photo at 1/4 scale, 1936 x 1291 pixels
+    assert cover < 30 * MB
@@ -0,0 +1,62 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import asyncio
+import operator
+import time
+
+import pytest
+
+from tso_api.process_pool import BoundedProcessPool, PoolFullError
+
+
+@pytest.fixture
+def pool():
+    pool = BoundedProcessPool(max_workers=2, timeout=1)
+    yield pool
+    pool.shutdown()
+
+
+async def test_run_returns_result(pool: BoundedProcessPool):
+    assert await pool.run(operator.add, 2, 3) == 5
+
+
+async def test_exception_is_raised_in_caller(pool: BoundedProcessPool):
+    with pytest.raises(ValueError, match='invalid literal'):
+        await pool.run(int, 'not a number')
+
+
+async def test_job_exceeding_timeout_is_aborted(pool: BoundedProcessPool):
+    start = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        await pool.run(time.sleep, 30)
+
+    assert time.perf_counter() - start < 10
+    assert await pool.run(operator.add, 2, 3) == 5
+
+
+async def test_jobs_wait_for_a_free_worker(pool: BoundedProcessPool):
+    # warm up the workers, spawning them takes longer than the jobs
+    await asyncio.gather(pool.run(time.sleep, 0), pool.run(time.sleep, 0))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(pool.run(time.sleep, 0.3) for _ in range(4)))
+
+    assert time.perf_counter() - start >= 0.6
+
+
+async def test_jobs_are_rejected_once_the_queue_is_full():
+    pool = BoundedProcessPool(max_workers=1, timeout=5, max_queued=1)
+    try:
+        running = asyncio.create_task(pool.run(time.sleep, 0.5))
+        queued = asyncio.create_task(pool.run(time.sleep, 0))
+        await asyncio.sleep(0.1)
+
+        with pytest.raises(PoolFullError):
+            await pool.run(time.sleep, 0)
+
+        await asyncio.gather(running, queued)
+        # the queue drained, new jobs are accepted again
+        assert await pool.run(operator.add, 2, 3) == 5
+    finally:
+        pool.shutdown()
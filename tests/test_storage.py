@@ -0,0 +1,128 @@
+# Copyright 2025 Marius Meschter
+# SPDX-License-Identifier: AGPL-3.0-only
+
+import asyncio
+import os
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import pytest
+
+from tso_api.storage import FileStorage
+
+# latency of a syscall on the simulated network storage
+SYSCALL_LATENCY = 0.1
+
+
+@pytest.fixture
+def storage() -> Iterator[FileStorage]:
+    storage = FileStorage(max_workers=4)
+    yield storage
+    storage.shutdown()
+
+
+@pytest.fixture
+def slow_fs(monkeypatch: pytest.MonkeyPatch):
+    # every file operation the storage runs blocks its thread like a syscall on network storage
+    def slow[**P, T](fn: Callable[P, T]) -> Callable[P, T]:
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            time.sleep(SYSCALL_LATENCY)
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    for name in ('stat', 'unlink', 'replace', 'mkdir'):
+        monkeypatch.setattr(Path, name, slow(getattr(Path, name)))
+    monkeypatch.setattr(os, 'fsync', slow(os.fsync))
+
+
+async def test_write_creates_the_directories(storage: FileStorage, tmp_path: Path):
+    path = tmp_path / 'a' / 'b' / 'file'
+
+    assert await storage.write(path, b'data')
+
+    assert path.read_bytes() == b'data'
+    # the temporary file was renamed
+    assert list(path.parent.iterdir()) == [path]
+
+
+async def test_write_overwrites_unless_disabled(storage: FileStorage, tmp_path: Path):
+    path = tmp_path / 'file'
+
+    await storage.write(path, b'old')
+    assert not await storage.write(path, b'new', overwrite=False)
+    assert path.read_bytes() == b'old'
+
+    assert await storage.write(path, b'new')
+    assert path.read_bytes() == b'new'
+
+
+async def test_write_recreates_a_removed_directory(storage: FileStorage, tmp_path: Path):
+    directory = tmp_path / 'dir'
+    await storage.write(directory / 'file', b'data')
+    (directory / 'file').unlink()
+    directory.rmdir()
+
+    assert await storage.write(directory / 'file', b'data')
+    assert (directory / 'file').read_bytes() == b'data'
+
+
+async def test_failed_write_keeps_the_old_file(storage: FileStorage, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    path = tmp_path / 'file'
+    await storage.write(path, b'old')
+
+    def replace(_self: Path, _target: Path) -> Path:
+        raise OSError
+
+    monkeypatch.setattr(Path, 'replace', replace)
+    with pytest.raises(OSError):  # noqa: PT011
+        await storage.write(path, b'new')
+
+    assert path.read_bytes() == b'old'
+    assert list(tmp_path.iterdir()) == [path]
+
+
+async def test_stat_and_delete(storage: FileStorage, tmp_path: Path):
+    paths = [tmp_path / f'file{i}' for i in range(3)]
+    for path in paths:
+        await storage.write(path, b'data')
+
+    stat = await storage.stat(paths[0])
+    assert stat
+    assert stat.st_size == 4
+    assert await storage.exists(paths[0])
+
+    assert await storage.delete(paths[0])
+    assert not await storage.delete(paths[0])
+    assert await storage.stat(paths[0]) is None
+    assert not await storage.exists(paths[0])
+
+    assert await storage.delete_many(paths) == 2
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.usefixtures('slow_fs')
+async def test_slow_storage_does_not_block_the_event_loop(storage: FileStorage, tmp_path: Path):
+    lag = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal lag
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lag = max(lag, time.perf_counter() - start - 0.005)
+
+    ticks = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    # mkdir, fsync and replace of 8 files on 4 threads
+    await asyncio.gather(*(storage.write(tmp_path / f'{i}' / 'file', b'data') for i in range(8)))
+    elapsed = time.perf_counter() - start
+    running = False
+    await ticks
+
+    assert lag < SYSCALL_LATENCY
+    # the writes ran in parallel, one after another they take 8 * 3 syscalls
+    assert elapsed < 8 * 3 * SYSCALL_LATENCY / 2
+    assert all((tmp_path / f'{i}' / 'file').read_bytes() == b'data' for i in range(8))